@@ -97,9 +97,14 @@ export default function InvoiceDetailPage() {
       
       // Calculate and update total
       const calculatedTotal = calculateTotal();
+      // Saved items that were removed while editing
+      const deletedItemIds = (invoice.items || [])
+        .filter(item => item.id && !editData.items.some(edited => edited.id === item.id))
+        .map(item => item.id);
       const dataToSave = {
         ...editData,
-        total_amount: calculatedTotal
+        total_amount: calculatedTotal,
+        deleted_item_ids: deletedItemIds
       };
 
       const response = await updateInvoice(id, dataToSave);
@@ -112,7 +117,11 @@ export default function InvoiceDetailPage() {
       setError('');
     } catch (err) {
       console.error('Error updating invoice:', err);
-      setError('Failed to update invoice. Please try again.');
+      if (err.response?.status === 409) {
+        setError('This invoice was changed elsewhere since you opened it. Reload the page to see the latest version.');
+      } else {
+        setError('Failed to update invoice. Please try again.');
+      }
     } finally {
       setLoading(false);
     }
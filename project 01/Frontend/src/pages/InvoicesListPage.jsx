@@ -31,6 +31,7 @@ export default function InvoicesListPage() {
           limit: pagination.limit,
           sort_by: sortBy,
           sort_order: sortOrder,
+          fields: 'id,invoice_number,vendor_name,customer_name,invoice_date,total_amount,item_count',
           ...filters
         };
 
@@ -118,10 +119,10 @@ export default function InvoicesListPage() {
       render: (value) => formatCurrency(value)
     },
     {
-      key: 'items',
+      key: 'item_count',
       title: 'Items',
       sortable: false,
-      render: (value) => value?.length || 0
+      render: (value) => value || 0
     },
     {
       key: 'actions',
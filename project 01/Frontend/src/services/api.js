@@ -26,6 +26,24 @@ export const uploadInvoice = async (file) => {
   }
 };
 
+// Function to upload many invoices (images and/or ZIP archives) in one request
+export const uploadInvoicesBatch = async (files) => {
+  const formData = new FormData();
+  Array.from(files).forEach((file) => formData.append('files', file));
+
+  try {
+    const response = await api.post('/upload-invoices/batch', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error uploading invoice batch:', error);
+    throw error;
+  }
+};
+
 // Function to update an existing invoice
 export const updateInvoice = async (invoiceId, invoiceData) => {
   try {
@@ -87,6 +105,7 @@ export const getHealthStatus = async () => {
 
 export default {
   uploadInvoice,
+  uploadInvoicesBatch,
   updateInvoice,
   getInvoices,
   getInvoicesPaginated,
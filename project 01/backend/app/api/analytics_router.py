@@ -0,0 +1,56 @@
+from app.core.logger import logger
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.services.analytics_service import AnalyticsService
+from datetime import date
+from typing import Optional
+
+router = APIRouter()
+
+@router.get("/analytics/spend")
+async def get_spend(
+	group_by: str = Query("vendor", regex="^(vendor|customer|month)$", description="Group spend by vendor, customer or month"),
+	date_from: Optional[date] = Query(None, description="Invoice date from (YYYY-MM-DD)"),
+	date_to: Optional[date] = Query(None, description="Invoice date to (YYYY-MM-DD)"),
+	limit: int = Query(20, ge=1, le=1000, description="Max groups to return"),
+	db: AsyncSession = Depends(get_db)
+):
+	try:
+		service = AnalyticsService(db)
+		result = await service.spend(group_by, date_from, date_to, limit)
+		return {
+			"status": "success",
+			"group_by": group_by,
+			"source": result["source"],
+			"data": result["data"]
+		}
+	except Exception as e:
+		logger.error("Error fetching spend analytics: %s", e)
+		raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/top-items")
+async def get_top_items(
+	order_by: str = Query("spend", regex="^(spend|quantity|count)$", description="Rank items by spend, quantity or line count"),
+	date_from: Optional[date] = Query(None, description="Invoice date from (YYYY-MM-DD)"),
+	date_to: Optional[date] = Query(None, description="Invoice date to (YYYY-MM-DD)"),
+	limit: int = Query(10, ge=1, le=100, description="Number of items"),
+	db: AsyncSession = Depends(get_db)
+):
+	try:
+		service = AnalyticsService(db)
+		data = await service.top_items(order_by, limit, date_from, date_to)
+		return {"status": "success", "order_by": order_by, "data": data}
+	except Exception as e:
+		logger.error("Error fetching top items: %s", e)
+		raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/status")
+async def get_status_counts(db: AsyncSession = Depends(get_db)):
+	try:
+		service = AnalyticsService(db)
+		return {"status": "success", "data": await service.status_counts()}
+	except Exception as e:
+		logger.error("Error fetching status counts: %s", e)
+		raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,9 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from app.core.metrics import registry
+from app.services.extraction_cache import extraction_cache
+from app.services.response_cache import response_cache
+from app.db.session import pool_stats
 
 router = APIRouter()
 
@@ -9,3 +13,16 @@ async def health_check():
 		return {"status": "ok", "detail": "Service is healthy"}
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/health/cache")
+async def cache_stats():
+	return {"status": "ok", "extraction_cache": extraction_cache.stats(), "response_cache": response_cache.stats()}
+
+@router.get("/health/db-pool")
+async def db_pool_stats():
+	return {"status": "ok", "pool": pool_stats()}
+
+@router.get("/metrics")
+async def metrics():
+	# Prometheus text format: request / stage / repository / SQL / model metrics of this worker
+	return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
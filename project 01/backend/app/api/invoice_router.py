@@ -1,133 +1,274 @@
-from app.core.logger import logger
+from app.core.logger import logger, payload, SAMPLED
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.services.invoice_service import InvoiceService
+from app.services.invoice_service import InvoiceService, build_upload_response, resolve_list_fields
+from app.services.import_service import ImportService
+from app.repositories.import_repository import ImportCheckpointConflictError
+from app.repositories.invoice_repository import InvalidCursorError, InvoiceVersionConflictError
+from app.services.response_cache import etag_matches
+from app.utils.serialization import JSONBytesResponse
 from app.schemas.invoice import InvoiceUpdate
-from typing import Optional
+from app.utils.upload_utils import iter_upload_entries, UploadTooLargeError
+from app.utils.image_utils import UnsupportedImageError
+from fastapi.responses import StreamingResponse
+from app.utils.export_utils import EXPORT_FORMATS
+from typing import List, Optional
 
 router = APIRouter()
 
+def cache_headers(etag: str):
+	# no-cache: clients may keep the body but revalidate it with If-None-Match
+	return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified(etag: str):
+	return Response(status_code=304, headers=cache_headers(etag))
+
 @router.post("/upload-invoice")
 async def upload_invoice(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
-	logger.info(f"Received invoice upload request: {file.filename}")
+	logger.info("Received invoice upload request: %s", file.filename)
 	try:
 		service = InvoiceService(db)
 		invoice_obj, extracted_json, status = await service.process_and_store_invoice(file)
 		
+		response_data = build_upload_response(invoice_obj, extracted_json, status)
 		if status == "already_parsed":
-			logger.info(f"Invoice {extracted_json.get('invoice_number')} already exists")
-			response_data = {
-				"status": "already_parsed", 
-				"id": invoice_obj.id if invoice_obj else extracted_json.get("id"),  # Use invoice object ID if available
-				"invoice_number": extracted_json.get("invoice_number"),
-				"date": extracted_json.get("invoice_date"),
-				"vendor_name": extracted_json.get("vendor_name"),
-				"customer_name": extracted_json.get("customer_name"),
-				"total": extracted_json.get("total_amount"),
-				"items": extracted_json.get("items", [])
-			}
-			logger.info(f"Returning already_parsed response with ID: {response_data['id']}")
-			return response_data
+			logger.info("Invoice %s already exists", extracted_json.get('invoice_number'))
+			logger.info("Returning already_parsed response with ID: %s", response_data['id'])
 		else:
-			logger.info(f"Invoice processed and stored: {getattr(invoice_obj, 'id', None)}")
-			# Create a proper response with all fields needed by frontend
-			# Include the ID from the created invoice object
-			response_data = {
-				"status": "success",
-				"id": invoice_obj.id,  # Use the ID from the saved invoice object
-				"invoice_number": extracted_json.get("invoice_number"),
-				"date": extracted_json.get("invoice_date"),
-				"vendor_name": extracted_json.get("vendor_name"),
-				"customer_name": extracted_json.get("customer_name"),
-				"total": extracted_json.get("total_amount"),
-				"items": extracted_json.get("items", [])
-			}
-			logger.info(f"Returning response with ID: {response_data['id']}")
-			return response_data
+			logger.info("Invoice processed and stored: %s", getattr(invoice_obj, 'id', None))
+			logger.info("Returning response with ID: %s", response_data['id'])
+		return response_data
+	except UploadTooLargeError as e:
+		logger.warning("Rejecting upload %s: %s", file.filename, e)
+		raise HTTPException(status_code=413, detail=str(e))
+	except UnsupportedImageError as e:
+		logger.warning("Rejecting upload %s: %s", file.filename, e)
+		raise HTTPException(status_code=415, detail=str(e))
+	except HTTPException:
+		raise
 	except Exception as e:
-		logger.error(f"Error processing invoice: {str(e)}")
+		logger.error("Error processing invoice: %s", e)
 		raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/upload-invoices/batch")
+async def upload_invoices_batch(files: List[UploadFile] = File(...), db: AsyncSession = Depends(get_db)):
+	logger.info("Received batch upload request with %s files", len(files))
+	try:
+		service = InvoiceService(db)
+		results, entries_error = await service.process_batch(iter_upload_entries(files))
+	except UploadTooLargeError as e:
+		logger.warning("Rejecting batch upload: %s", e)
+		raise HTTPException(status_code=413, detail=str(e))
+	except ValueError as ve:
+		logger.error("Invalid batch upload: %s", ve)
+		raise HTTPException(status_code=400, detail=str(ve))
+	except Exception as e:
+		logger.error("Error processing batch upload: %s", e)
+		raise HTTPException(status_code=500, detail=str(e))
+
+	summary = {"success": 0, "already_parsed": 0, "error": 0}
+	for result in results:
+		summary[result["status"]] += 1
+	logger.info("Batch upload finished: %s", payload(summary))
+	if entries_error is not None:
+		# Reading the upload failed part way; the files before it were still processed
+		return {
+			"status": "partial",
+			"error": str(entries_error),
+			"summary": summary,
+			"results": results
+		}
+	return {
+		"status": "success",
+		"summary": summary,
+		"results": results
+	}
+
 @router.put("/update-invoice/{invoice_id}")
 async def update_invoice(
 	invoice_id: int,
 	update_data: InvoiceUpdate,
 	db: AsyncSession = Depends(get_db)
 ):
-	logger.info(f"Received invoice update request for ID: {invoice_id}")
+	logger.info("Received invoice update request for ID: %s", invoice_id)
 	try:
 		service = InvoiceService(db)
-		invoice_obj, response_data = await service.update_invoice(invoice_id, update_data)
-		logger.info(f"Invoice {invoice_id} updated successfully")
-		return {
+		response_data = await service.update_invoice(invoice_id, update_data)
+		logger.info("Invoice %s updated successfully", invoice_id)
+		return JSONBytesResponse({
 			"status": "success", 
 			"message": "Invoice updated successfully",
 			"data": response_data
-		}
+		})
+	except InvoiceVersionConflictError as ce:
+		logger.warning("Update conflict: %s", ce)
+		raise HTTPException(status_code=409, detail=str(ce))
 	except ValueError as ve:
-		logger.error(f"Validation error updating invoice: {str(ve)}")
+		logger.error("Validation error updating invoice: %s", ve)
 		raise HTTPException(status_code=404, detail=str(ve))
 	except Exception as e:
-		logger.error(f"Error updating invoice: {str(e)}")
+		logger.error("Error updating invoice: %s", e)
 		raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/invoices")
 async def get_invoices(
+	request: Request,
 	page: int = Query(1, ge=1, description="Page number"),
 	limit: int = Query(10, ge=1, le=100, description="Items per page"),
-	sort_by: Optional[str] = Query("id", description="Field to sort by"),
+	sort_by: Optional[str] = Query("id", description="Field to sort by, or relevance when searching"),
 	sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
 	search: Optional[str] = Query(None, description="Search term"),
+	search_items: bool = Query(False, description="Also match line item descriptions"),
 	date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
 	date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
+	after: Optional[str] = Query(None, description="Cursor: return the page after this one (ignores page)"),
+	before: Optional[str] = Query(None, description="Cursor: return the page before this one (ignores page)"),
+	count: str = Query("exact", regex="^(exact|estimated|none)$", description="How to compute the total"),
+	include_items: bool = Query(True, description="Include line items; false returns item_count instead"),
+	fields: Optional[str] = Query(None, description="Comma separated fields to return (overrides include_items)"),
 	db: AsyncSession = Depends(get_db)
 ):
-	logger.info(f"Received request to get invoices with pagination: page={page}, limit={limit}")
+	logger.info("Received request to get invoices with pagination: page=%s, limit=%s", page, limit, extra=SAMPLED)
+	if after and before:
+		raise HTTPException(status_code=400, detail="Use either after or before, not both")
+	try:
+		selected_fields = resolve_list_fields(fields, include_items)
+	except ValueError as ve:
+		raise HTTPException(status_code=400, detail=str(ve))
 	try:
 		service = InvoiceService(db)
-		result = await service.get_all_invoices_paginated(
+		etag, result = await service.get_invoices_page_response(
 			page=page,
 			limit=limit,
 			sort_by=sort_by,
 			sort_order=sort_order,
 			search=search,
 			date_from=date_from,
-			date_to=date_to
+			date_to=date_to,
+			after=after,
+			before=before,
+			count_mode=count,
+			fields=selected_fields,
+			search_items=search_items
 		)
-		logger.info(f"Retrieved {len(result['data'])} invoices, total: {result['total']}")
-		return {
-			"status": "success",
-			"data": result['data'],
-			"pagination": {
+		if etag_matches(request.headers.get("if-none-match"), etag):
+			return not_modified(etag)
+		logger.info("Retrieved %s invoices, total: %s", len(result['data']), result['total'], extra=SAMPLED)
+		total = result['total']
+		if after or before:
+			pagination = {
+				"limit": limit,
+				"total": total,
+				"has_more": result['has_more'],
+				"next_cursor": result['next_cursor'],
+				"prev_cursor": result['prev_cursor']
+			}
+		else:
+			pagination = {
 				"page": page,
 				"limit": limit,
-				"total": result['total'],
-				"pages": (result['total'] + limit - 1) // limit
+				"total": total,
+				"pages": (total + limit - 1) // limit if total is not None else None,
+				"next_cursor": result['next_cursor']
 			}
-		}
+		return JSONBytesResponse({
+			"status": "success",
+			"data": result['data'],
+			"pagination": pagination
+		}, headers=cache_headers(etag))
+	except InvalidCursorError as ce:
+		logger.warning("Invalid cursor: %s", ce)
+		raise HTTPException(status_code=400, detail=str(ce))
 	except Exception as e:
-		logger.error(f"Error fetching invoices: {str(e)}")
+		logger.error("Error fetching invoices: %s", e)
 		raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/invoices/export")
+async def export_invoices(
+	export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv|parquet)$", description="ndjson (items nested), csv or parquet (one row per item)"),
+	search: Optional[str] = Query(None, description="Search term"),
+	search_items: bool = Query(False, description="Also match line item descriptions"),
+	date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
+	date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
+	gzip: bool = Query(False, description="gzip the file (Parquet: gzip column compression)"),
+	db: AsyncSession = Depends(get_db)
+):
+	logger.info("Received invoice export request: format=%s, gzip=%s", export_format, gzip)
+	try:
+		service = InvoiceService(db)
+		chunks = service.export_invoices(export_format, search, date_from, date_to, search_items, compress=gzip)
+	except ValueError as ve:
+		logger.error("Invoice export unavailable: %s", ve)
+		raise HTTPException(status_code=400, detail=str(ve))
+	media_type, extension = EXPORT_FORMATS[export_format]
+	if gzip and export_format != "parquet":
+		media_type, extension = "application/gzip", f"{extension}.gz"
+	return StreamingResponse(
+		chunks,
+		media_type=media_type,
+		headers={"Content-Disposition": f'attachment; filename="invoices.{extension}"'}
+	)
+
+@router.post("/invoices/import")
+async def import_invoices(
+	file: UploadFile = File(...),
+	import_format: Optional[str] = Query(None, alias="format", regex="^(ndjson|json|csv)$", description="ndjson, json or csv; default from the file name"),
+	import_id: Optional[str] = Query(None, description="Checkpoint name; repeat it to resume a failed import (default: file name)"),
+	batch_size: Optional[int] = Query(None, ge=1, le=100000, description="Invoices per transaction"),
+	restart: bool = Query(False, description="Start over, even if the import completed before"),
+	db: AsyncSession = Depends(get_db)
+):
+	logger.info("Received bulk import request: %s", file.filename)
+	try:
+		service = ImportService(db)
+		summary = await service.import_file(file.file, file.filename, import_id, import_format, batch_size, restart)
+		return JSONBytesResponse({
+			"status": "success",
+			"data": summary
+		})
+	except ImportCheckpointConflictError as ce:
+		logger.warning("Import conflict: %s", ce)
+		raise HTTPException(status_code=409, detail=str(ce))
+	except ValueError as ve:
+		logger.error("Invoice import failed: %s", ve)
+		raise HTTPException(status_code=400, detail=str(ve))
+	except Exception as e:
+		logger.error("Error importing invoices: %s", e)
+		raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/invoices/import/{import_id:path}")
+async def get_import(import_id: str, db: AsyncSession = Depends(get_db)):
+	try:
+		service = ImportService(db)
+		return JSONBytesResponse({
+			"status": "success",
+			"data": await service.get_import(import_id)
+		})
+	except ValueError as ve:
+		raise HTTPException(status_code=404, detail=str(ve))
+
 @router.get("/invoice/{invoice_id}")
 async def get_invoice_by_id(
 	invoice_id: int,
+	request: Request,
 	db: AsyncSession = Depends(get_db)
 ):
-	logger.info(f"Received request to get invoice with ID: {invoice_id}")
+	logger.info("Received request to get invoice with ID: %s", invoice_id, extra=SAMPLED)
 	try:
 		service = InvoiceService(db)
-		invoice = await service.get_invoice_by_id(invoice_id)
-		logger.info(f"Retrieved invoice {invoice_id} successfully")
-		return {
+		etag, invoice = await service.get_invoice_response(invoice_id)
+		if etag_matches(request.headers.get("if-none-match"), etag):
+			return not_modified(etag)
+		logger.info("Retrieved invoice %s successfully", invoice_id, extra=SAMPLED)
+		return JSONBytesResponse({
 			"status": "success",
 			"data": invoice
-		}
+		}, headers=cache_headers(etag))
 	except ValueError as ve:
-		logger.error(f"Invoice not found: {str(ve)}")
+		logger.error("Invoice not found: %s", ve)
 		raise HTTPException(status_code=404, detail=str(ve))
 	except Exception as e:
-		logger.error(f"Error fetching invoice: {str(e)}")
+		logger.error("Error fetching invoice: %s", e)
 		raise HTTPException(status_code=500, detail=str(e))
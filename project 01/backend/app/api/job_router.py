@@ -0,0 +1,58 @@
+from app.core.logger import logger
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from app.services.job_queue import job_queue, JobQueueFullError, JobQueueNotStartedError
+from app.utils.upload_utils import read_upload, UploadTooLargeError
+from typing import Optional
+
+router = APIRouter()
+
+@router.post("/jobs/upload-invoice", status_code=202)
+async def enqueue_invoice_upload(file: UploadFile = File(...)):
+	logger.info("Received async invoice upload request: %s", file.filename)
+	try:
+		file_bytes, content_hash = await read_upload(file)
+	except UploadTooLargeError as e:
+		logger.warning("Rejecting upload %s: %s", file.filename, e)
+		raise HTTPException(status_code=413, detail=str(e))
+	try:
+		job = job_queue.submit(file_bytes, file.filename, content_hash)
+	except JobQueueFullError as e:
+		logger.warning("Rejecting upload %s: %s", file.filename, e)
+		raise HTTPException(status_code=503, detail=str(e))
+	except JobQueueNotStartedError as e:
+		logger.error("Rejecting upload %s: %s", file.filename, e)
+		raise HTTPException(status_code=503, detail=str(e))
+	return {
+		"status": "accepted",
+		"job_id": job.id,
+		"data": job.to_dict()
+	}
+
+@router.get("/jobs")
+async def get_jobs(
+	ids: Optional[str] = Query(None, description="Comma-separated job IDs"),
+	status: Optional[str] = Query(None, description="Only return jobs with this status"),
+	limit: int = Query(100, ge=1, le=1000, description="Max jobs to return")
+):
+	if ids:
+		jobs = job_queue.get_many([job_id.strip() for job_id in ids.split(",") if job_id.strip()])
+	else:
+		jobs = list(reversed(job_queue.jobs.values()))
+	if status:
+		jobs = [job for job in jobs if job.status == status]
+	return {
+		"status": "success",
+		"data": [job.to_dict() for job in jobs[:limit]],
+		"counts": job_queue.counts()
+	}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+	job = job_queue.get(job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+	return {
+		"status": "success",
+		"data": job.to_dict()
+	}
@@ -0,0 +1,65 @@
+"""
+Minimal OpenAI-compatible chat completions server for load tests.
+
+Run it, then start the API with OPENAI_BASE_URL pointing at it:
+
+    uvicorn app.benchmarks.fake_model_server:app --port 9000
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn app.main:app --port 8000
+
+FAKE_MODEL_LATENCY_SECONDS controls how long every completion takes (default 5s),
+which is roughly what a real GPT-4o vision call costs.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+
+FAKE_MODEL_LATENCY_SECONDS = float(os.getenv("FAKE_MODEL_LATENCY_SECONDS", "5"))
+
+app = FastAPI()
+
+
+def fake_invoice():
+    """Generate a unique invoice so repeated uploads are not treated as duplicates"""
+    items = []
+    for i in range(random.randint(1, 5)):
+        quantity = random.randint(1, 20)
+        unit_price = round(random.uniform(10, 500), 2)
+        items.append({
+            "item_description": f"Load test item {i + 1}",
+            "quantity": str(quantity),
+            "unit_price": f"{unit_price:.2f}",
+            "total_amount": f"{quantity * unit_price:.2f}"
+        })
+    return {
+        "invoice_number": f"LOAD-{uuid.uuid4().hex[:12].upper()}",
+        "invoice_date": "2025-01-15",
+        "customer_name": "Load Test Customer",
+        "vendor_name": "Load Test Vendor",
+        "total_amount": f"{sum(float(item['total_amount']) for item in items):.2f}",
+        "items": items
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(FAKE_MODEL_LATENCY_SECONDS)
+    content = json.dumps(fake_invoice())
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {"prompt_tokens": 850, "completion_tokens": 150, "total_tokens": 1000}
+    }
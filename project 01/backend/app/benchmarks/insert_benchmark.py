@@ -0,0 +1,117 @@
+"""
+Insert benchmark: invoices/sec for the original ORM create_invoice, the new
+single-invoice path and create_invoices_bulk.
+
+Tables are created in a scratch schema (dropped afterwards) and filled with
+deterministic fake invoices (1-8 items each, see app/extractors/fake_extractor.py).
+
+    python -m app.benchmarks.insert_benchmark --invoices 2000 --chunk-size 100
+"""
+import argparse
+import asyncio
+import json
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.db.migrations import unique_key_migrations
+from app.extractors.fake_extractor import fake_invoice
+from app.models.base import Base
+from app.models.invoice import Invoice, Item
+from app.repositories.invoice_repository import InvoiceRepository, unique_key_columns
+from app.utils.parse_utils import INVOICE_TYPED_FIELDS, ITEM_TYPED_FIELDS, with_typed_values
+
+SCHEMA = "insert_bench"
+
+
+def make_invoices(prefix: str, count: int):
+    invoices = []
+    for index in range(count):
+        invoice = with_typed_values(fake_invoice(f"{prefix}-{index:07d}"), INVOICE_TYPED_FIELDS)
+        invoice["items"] = [with_typed_values(item, ITEM_TYPED_FIELDS) for item in invoice["items"]]
+        invoices.append(invoice)
+    return invoices
+
+
+async def legacy_create_invoice(db, invoice_data: dict):
+    """create_invoice as it was: add, flush for the id, add items one by one, commit, refresh"""
+    items_data = invoice_data.pop("items", [])
+    invoice = Invoice(**invoice_data)
+    db.add(invoice)
+    await db.flush()
+    for item in items_data:
+        db.add(Item(**item, invoice_id=invoice.id))
+    await db.commit()
+    await db.refresh(invoice)
+    return invoice
+
+
+async def run_legacy(session_factory, invoices, chunk_size):
+    async with session_factory() as session:
+        for invoice in invoices:
+            await legacy_create_invoice(session, invoice)
+
+
+async def run_single(session_factory, invoices, chunk_size):
+    async with session_factory() as session:
+        repo = InvoiceRepository(session)
+        for invoice in invoices:
+            await repo.create_invoice(invoice)
+
+
+async def run_bulk(session_factory, invoices, chunk_size):
+    async with session_factory() as session:
+        await InvoiceRepository(session).create_invoices_bulk(invoices, chunk_size=chunk_size)
+
+
+MODES = {"legacy": run_legacy, "single": run_single, "bulk": run_bulk}
+
+
+async def main(args):
+    # The scratch schema is the only one on the search_path, so create_all and every
+    # unqualified statement below land there
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": SCHEMA}},
+    )
+    session_factory = lambda: AsyncSession(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+        # The duplicate-detection unique index the new insert paths rely on
+        _, key_statements = unique_key_migrations(unique_key_columns())
+        await conn.execute(text(key_statements[0]))
+
+    report = {"invoices": args.invoices, "chunk_size": args.chunk_size, "modes": {}}
+    try:
+        for mode in args.modes:
+            invoices = make_invoices(mode, args.invoices)
+            item_count = sum(len(invoice["items"]) for invoice in invoices)
+            started = time.perf_counter()
+            await MODES[mode](session_factory, invoices, args.chunk_size)
+            elapsed = time.perf_counter() - started
+            report["modes"][mode] = {
+                "seconds": round(elapsed, 3),
+                "invoices_per_sec": round(args.invoices / elapsed, 1),
+                "items_per_sec": round(item_count / elapsed, 1),
+            }
+        if "legacy" in report["modes"]:
+            baseline = report["modes"]["legacy"]["invoices_per_sec"]
+            for result in report["modes"].values():
+                result["speedup"] = round(result["invoices_per_sec"] / baseline, 2)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invoice insert throughput, ORM vs bulk statements")
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=100, help="Invoices per transaction in bulk mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    asyncio.run(main(parser.parse_args()))
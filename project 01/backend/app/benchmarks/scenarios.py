@@ -0,0 +1,263 @@
+"""
+Scripted scenarios against a running app: upload, list, search, detail, update
+and export. Each scenario sends --requests requests with --concurrency in flight
+and reports throughput and latency percentiles; the whole run is printed as one
+JSON document stamped with the git commit, so runs can be diffed across commits.
+
+Start the app with the stubbed extractor (no model calls, deterministic data)
+and without the response cache, so list / search / detail measure the database
+rather than repeated cache hits, and load some data first
+(app/benchmarks/synthetic_data.py):
+
+    EXTRACTOR_BACKEND=fake IMAGE_PREPROCESS_ENABLED=false RESPONSE_CACHE_ENABLED=false uvicorn app.main:app --port 8000
+    python -m app.benchmarks.scenarios --requests 500 --concurrency 20 --output run.json
+    python -m app.benchmarks.scenarios --baseline run.json   # adds ratios against an earlier run
+
+To measure the cache instead, run again with it enabled (a single worker): every
+scenario reports the response cache hits it caused, from GET /health/cache.
+
+Updates change real rows (customer_name gets a suffix); run against a benchmark
+database, not one you care about.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta, timezone
+import httpx
+from app.benchmarks.stats import summarize
+from app.benchmarks.synthetic_data import CUSTOMER_BASES, PRODUCTS, VENDOR_BASES
+from app.benchmarks.upload_load_test import DEFAULT_IMAGE
+
+SCENARIOS = ("upload", "list", "search", "detail", "update", "export")
+SEARCH_TERMS = [name.split()[0] for name in VENDOR_BASES + CUSTOMER_BASES] + [product.split()[0] for product in PRODUCTS]
+
+
+async def upload(client, index, context):
+    # Unique bytes per request, otherwise every upload after the first is a duplicate hit
+    marker = f"{context['run_id']}-{index}".encode()
+    image = DEFAULT_IMAGE[:-2] + marker + DEFAULT_IMAGE[-2:]
+    response = await client.post("/upload-invoice", files={"file": (f"bench-{index}.jpg", image, "image/jpeg")})
+    return response.status_code, len(response.content)
+
+
+async def list_page(client, index, context):
+    params = {
+        "page": context["rng"].randint(1, context["max_page"]),
+        "limit": context["page_size"],
+        "include_items": "false",
+    }
+    response = await client.get("/invoices", params=params)
+    return response.status_code, len(response.content)
+
+
+async def search(client, index, context):
+    rng = context["rng"]
+    params = {"search": rng.choice(SEARCH_TERMS), "limit": context["page_size"], "include_items": "false"}
+    if rng.random() < 0.25:
+        params["search_items"] = "true"
+    response = await client.get("/invoices", params=params)
+    return response.status_code, len(response.content)
+
+
+async def detail(client, index, context):
+    response = await client.get(f"/invoice/{random_id(context)}")
+    return response.status_code, len(response.content)
+
+
+async def update(client, index, context):
+    # The read that fetches the current version is not part of the measurement
+    invoice_id = random_id(context)
+    current = await client.get(f"/invoice/{invoice_id}")
+    if current.status_code != 200:
+        return current.status_code, 0
+    invoice = current.json()["data"]
+    body = {"customer_name": f"{invoice['customer_name'] or ''} [bench {index}]"[:200], "version": invoice["version"]}
+    started = time.perf_counter()
+    response = await client.put(f"/update-invoice/{invoice_id}", json=body)
+    context["timings"][index] = (time.perf_counter() - started) * 1000
+    return response.status_code, len(response.content)
+
+
+async def export(client, index, context):
+    rng = context["rng"]
+    # Windows inside the range synthetic_data generates by default
+    date_from = context["export_start"] + timedelta(days=rng.randrange(max(1, context["export_span_days"] - context["export_days"])))
+    params = {
+        "format": context["export_format"],
+        "date_from": date_from.isoformat(),
+        "date_to": (date_from + timedelta(days=context["export_days"])).isoformat(),
+    }
+    size = 0
+    async with client.stream("GET", "/invoices/export", params=params) as response:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+    return response.status_code, size
+
+
+HANDLERS = {"upload": upload, "list": list_page, "search": search, "detail": detail, "update": update, "export": export}
+
+
+def random_id(context):
+    return context["rng"].randint(context["min_id"], context["max_id"])
+
+
+async def edge_id(client, sort_order: str):
+    params = {"limit": 1, "sort_by": "id", "sort_order": sort_order, "fields": "id", "count": "none"}
+    response = await client.get("/invoices", params=params)
+    response.raise_for_status()
+    data = response.json()["data"]
+    return data[0]["id"] if data else None
+
+
+async def discover(client):
+    """Id range of the data already loaded, used to build valid detail / update requests"""
+    min_id = await edge_id(client, "asc")
+    if min_id is None:
+        raise SystemExit("No invoices found; load some with python -m app.benchmarks.synthetic_data")
+    return {"min_id": min_id, "max_id": await edge_id(client, "desc")}
+
+
+async def response_cache_stats(client):
+    """(enabled, hits) of the app's response cache; None when the app does not report it"""
+    try:
+        response = await client.get("/health/cache")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    caches = response.json()["response_cache"]
+    caches = [caches["invoices"], caches["lists"]]
+    return any(cache["max_size"] > 0 for cache in caches), sum(cache["hits"] for cache in caches)
+
+
+async def run_scenario(client, name, args, context):
+    handler = HANDLERS[name]
+    count = args.uploads if name == "upload" else args.exports if name == "export" else args.requests
+    semaphore = asyncio.Semaphore(args.concurrency)
+    context["timings"] = {}
+    results = {}
+
+    async def one(index):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, size = await handler(client, index, context)
+            except httpx.HTTPError:
+                status, size = None, 0
+            elapsed_ms = context["timings"].get(index, (time.perf_counter() - started) * 1000)
+            results[index] = (status, elapsed_ms, size)
+
+    cache_before = await response_cache_stats(client)
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    wall = time.perf_counter() - wall_started
+    cache_after = await response_cache_stats(client)
+
+    latencies = [elapsed_ms for status, elapsed_ms, _ in results.values() if status is not None and status < 400]
+    statuses = {}
+    for status, _, _ in results.values():
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    total_bytes = sum(size for _, _, size in results.values())
+    return {
+        **summarize(latencies),
+        "requests": count,
+        "errors": count - len(latencies),
+        "statuses": statuses,
+        "seconds": round(wall, 3),
+        "throughput_per_sec": round(len(latencies) / wall, 1) if wall else None,
+        "mb_per_sec": round(total_bytes / wall / 1e6, 2) if wall else None,
+        # Responses served from the cache rather than the database (per app worker)
+        "response_cache_hits": cache_after[1] - cache_before[1] if cache_before and cache_after else None,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    """Ratios current / baseline per scenario; > 1 means slower latency or higher throughput"""
+    ratios = {}
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        ratios[name] = {
+            key: round(result[key] / previous[key], 3)
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_sec")
+            if result.get(key) and previous.get(key)
+        }
+    return ratios
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        context = await discover(client)
+        cache = await response_cache_stats(client)
+        if cache and cache[0]:
+            print("Warning: the app's response cache is enabled, list / search / detail will mostly measure cache hits", flush=True)
+        context.update({
+            "rng": random.Random(args.seed),
+            "run_id": f"{time.time_ns():x}",
+            "max_page": args.max_page,
+            "page_size": args.page_size,
+            "export_days": args.export_days,
+            "export_format": args.export_format,
+            "export_start": args.export_start,
+            "export_span_days": args.export_years * 365,
+        })
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, name, args, context)
+            print(f"{name}: {results[name]}", flush=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "data": {"min_id": context["min_id"], "max_id": context["max_id"]},
+        "response_cache_enabled": cache[0] if cache else None,
+        "scenarios": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline_commit"] = baseline.get("commit")
+        report["vs_baseline"] = compare(results, baseline.get("scenarios", {}))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput / latency scenarios against a running app")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Requests per list/search/detail/update scenario")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--exports", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--max-page", type=int, default=50, help="List pages are drawn from 1..max-page")
+    parser.add_argument("--export-days", type=int, default=30, help="Date window of each export")
+    parser.add_argument("--export-start", type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument("--export-years", type=int, default=5, help="Export windows fall in export-start + export-years")
+    parser.add_argument("--export-format", choices=("ndjson", "csv", "parquet"), default="ndjson")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    asyncio.run(main(parser.parse_args()))
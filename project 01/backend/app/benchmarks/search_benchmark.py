@@ -0,0 +1,175 @@
+"""
+Search benchmark: the list endpoint's search query with and without trigram indexes.
+
+Builds a synthetic copy of the invoices/items tables in a separate schema (so the
+real data is never touched), fills it with generate_series, then runs the queries
+InvoiceRepository issues for `GET /invoices?search=...` (page plus exact count)
+before and after creating the pg_trgm GIN indexes from app/db/migrations.py.
+
+    python -m app.benchmarks.search_benchmark --invoices 2000000 --runs 20
+
+Needs DATABASE_URL and permission to create a schema and the pg_trgm extension.
+"""
+import argparse
+import asyncio
+import json
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.benchmarks.stats import summarize
+from app.core.config import settings
+from app.repositories.invoice_repository import InvoiceRepository
+
+SCHEMA = "search_bench"
+
+VENDORS = [
+    "Acme Supplies", "Globex Trading", "Initech Services", "Umbrella Pharma", "Stark Industrial",
+    "Wayne Hardware", "Raj Super Wholesale Bazar", "Hooli Cloud", "Vandelay Imports", "Soylent Foods",
+]
+CUSTOMERS = [
+    "Raj Data Processors", "Kumar Textiles", "Blue Ocean Logistics", "Northwind Traders", "Contoso Retail",
+    "Fabrikam Labs", "Tailspin Toys", "Wide World Importers", "Adventure Works", "Litware Inc",
+]
+PRODUCTS = [
+    "A4 paper ream", "Printer toner", "Steel bolts M8", "Office chair", "LED panel light",
+    "Basmati rice 25kg", "Copper wire 2.5mm", "Laptop stand", "Hand sanitizer 5L", "Packing tape",
+]
+
+DEFAULT_TERMS = ["wholesale", "INV-00123", "northwind", "toner", "zzqx"]
+
+
+def sql_array(values):
+    return "ARRAY[" + ", ".join("'" + value.replace("'", "''") + "'" for value in values) + "]"
+
+
+SETUP = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Without INCLUDING DEFAULTS, so the real tables' id sequences are not consumed
+    f"CREATE TABLE {SCHEMA}.invoices (LIKE public.invoices)",
+    f"CREATE TABLE {SCHEMA}.items (LIKE public.items)",
+    f"ALTER TABLE {SCHEMA}.items ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY",
+]
+
+POPULATE = [
+    f"""
+    INSERT INTO {SCHEMA}.invoices (id, invoice_number, invoice_date, customer_name, vendor_name, total_amount)
+    SELECT i,
+           'INV-' || lpad(i::text, 8, '0'),
+           to_char(date '2018-01-01' + (i % 2500), 'YYYY-MM-DD'),
+           ({sql_array(CUSTOMERS)})[1 + (i * 7) % {len(CUSTOMERS)}] || ' ' || (i % 997),
+           ({sql_array(VENDORS)})[1 + (i * 13) % {len(VENDORS)}] || ' ' || (i % 991),
+           to_char((i % 100000) / 10.0, 'FM999990.00')
+    FROM generate_series(1, CAST(:invoices AS integer)) AS i
+    """,
+    # 1-5 items per invoice
+    f"""
+    INSERT INTO {SCHEMA}.items (invoice_id, item_description, quantity, unit_price, total_amount)
+    SELECT i, ({sql_array(PRODUCTS)})[1 + (i * 31 + n) % {len(PRODUCTS)}] || ' #' || n, '1', '10.00', '10.00'
+    FROM generate_series(1, CAST(:invoices AS integer)) AS i, generate_series(1, 1 + i % 5) AS n
+    """,
+    f"ALTER TABLE {SCHEMA}.invoices ADD PRIMARY KEY (id)",
+    f"CREATE INDEX ON {SCHEMA}.items (invoice_id)",
+    f"ANALYZE {SCHEMA}.invoices",
+    f"ANALYZE {SCHEMA}.items",
+]
+
+
+def trigram_indexes():
+    """(name, CREATE statement) of the trigram indexes in app/db/migrations.py, pointed at the benchmark schema"""
+    from app.db.migrations import MIGRATIONS
+    return [
+        (
+            statement.split()[5],
+            statement.replace(" ON invoices ", f" ON {SCHEMA}.invoices ").replace(" ON items ", f" ON {SCHEMA}.items ")
+        )
+        for statement in MIGRATIONS if "gin_trgm_ops" in statement
+    ]
+
+
+async def run_searches(session_factory, terms, runs, search_items=False, sort_by="id"):
+    results = {}
+    for term in terms:
+        latencies = []
+        matches = None
+        for _ in range(runs):
+            async with session_factory() as session:
+                repo = InvoiceRepository(session)
+                started = time.perf_counter()
+                page = await repo.get_all_invoices_paginated(
+                    limit=20, sort_by=sort_by, search=term, search_items=search_items,
+                    fields=("id", "invoice_number", "vendor_name", "customer_name", "total_amount")
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                matches = page["total"]
+        results[term] = {"matches": matches, **summarize(latencies)}
+    return results
+
+
+async def explain(engine, term):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "EXPLAIN SELECT id FROM invoices WHERE invoice_number ILIKE :term "
+                "OR vendor_name ILIKE :term OR customer_name ILIKE :term"
+            ),
+            {"term": f"%{term}%"},
+        )
+        return [row[0] for row in result]
+
+
+async def main(args):
+    # search_path makes the repository's unqualified table names resolve to the benchmark schema
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{SCHEMA}, public"}},
+    )
+    session_factory = lambda: AsyncSession(engine, expire_on_commit=False)
+
+    if not args.reuse:
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            for statement in SETUP:
+                await conn.execute(text(statement))
+            for statement in POPULATE:
+                await conn.execute(text(statement), {"invoices": args.invoices})
+        print(f"Generated {args.invoices} invoices in {time.perf_counter() - started:.1f}s")
+
+    # A --reuse run may still have the indexes from last time
+    async with engine.begin() as conn:
+        for name, _ in trigram_indexes():
+            await conn.execute(text(f"DROP INDEX IF EXISTS {SCHEMA}.{name}"))
+
+    report = {"invoices": args.invoices, "terms": args.terms}
+    report["ilike_seq_scan"] = await run_searches(session_factory, args.terms, args.runs)
+    report["ilike_seq_scan_plan"] = await explain(engine, args.terms[0])
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        for _, statement in trigram_indexes():
+            await conn.execute(text(statement))
+    report["index_build_seconds"] = round(time.perf_counter() - started, 1)
+
+    report["trigram_index"] = await run_searches(session_factory, args.terms, args.runs)
+    report["trigram_index_plan"] = await explain(engine, args.terms[0])
+    report["trigram_index_ranked"] = await run_searches(session_factory, args.terms, args.runs, sort_by="relevance")
+    report["trigram_index_with_items"] = await run_searches(session_factory, args.terms, args.runs, search_items=True)
+
+    if not args.keep:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invoice search latency, ILIKE scan vs pg_trgm indexes")
+    parser.add_argument("--invoices", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=20, help="Repetitions per search term")
+    parser.add_argument("--terms", nargs="+", default=DEFAULT_TERMS)
+    parser.add_argument("--reuse", action="store_true", help="Reuse the data generated by a previous --keep run")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark schema afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""
+Serialization benchmark: one GET /invoices page (100 invoices x 20 items by default)
+from repository rows to response bytes.
+
+    hand_built  ORM-style objects -> hand-built dicts -> jsonable_encoder -> json.dumps
+                (how InvoiceService and FastAPI's default JSONResponse used to do it)
+    encoder     repository dicts -> jsonable_encoder -> json.dumps (a plain dict return)
+    orjson      repository dicts -> JSONBytesResponse (app/utils/serialization.py)
+
+No database needed:
+
+    python -m app.benchmarks.serialization_benchmark --invoices 100 --items 20 --runs 200
+"""
+import argparse
+import json
+import time
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.benchmarks.stats import summarize
+from app.utils.serialization import JSONBytesResponse
+
+
+def make_page(invoice_count: int, item_count: int):
+    invoices = []
+    for index in range(invoice_count):
+        items = [
+            {
+                "id": index * item_count + line,
+                "item_description": f"Line item {line} for invoice {index}",
+                "quantity": str(line + 1),
+                "unit_price": f"{(line + 1) * 12.5:.2f}",
+                "total_amount": f"{(line + 1) ** 2 * 12.5:.2f}",
+            }
+            for line in range(item_count)
+        ]
+        invoices.append({
+            "id": index,
+            "invoice_number": f"INV-{index:07d}",
+            "invoice_date": str(date(2024, 1, 1 + index % 28)),
+            "customer_name": f"Customer {index % 50}",
+            "vendor_name": f"Vendor {index % 20}",
+            "total_amount": f"{index * 101.25:.2f}",
+            "item_total": Decimal(f"{index * 101.25:.2f}"),
+            "items": items,
+        })
+    return invoices
+
+
+def as_objects(invoices):
+    return [
+        SimpleNamespace(**{**invoice, "items": [SimpleNamespace(**item) for item in invoice["items"]]})
+        for invoice in invoices
+    ]
+
+
+def hand_built(objects):
+    data = [
+        {
+            "id": invoice.id,
+            "invoice_number": invoice.invoice_number,
+            "invoice_date": invoice.invoice_date,
+            "customer_name": invoice.customer_name,
+            "vendor_name": invoice.vendor_name,
+            "total_amount": invoice.total_amount,
+            "item_total": invoice.item_total,
+            "items": [
+                {
+                    "id": item.id,
+                    "item_description": item.item_description,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "total_amount": item.total_amount
+                }
+                for item in invoice.items
+            ]
+        }
+        for invoice in objects
+    ]
+    return JSONResponse(jsonable_encoder({"status": "success", "data": data})).body
+
+
+def encoder(invoices):
+    return JSONResponse(jsonable_encoder({"status": "success", "data": invoices})).body
+
+
+def orjson_response(invoices):
+    return JSONBytesResponse({"status": "success", "data": invoices}).body
+
+
+def main(args):
+    invoices = make_page(args.invoices, args.items)
+    modes = {
+        "hand_built": (hand_built, as_objects(invoices)),
+        "encoder": (encoder, invoices),
+        "orjson": (orjson_response, invoices),
+    }
+    report = {"invoices": args.invoices, "items_per_invoice": args.items, "modes": {}}
+    for mode, (serialize, page) in modes.items():
+        body = serialize(page)
+        latencies = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            serialize(page)
+            latencies.append((time.perf_counter() - started) * 1000)
+        report["modes"][mode] = {"bytes": len(body), **summarize(latencies)}
+    baseline = report["modes"]["hand_built"]["p50_ms"]
+    for result in report["modes"].values():
+        result["speedup_p50"] = round(baseline / result["p50_ms"], 2) if result["p50_ms"] else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invoice page serialization: hand-built dicts vs orjson")
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,157 @@
+"""
+Synthetic invoice generator: loads any number of invoices into the app's database
+with COPY, in constant memory.
+
+Invoices get realistic shapes: a few vendors and customers account for most of
+the volume (Pareto), most invoices have 1-5 line items with a long tail up to
+--max-items, dates spread over --years, and the typed date / amount columns are
+filled like the app fills them. Rows are appended after the current max id, the
+id sequences are moved past them, and invoice numbers (SYN-<id>) never collide
+with real ones.
+
+    python -m app.benchmarks.synthetic_data --invoices 1000000 --batch-size 20000
+
+Run `python -m app.db.migrations` first on a fresh database. The invoice_rollup
+table is rebuilt afterwards when ANALYTICS_ROLLUP_ENABLED is on.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from app.core.config import settings
+from app.db.session import engine
+
+VENDOR_BASES = [
+    "Acme Supplies", "Globex Trading", "Initech Services", "Umbrella Pharma", "Stark Industrial",
+    "Wayne Hardware", "Raj Super Wholesale Bazar", "Hooli Cloud", "Vandelay Imports", "Soylent Foods",
+    "Tech Solutions", "Global Supply", "Premium Services", "Digital Innovations", "Smart Systems",
+]
+CUSTOMER_BASES = [
+    "Raj Data Processors", "Kumar Textiles", "Blue Ocean Logistics", "Northwind Traders", "Contoso Retail",
+    "Fabrikam Labs", "Tailspin Toys", "Wide World Importers", "Adventure Works", "Litware",
+    "ABC Corporation", "XYZ Industries", "Metro Business Group", "City Center Mall", "Downtown Enterprises",
+]
+PRODUCTS = [
+    "A4 paper ream", "Printer toner", "Steel bolts M8", "Office chair", "LED panel light",
+    "Basmati rice 25kg", "Copper wire 2.5mm", "Laptop stand", "Hand sanitizer 5L", "Packing tape",
+    "Software license", "Technical support hour", "Network switch", "Safety gloves", "Coffee beans 1kg",
+]
+SUFFIXES = ["Ltd", "Inc", "LLC", "Pvt Ltd", "Co", "Group", "GmbH", "Traders", "& Sons", "Partners"]
+
+INVOICE_COLUMNS = [
+    "id", "invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount",
+    "invoice_date_value", "total_amount_value", "version",
+]
+ITEM_COLUMNS = [
+    "id", "invoice_id", "item_description", "quantity", "unit_price", "total_amount",
+    "quantity_value", "unit_price_value", "total_amount_value",
+]
+CENTS = Decimal("0.01")
+
+
+def name_pool(bases, size: int):
+    """`size` distinct company names built from the base names"""
+    names = []
+    for index in range(size):
+        base = bases[index % len(bases)]
+        suffix = SUFFIXES[(index // len(bases)) % len(SUFFIXES)]
+        branch = index // (len(bases) * len(SUFFIXES))
+        names.append(f"{base} {suffix}" + (f" {branch}" if branch else ""))
+    return names
+
+
+def pareto_pick(rng: random.Random, pool):
+    """A pool entry, heavily skewed towards the first ones"""
+    return pool[min(int(rng.paretovariate(1.16)) - 1, len(pool) - 1)]
+
+
+def item_count(rng: random.Random, max_items: int):
+    """1-5 items for most invoices, with an exponential tail"""
+    return min(max_items, 1 + int(rng.expovariate(1 / 2.5)))
+
+
+def generate_batch(rng, first_id: int, count: int, first_item_id: int, args, vendors, customers):
+    """(invoice records, item records) for invoices first_id .. first_id + count - 1"""
+    invoices, items = [], []
+    item_id = first_item_id
+    for invoice_id in range(first_id, first_id + count):
+        invoice_date = args.start_date + timedelta(days=rng.randrange(args.years * 365))
+        total = Decimal(0)
+        for _ in range(item_count(rng, args.max_items)):
+            quantity = Decimal(rng.choice((1, 1, 1, 2, 2, 3, 5, 10, 12, 24, 50, 100)))
+            unit_price = Decimal(str(round(rng.lognormvariate(3.5, 1.2), 2))).quantize(CENTS)
+            line_total = (quantity * unit_price).quantize(CENTS)
+            total += line_total
+            items.append((
+                item_id, invoice_id, rng.choice(PRODUCTS), str(quantity), str(unit_price), str(line_total),
+                quantity, unit_price, line_total,
+            ))
+            item_id += 1
+        invoices.append((
+            invoice_id, f"SYN-{invoice_id:010d}", invoice_date.isoformat(),
+            pareto_pick(rng, customers), pareto_pick(rng, vendors), str(total),
+            invoice_date, total, 1,
+        ))
+    return invoices, items
+
+
+async def next_id(pg, table: str):
+    return (await pg.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}"))
+
+
+async def load(args):
+    rng = random.Random(args.seed)
+    vendors = name_pool(VENDOR_BASES, args.vendors)
+    customers = name_pool(CUSTOMER_BASES, args.customers)
+    report = {"invoices": 0, "items": 0}
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection  # asyncpg connection, for COPY
+        invoice_id = await next_id(pg, "invoices")
+        item_id = await next_id(pg, "items")
+        remaining = args.invoices
+        while remaining > 0:
+            count = min(args.batch_size, remaining)
+            invoices, items = generate_batch(rng, invoice_id, count, item_id, args, vendors, customers)
+            # One transaction per batch: an interrupted run keeps the batches it finished
+            async with pg.transaction():
+                await pg.copy_records_to_table("invoices", records=invoices, columns=INVOICE_COLUMNS)
+                await pg.copy_records_to_table("items", records=items, columns=ITEM_COLUMNS)
+            invoice_id += count
+            item_id += len(items)
+            remaining -= count
+            report["invoices"] += count
+            report["items"] += len(items)
+            elapsed = time.perf_counter() - started
+            print(f"{report['invoices']} invoices, {report['items']} items, {report['invoices'] / elapsed:.0f} invoices/s", flush=True)
+
+        for table in ("invoices", "items"):
+            await pg.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+            await pg.execute(f"ANALYZE {table}")
+
+    if settings.ANALYTICS_ROLLUP_ENABLED:
+        from app.db.rollup import rebuild_rollup
+        await rebuild_rollup()
+    await engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 2)
+    report["invoices_per_sec"] = round(report["invoices"] / elapsed, 1) if elapsed else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load synthetic invoices with COPY")
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=20000, help="Invoices per COPY transaction")
+    parser.add_argument("--max-items", type=int, default=40)
+    parser.add_argument("--vendors", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(load(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Load test: read latency while uploads are in flight.
+
+Fires UPLOADS concurrent /upload-invoice requests (served by the fake model server,
+see app/benchmarks/fake_model_server.py) and, at the same time, a steady stream of
+/health and /invoices reads. Prints a JSON report with p50/p95/p99 latencies, so a
+blocked event loop shows up immediately as read p99 ~= model latency.
+
+    python -m app.benchmarks.upload_load_test --uploads 50 --reads 500
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from app.benchmarks.stats import summarize
+
+# Smallest valid JPEG-ish payload; the fake model server ignores the content
+DEFAULT_IMAGE = b"\xff\xd8\xff\xe0" + b"\x00" * 1024 + b"\xff\xd9"
+
+
+async def timed(client, method, url, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return response.status_code, elapsed_ms
+
+
+async def run_uploads(client, count, concurrency, image_bytes, results):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            files = {"file": (f"load-{index}.jpg", image_bytes, "image/jpeg")}
+            status, elapsed_ms = await timed(client, "POST", "/upload-invoice", files=files)
+            results.append((status, elapsed_ms))
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+
+
+async def run_reads(client, count, interval, paths, results, stop_event):
+    for i in range(count):
+        if stop_event.is_set():
+            break
+        path = paths[i % len(paths)]
+        status, elapsed_ms = await timed(client, "GET", path)
+        results.setdefault(path, []).append((status, elapsed_ms))
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    image_bytes = DEFAULT_IMAGE
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+
+    upload_results = []
+    read_results = {}
+    stop_event = asyncio.Event()
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        reader = asyncio.create_task(
+            run_reads(client, args.reads, args.read_interval, ["/health", "/invoices"], read_results, stop_event)
+        )
+        await run_uploads(client, args.uploads, args.concurrency, image_bytes, upload_results)
+        stop_event.set()
+        await reader
+        wall_seconds = time.perf_counter() - started
+
+    report = {
+        "uploads": {
+            **summarize([ms for _, ms in upload_results]),
+            "errors": sum(1 for status, _ in upload_results if status >= 400),
+            "throughput_per_s": round(len(upload_results) / wall_seconds, 2),
+        },
+        "reads": {
+            path: {
+                **summarize([ms for _, ms in samples]),
+                "errors": sum(1 for status, _ in samples if status >= 400),
+            }
+            for path, samples in read_results.items()
+        },
+        "wall_seconds": round(wall_seconds, 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure read latency under concurrent invoice uploads")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--read-interval", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--image", help="Path to an invoice image to upload")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""
+Memory benchmark: peak Python allocations for turning an upload into a model payload.
+
+Compares the original path (file.file.read() -> b64encode -> decode -> f-string)
+with read_upload() + encode_data_url(), using tracemalloc peaks per upload. Uploads
+are spooled to a temporary file the way Starlette does, so reads allocate for real.
+
+    python -m app.benchmarks.upload_memory --sizes-mb 1 5 20
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import tracemalloc
+from app.utils.upload_utils import read_upload, encode_data_url
+
+
+class InMemoryUpload:
+    """Just enough of starlette's UploadFile for the upload path"""
+
+    def __init__(self, data: bytes, filename: str = "invoice.jpg"):
+        self.file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self.file.write(data)
+        self.file.seek(0)
+        self.filename = filename
+        self.size = len(data)
+
+    async def read(self, size: int = -1):
+        return self.file.read(size)
+
+
+def legacy_payload(upload):
+    file_bytes = upload.file.read()
+    base64_image = base64.b64encode(file_bytes).decode("utf-8")
+    return f"data:image/jpeg;base64,{base64_image}"
+
+
+async def streaming_payload(upload):
+    file_bytes, _ = await read_upload(upload, max_bytes=upload.size)
+    return encode_data_url(file_bytes, "image/jpeg", release_source=True)
+
+
+def measure(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    payload = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return payload, peak
+
+
+def main(args):
+    report = []
+    # Event loop setup allocates too; keep it out of the measured window
+    loop = asyncio.new_event_loop()
+    for size_mb in args.sizes_mb:
+        data = os.urandom(int(size_mb * 1024 * 1024))
+        legacy_upload = InMemoryUpload(data)
+        streaming_upload = InMemoryUpload(data)
+        legacy, legacy_peak = measure(lambda: legacy_payload(legacy_upload))
+        streaming, streaming_peak = measure(lambda: loop.run_until_complete(streaming_payload(streaming_upload)))
+        assert legacy == streaming, "Encoders disagree"
+        report.append({
+            "size_mb": size_mb,
+            "legacy_peak_mb": round(legacy_peak / 1024 / 1024, 2),
+            "streaming_peak_mb": round(streaming_peak / 1024 / 1024, 2),
+            "legacy_x_file_size": round(legacy_peak / len(data), 2),
+            "streaming_x_file_size": round(streaming_peak / len(data), 2),
+        })
+    loop.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory per upload, legacy vs streaming")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20])
+    main(parser.parse_args())
@@ -1,12 +1,108 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.env"))
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
+    OPENAI_API_KEY: str = ""  # Only needed by the openai and cascade extractors
     DATABASE_URL: str
 
+    # Database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Detect connections killed by a Postgres restart
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # asyncpg only; 0 behind PgBouncer
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg only; 0 behind PgBouncer
+
+    # Duplicate detection: comma separated invoice columns that identify an invoice,
+    # e.g. "vendor_name,invoice_number" when vendors reuse each other's numbers
+    INVOICE_UNIQUE_KEY: str = "invoice_number"
+
+    # Invoice listing
+    COUNT_CACHE_TTL_SECONDS: float = 30.0  # Cached filtered totals for count=estimated
+    EXPORT_CHUNK_SIZE: int = 2000  # Rows per server-side cursor fetch (and Parquet row group)
+
+    # Analytics
+    ANALYTICS_ROLLUP_ENABLED: bool = False  # Maintain invoice_rollup on writes; rebuild once with python -m app.db.rollup
+
+    # Extraction backend: openai, local, cascade (local first, OpenAI on low confidence) or fake
+    EXTRACTOR_BACKEND: str = "openai"
+    CASCADE_MIN_CONFIDENCE: float = 0.8
+    TESSERACT_LANG: str = "eng"
+    FAKE_EXTRACTOR_LATENCY_SECONDS: float = 0.0
+
+    # OpenAI extraction
+    OPENAI_MODEL: str = "gpt-4o"
+    OPENAI_BASE_URL: Optional[str] = None  # Point at a local fake model server for load tests
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_RETRIES: int = 2
+    EXTRACTION_MAX_CONCURRENCY: int = 32  # Max model calls in flight per worker
+    EXTRACTION_QUEUE_TIMEOUT_SECONDS: float = 30.0  # Max wait for a free extraction slot
+    OPENAI_INPUT_COST_PER_1M_TOKENS: float = 2.50  # USD, for the model_cost_usd_total metric
+    OPENAI_OUTPUT_COST_PER_1M_TOKENS: float = 10.00
+
+    # Uploads
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024  # Per file
+    MAX_BATCH_UPLOAD_BYTES: int = 500 * 1024 * 1024  # Whole /upload-invoices/batch request
+
+    # Image preprocessing before extraction (needs Pillow)
+    IMAGE_PREPROCESS_ENABLED: bool = True
+    IMAGE_PREPROCESS_WORKERS: int = 2  # Processes in the preprocessing pool
+    IMAGE_MAX_DIMENSION: int = 2048  # Longest side in pixels after downscaling
+    IMAGE_GRAYSCALE: bool = True
+    IMAGE_OUTPUT_FORMAT: str = "JPEG"  # JPEG or WEBP
+    IMAGE_OUTPUT_QUALITY: int = 80
+    IMAGE_AUTOCROP: bool = False
+    IMAGE_DESKEW: bool = False
+
+    # PDF invoices (needs PyMuPDF)
+    PDF_MAX_PAGES: int = 20
+    PDF_PAGE_CONCURRENCY: int = 4  # Pages rendered and extracted at the same time
+    PDF_RENDER_DPI: int = 150
+    PDF_MIN_TEXT_CHARS: int = 50  # Per page, to treat the PDF as having a text layer
+
+    # Content-hash extraction cache
+    EXTRACTION_CACHE_MAX_SIZE: int = 10000
+    EXTRACTION_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+
+    # Read-through cache of GET /invoice/{id} and GET /invoices responses
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_SIZE: int = 5000  # Per store (details, lists)
+    RESPONSE_CACHE_TTL_SECONDS: float = 300.0
+    RESPONSE_CACHE_LIST_TTL_SECONDS: float = 30.0
+
+    # Background extraction jobs (POST /jobs/upload-invoice)
+    JOB_WORKERS: int = 8
+    JOB_QUEUE_MAX_SIZE: int = 1000
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 2.0
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = 60.0
+    JOB_RETENTION_SECONDS: float = 24 * 3600  # How long finished jobs stay queryable
+
+    # Logging, see app/core/logger.py
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text or json
+    LOG_ASYNC: bool = True  # Write from a background thread via QueueHandler / QueueListener
+    LOG_PAYLOAD_MAX_CHARS: int = 500  # Truncation of payload() fields (model output, invoice dicts)
+    LOG_SAMPLE_RATE: float = 1.0  # Share of high-volume (extra=SAMPLED) messages kept
+
+    # Tracing, see app/core/tracing.py
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"  # file, memory or opentelemetry
+    TRACING_FILE: str = "traces.jsonl"
+
+    # Batch uploads (POST /upload-invoices/batch)
+    BATCH_MAX_FILES: int = 500
+    BATCH_MAX_CONCURRENCY: int = 8
+    BATCH_COMMIT_SIZE: int = 100  # Invoices per bulk insert transaction
+
+    # Bulk imports (POST /invoices/import, python -m app.db.bulk_import)
+    IMPORT_BATCH_SIZE: int = 5000  # Invoices per COPY + merge transaction (and checkpoint)
+    MAX_IMPORT_BYTES: int = 2 * 1024 * 1024 * 1024  # Whole /invoices/import request
+
     model_config = SettingsConfigDict(env_file=env_path, env_file_encoding="utf-8")
 
 settings = Settings()
@@ -1,15 +1,120 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from app.core.config import settings
+from app.core.tracing import TraceContextFilter
+
+# Attributes every LogRecord has; anything else was passed with extra= and goes into JSON output
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id", "span_id", "sampled"}
+
+# extra= marker for high-volume messages, kept at a rate of LOG_SAMPLE_RATE
+SAMPLED = {"sampled": True}
+
+
+class payload:
+    """Log argument for a large value (model output, invoice dicts).
+
+    Converted to text only if the record is actually emitted, and cut to
+    LOG_PAYLOAD_MAX_CHARS so one record can never dump a whole document:
+
+        logger.debug("Raw response: %s", payload(content))
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else json.dumps(self.value, default=str)
+        limit = settings.LOG_PAYLOAD_MAX_CHARS
+        if len(text) <= limit:
+            return text
+        return f"{text[:limit]}... [truncated, {len(text)} chars]"
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps records logged with extra=SAMPLED at the given rate; others always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return not getattr(record, "sampled", False) or self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, trace ids and extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", "-") != "-":
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Merge the arguments into the message now (they may change once we return)
+        # but leave formatting to the listener; tracebacks travel as text
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+
 
 logger = logging.getLogger("app_logger")
-logger.setLevel(logging.INFO)
+logger.setLevel(settings.LOG_LEVEL.upper())
+# Sampling first: dropped records skip the rest
+logger.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+logger.addFilter(TraceContextFilter())
 
-formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+if settings.LOG_FORMAT == "json":
+    formatter = JsonFormatter()
+elif settings.TRACING_ENABLED:
+    formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | trace=%(trace_id)s | %(message)s")
+else:
+    formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
 
-# For file logging, uncomment below:
+# For file logging, uncomment below (and add file_handler to the QueueListener):
 # file_handler = logging.FileHandler("app.log")
 # file_handler.setFormatter(formatter)
-# logger.addHandler(file_handler)
+
+if settings.LOG_ASYNC:
+    # The event loop only enqueues records; formatting and writing happen on the
+    # listener's thread, so a slow stdout / log collector cannot stall requests
+    _log_queue = queue.SimpleQueue()
+    logger.addHandler(_QueueHandler(_log_queue))
+    _listener = QueueListener(_log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+else:
+    logger.addHandler(console_handler)
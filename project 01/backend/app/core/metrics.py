@@ -0,0 +1,210 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Seconds; suits both pool waits (sub-millisecond when healthy) and slow requests
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered by GET /metrics"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class Metric:
+    """A named family of series, one per combination of label values.
+
+    Updates are plain in-process arithmetic (no locks, no I/O), so they are safe
+    to call on every request and every SQL statement.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str = "", labelnames=(), registry=registry):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: dict):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in sorted(self._series.items()):
+            lines.extend(self._render_series(list(zip(self.labelnames, key)), series))
+        return lines
+
+    def _render_series(self, pairs, series):
+        return [f"{self.name}{_label_text(pairs)} {_format_number(series)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Current value; with `function` (unlabeled only) it is read at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str = "", labelnames=(), registry=registry, function=None):
+        super().__init__(name, description, labelnames, registry)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        self._series[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self.function is not None:
+            self._series = {(): self.function()}
+        return super().render()
+
+
+class _HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; cheap enough to observe on every request"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str = "", buckets=DEFAULT_BUCKETS, labelnames=(), registry=registry):
+        super().__init__(name, description, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(self.buckets)
+        series.observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels):
+        series = self._series.get(self._key(labels)) or _HistogramSeries(self.buckets)
+        return {
+            "count": series.count,
+            "sum": round(series.sum, 6),
+            "mean": round(series.sum / series.count, 6) if series.count else 0.0,
+            "buckets": {
+                "+Inf" if bound == float("inf") else str(bound): count
+                for bound, count in series.cumulative()
+            },
+        }
+
+    def _render_series(self, pairs, series):
+        lines = [
+            f"{self.name}_bucket{_label_text(pairs + [('le', _format_number(bound))])} {count}"
+            for bound, count in series.cumulative()
+        ]
+        lines.append(f"{self.name}_sum{_label_text(pairs)} {_format_number(series.sum)}")
+        lines.append(f"{self.name}_count{_label_text(pairs)} {series.count}")
+        return lines
+
+
+def timed_async(histogram: Histogram, **labels):
+    """Decorator observing the duration of every call of an async function"""
+    def decorate(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorate
+
+
+class QueryCounter:
+    """SQL statements run on behalf of one request"""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set per request by the metrics middleware in app/main.py, incremented in app/db/session.py
+request_queries: ContextVar = ContextVar("request_queries", default=None)
@@ -0,0 +1,260 @@
+"""
+Optional request tracing: spans around HTTP requests, InvoiceService methods,
+model calls and SQL statements, with the trace id added to every log record.
+
+Disabled by default (TRACING_ENABLED=false): `tracer.span()` then returns a shared
+no-op object and `traced` calls straight through, so the instrumentation costs one
+attribute check. TRACING_EXPORTER picks where finished spans go:
+
+    file           JSON lines appended to TRACING_FILE, one span per line, written
+                   on a background thread
+    memory         kept in `memory_exporter.spans`, for tests and offline inspection
+    opentelemetry  handed to the OpenTelemetry SDK set up by the process (needs
+                   opentelemetry-api; configure its exporters the usual way)
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from app.core.config import settings
+
+try:
+    from opentelemetry import context as otel_context, trace as otel_trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # OpenTelemetry is optional
+    otel_context = None
+    otel_trace = None
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation. Use as a context manager to make it the parent of spans
+    started inside it, or call end() yourself for leaf spans (SQL statements)."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes", "start_time",
+        "status", "error", "_started", "_exporter", "_token",
+    )
+
+    def __init__(self, exporter, name: str, parent, attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.status = "ok"
+        self.error = None
+        self._started = time.perf_counter()
+        self._exporter = exporter
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_name(self, name: str):
+        self.name = name
+
+    def record_exception(self, exception: BaseException):
+        self.status = "error"
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def end(self):
+        self._exporter.export({
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        })
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+
+class _OpenTelemetrySpan:
+    """Same interface as Span, backed by an OpenTelemetry span"""
+
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, otel_tracer, name: str, attributes: dict):
+        self._span = otel_tracer.start_span(name, attributes=attributes)
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self._span.set_attribute(key, value)
+
+    def set_name(self, name: str):
+        self._span.update_name(name)
+
+    def record_exception(self, exception: BaseException):
+        self._span.record_exception(exception)
+        self._span.set_status(Status(StatusCode.ERROR, str(exception)))
+
+    def end(self):
+        self._span.end()
+
+    def __enter__(self):
+        self._token = otel_context.attach(otel_trace.set_span_in_context(self._span))
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None:
+            self.record_exception(exc)
+        otel_context.detach(self._token)
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_name(self, name: str):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span: dict):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans = []
+
+
+class FileExporter:
+    """Appends finished spans as JSON lines, one per span.
+
+    export() only enqueues: serializing and writing happen on a background thread
+    (like the log listener in logger.py), so a slow disk never blocks the event loop.
+    shutdown() (also run at exit) writes what is still queued.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        self._thread = threading.Thread(target=self._write_spans, name="span-file-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def export(self, span: dict):
+        self._queue.put(span)
+
+    def _write_spans(self):
+        while True:
+            span = self._queue.get()
+            if span is self._STOP:
+                return
+            self._file.write(json.dumps(span, default=str) + "\n")
+
+    def shutdown(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._file.close()
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.exporter = None
+        self.otel_tracer = None
+
+    def configure(self, exporter=None, otel_tracer=None):
+        """Send spans to `exporter` or `otel_tracer`; with neither, tracing is off"""
+        self.exporter = exporter
+        self.otel_tracer = otel_tracer
+        self.enabled = exporter is not None or otel_tracer is not None
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        if self.otel_tracer is not None:
+            return _OpenTelemetrySpan(self.otel_tracer, name, attributes)
+        return Span(self.exporter, name, _current_span.get(), attributes)
+
+    def current_ids(self):
+        """(trace id, span id) of the active span, or ("-", "-")"""
+        if self.otel_tracer is not None:
+            span_context = otel_trace.get_current_span().get_span_context()
+            if span_context.is_valid:
+                return f"{span_context.trace_id:032x}", f"{span_context.span_id:016x}"
+            return "-", "-"
+        span = _current_span.get()
+        return (span.trace_id, span.span_id) if span is not None else ("-", "-")
+
+
+def traced(name: str = None):
+    """Decorator running every call of an async function in a span (qualified name by default)"""
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return await function(*args, **kwargs)
+            with tracer.span(span_name):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds trace_id / span_id to log records so log lines can be joined with spans"""
+
+    def filter(self, record):
+        record.trace_id, record.span_id = tracer.current_ids() if tracer.enabled else ("-", "-")
+        return True
+
+
+tracer = Tracer()
+memory_exporter = InMemoryExporter()
+
+if settings.TRACING_ENABLED:
+    if settings.TRACING_EXPORTER == "memory":
+        tracer.configure(exporter=memory_exporter)
+    elif settings.TRACING_EXPORTER == "opentelemetry":
+        if otel_trace is None:
+            raise ValueError("TRACING_EXPORTER=opentelemetry requires opentelemetry-api (pip install opentelemetry-sdk)")
+        tracer.configure(otel_tracer=otel_trace.get_tracer("invoice-backend"))
+    else:
+        tracer.configure(exporter=FileExporter(settings.TRACING_FILE))
@@ -0,0 +1,86 @@
+"""
+Online backfill of the typed date / amount columns from the raw strings.
+
+Rows stored before the typed columns existed (or written by the dummy data scripts)
+only have the strings. This walks each table in primary key order, parses a batch
+with the same parsers the service uses and writes it back in its own short
+transaction, so it can run against a live database and be stopped and re-run.
+Each row is only written if its raw strings are still the ones that were parsed:
+a row edited in between keeps the typed values its update wrote.
+
+    python -m app.db.backfill --batch-size 1000 --pause 0.05
+"""
+import argparse
+import asyncio
+from sqlalchemy import bindparam, or_, select, update
+from app.core.logger import logger
+from app.db.session import AsyncSessionLocal
+from app.models.invoice import Invoice, Item
+from app.utils.parse_utils import INVOICE_TYPED_FIELDS, ITEM_TYPED_FIELDS, with_typed_values
+
+
+async def backfill_table(model, typed_fields: dict, batch_size: int, pause_seconds: float):
+    """Fill NULL typed columns of `model`; returns (rows scanned, rows updated)"""
+    raw_columns = [getattr(model, field) for field in typed_fields]
+    typed_names = [typed_field for typed_field, _ in typed_fields.values()]
+    missing = or_(*(getattr(model, typed_field).is_(None) for typed_field in typed_names))
+    # Core executemany; "b_" keeps the parameter names apart from the column names
+    table = model.__table__
+    guarded_update = (
+        update(table)
+        .where(
+            table.c.id == bindparam("b_id"),
+            *(table.c[field].is_not_distinct_from(bindparam(f"b_{field}")) for field in typed_fields)
+        )
+        .values({typed_field: bindparam(f"b_{typed_field}") for typed_field in typed_names})
+    )
+    last_id = 0
+    scanned = updated = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(model.id, *raw_columns)
+                .where(model.id > last_id, missing)
+                .order_by(model.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            changes = []
+            for row in rows:
+                values = with_typed_values(row._asdict(), typed_fields)
+                typed = {typed_field: values[typed_field] for typed_field in typed_names}
+                # Unparseable strings stay NULL; the id cursor keeps them from being re-read
+                if any(value is not None for value in typed.values()):
+                    changes.append({
+                        "b_id": row.id,
+                        **{f"b_{field}": getattr(row, field) for field in typed_fields},
+                        **{f"b_{typed_field}": value for typed_field, value in typed.items()},
+                    })
+            if changes:
+                # One executemany per batch, each row guarded by the raw values read above
+                await session.execute(guarded_update, changes)
+                await session.commit()
+                updated += len(changes)
+        logger.info("Backfilled %s: %s of %s rows, up to id %s", model.__tablename__, updated, scanned, last_id)
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+    return scanned, updated
+
+
+async def run_backfill(batch_size: int = 1000, pause_seconds: float = 0.0):
+    for model, typed_fields in ((Invoice, INVOICE_TYPED_FIELDS), (Item, ITEM_TYPED_FIELDS)):
+        scanned, updated = await backfill_table(model, typed_fields, batch_size, pause_seconds)
+        logger.info("Backfill of %s done: %s of %s rows updated", model.__tablename__, updated, scanned)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill typed date / amount columns from the raw strings")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+    asyncio.run(run_backfill(args.batch_size, args.pause))
@@ -0,0 +1,42 @@
+"""
+Bulk import of invoice dumps from the command line (same loader as POST /invoices/import).
+
+Accepts NDJSON / JSON arrays of InvoiceCreate objects and the CSV written by
+/invoices/export. Batches are COPYed into staging tables and merged, skipping
+invoices whose INVOICE_UNIQUE_KEY already exists. Progress is checkpointed per
+batch under --import-id (the file path by default): re-running after a failure
+resumes after the last committed batch, re-running a completed import does
+nothing unless --restart is given. A different file under the same import id
+is refused.
+
+    python -m app.db.bulk_import invoices-2019.ndjson --batch-size 10000
+
+Run `python -m app.db.migrations` first on a fresh database. The API's response
+cache lives in the app's process; list pages it cached expire after
+RESPONSE_CACHE_LIST_TTL_SECONDS.
+"""
+import argparse
+import asyncio
+import json
+from app.db.session import AsyncSessionLocal, engine
+from app.services.import_service import ImportService
+
+
+async def run_import(args):
+    with open(args.path, "rb") as file:
+        async with AsyncSessionLocal() as db:
+            summary = await ImportService(db).import_file(
+                file, args.path, args.import_id, args.format, args.batch_size, args.restart
+            )
+    await engine.dispose()
+    print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import invoices from JSON, NDJSON or CSV")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("ndjson", "json", "csv"), help="Default: from the file extension")
+    parser.add_argument("--import-id", help="Checkpoint name; default: the path")
+    parser.add_argument("--batch-size", type=int, help="Invoices per transaction; default IMPORT_BATCH_SIZE")
+    parser.add_argument("--restart", action="store_true", help="Start over, even if the import completed before")
+    asyncio.run(run_import(parser.parse_args()))
@@ -0,0 +1,212 @@
+"""
+Idempotent schema migrations for existing databases.
+
+`Base.metadata.create_all` only creates missing tables (a fresh database gets them
+here too), so columns and indexes added after the first deploy are applied by the
+statements below. Every statement must be safe to run repeatedly. They are not run
+by the app: run them once per deploy, before starting the new version:
+
+    python -m app.db.migrations
+
+Indexes are built with CREATE INDEX CONCURRENTLY, outside a transaction, so writes
+keep flowing while a large table is indexed. A concurrent build that failed leaves
+an invalid index behind; it is dropped and rebuilt on the next run.
+"""
+import asyncio
+import re
+from sqlalchemy import text
+from app.core.logger import logger
+from app.db.session import engine
+from app.models.base import Base
+from app.models import invoice  # noqa: F401  (registers the tables on Base.metadata)
+from app.repositories.invoice_repository import unique_key_columns
+
+INDEX_RE = re.compile(r"^\s*CREATE (UNIQUE )?INDEX IF NOT EXISTS (\w+)")
+
+MIGRATIONS = [
+    # Content hash of the uploaded file, used by the extraction cache
+    "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_content_hash ON invoices (content_hash)",
+    # Keyset pagination seeks on (coalesce(sort column), id); see sort_key_expression in invoice_repository.py
+    "CREATE INDEX IF NOT EXISTS ix_invoices_vendor_name_keyset ON invoices ((coalesce(vendor_name, '')), id)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_customer_name_keyset ON invoices ((coalesce(customer_name, '')), id)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_invoice_number_keyset ON invoices ((coalesce(invoice_number, '')), id)",
+    # Postgres does not index foreign keys; item counts and per-page item loads look items up by invoice
+    "CREATE INDEX IF NOT EXISTS ix_items_invoice_id ON items (invoice_id)",
+    # Trigram indexes so search (ILIKE '%term%' and similarity ranking) does not scan every row
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_invoice_number_trgm ON invoices USING gin (invoice_number gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_vendor_name_trgm ON invoices USING gin (vendor_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_customer_name_trgm ON invoices USING gin (customer_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_items_item_description_trgm ON items USING gin (item_description gin_trgm_ops)",
+    # Typed date / amount columns next to the raw strings; existing rows: python -m app.db.backfill
+    "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS invoice_date_value DATE",
+    "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS total_amount_value NUMERIC(14, 2)",
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS quantity_value NUMERIC(14, 3)",
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS unit_price_value NUMERIC(14, 2)",
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS total_amount_value NUMERIC(14, 2)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_invoice_date_value ON invoices (invoice_date_value)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_total_amount_value ON invoices (total_amount_value)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_invoice_date_value_keyset ON invoices ((coalesce(invoice_date_value, '0001-01-01'::date)), id)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_total_amount_value_keyset ON invoices ((coalesce(total_amount_value, '-1e18'::numeric)), id)",
+    # Date sorting moved to invoice_date_value
+    "DROP INDEX IF EXISTS ix_invoices_invoice_date_keyset",
+    # Analytics rollup, see app/db/rollup.py
+    """CREATE TABLE IF NOT EXISTS invoice_rollup (
+        month DATE NOT NULL,
+        vendor_name VARCHAR NOT NULL,
+        customer_name VARCHAR NOT NULL,
+        invoice_count INTEGER NOT NULL DEFAULT 0,
+        total_amount NUMERIC(18, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, vendor_name, customer_name)
+    )""",
+    # Optimistic concurrency for updates
+    "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    # Bulk import progress, see app/services/import_service.py
+    """CREATE TABLE IF NOT EXISTS import_checkpoints (
+        import_id VARCHAR PRIMARY KEY,
+        source VARCHAR,
+        fingerprint VARCHAR(64),
+        status VARCHAR NOT NULL,
+        records_done BIGINT NOT NULL DEFAULT 0,
+        invoices_created BIGINT NOT NULL DEFAULT 0,
+        invoices_skipped BIGINT NOT NULL DEFAULT 0,
+        items_created BIGINT NOT NULL DEFAULT 0,
+        invalid_records BIGINT NOT NULL DEFAULT 0,
+        error VARCHAR,
+        started_at TIMESTAMPTZ DEFAULT now(),
+        updated_at TIMESTAMPTZ DEFAULT now()
+    )""",
+]
+
+
+def unique_key_migrations(key_columns):
+    """Unique index for INVOICE_UNIQUE_KEY, replacing the original invoice_number constraint.
+
+    Returns (index name, statements). The index is on coalesce(column, '') so NULLs
+    count as equal; InvoiceRepository's ON CONFLICT targets the same expressions.
+    """
+    index_name = "ux_invoices_key_" + "_".join(key_columns)
+    expressions = ", ".join(f"coalesce({column}, '')" for column in key_columns)
+    return index_name, [
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON invoices ({expressions})",
+        "ALTER TABLE invoices DROP CONSTRAINT IF EXISTS invoices_invoice_number_key",
+    ]
+
+
+# The original model's Column(String, unique=True, index=True) made this a unique
+# index (not a constraint); it would keep enforcing invoice_number alone
+LEGACY_UNIQUE_INDEX = "ix_invoices_invoice_number"
+
+
+def legacy_unique_index_migrations():
+    """Statements replacing the original unique invoice_number index with a plain one"""
+    return [
+        f"DROP INDEX CONCURRENTLY IF EXISTS {LEGACY_UNIQUE_INDEX}",
+        f"CREATE INDEX IF NOT EXISTS {LEGACY_UNIQUE_INDEX} ON invoices (invoice_number)",
+    ]
+
+
+def concurrent_index(statement: str):
+    """(index name, CONCURRENTLY form) of a CREATE INDEX statement, or None for other DDL"""
+    match = INDEX_RE.match(statement)
+    if match is None:
+        return None
+    return match.group(2), INDEX_RE.sub(lambda m: f"CREATE {m.group(1) or ''}INDEX CONCURRENTLY IF NOT EXISTS {m.group(2)}", statement, count=1)
+
+
+async def drop_invalid_index(conn, index_name: str):
+    """Drop what a failed CONCURRENTLY build left behind; IF NOT EXISTS would keep it forever"""
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = current_schema() AND c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name}
+    )
+    if result.first() is not None:
+        logger.warning("Dropping invalid index %s left by an interrupted build", index_name)
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+
+async def apply(conn, statement: str):
+    index = concurrent_index(statement)
+    if index is None:
+        await conn.execute(text(statement))
+        return
+    index_name, concurrent_statement = index
+    await drop_invalid_index(conn, index_name)
+    await conn.execute(text(concurrent_statement))
+
+
+async def is_unique_index(conn, index_name: str):
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = current_schema() AND c.relname = :name AND i.indisunique"
+        ),
+        {"name": index_name}
+    )
+    return result.first() is not None
+
+
+async def check_unique_key(conn, index_name: str, key_columns):
+    """Refuse to switch INVOICE_UNIQUE_KEY while existing rows violate the new key"""
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = :name"),
+        {"name": index_name}
+    )
+    if result.first() is not None:
+        return
+    expressions = ", ".join(f"coalesce({column}, '')" for column in key_columns)
+    result = await conn.execute(
+        text(f"SELECT count(*) FROM (SELECT 1 FROM invoices GROUP BY {expressions} HAVING count(*) > 1) duplicates")
+    )
+    duplicates = result.scalar_one()
+    if duplicates:
+        raise ValueError(
+            f"Cannot enforce INVOICE_UNIQUE_KEY={','.join(key_columns)}: {duplicates} keys have more than one invoice. "
+            "Merge or delete the duplicates, or keep the previous key; nothing was changed."
+        )
+
+
+async def run_migrations():
+    key_columns = unique_key_columns()
+    index_name, key_statements = unique_key_migrations(key_columns)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    logger.info("Applying %s schema migrations", len(MIGRATIONS) + len(key_statements))
+    # Autocommit: CREATE INDEX CONCURRENTLY cannot run inside a transaction, and each
+    # statement only holds its locks for as long as it runs
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in MIGRATIONS:
+            await apply(conn, statement)
+
+        await check_unique_key(conn, index_name, key_columns)
+        for statement in key_statements:
+            await apply(conn, statement)
+        # Only once the INVOICE_UNIQUE_KEY index exists, so uniqueness is never unenforced
+        if await is_unique_index(conn, LEGACY_UNIQUE_INDEX):
+            logger.info("Replacing unique index %s with a non-unique one", LEGACY_UNIQUE_INDEX)
+            for statement in legacy_unique_index_migrations():
+                await apply(conn, statement)
+        # An index for a previous INVOICE_UNIQUE_KEY would keep enforcing the old key
+        result = await conn.execute(
+            text(
+                "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'invoices' "
+                "AND indexname LIKE 'ux\\_invoices\\_key\\_%' AND indexname <> :current"
+            ),
+            {"current": index_name}
+        )
+        for (stale_index,) in result.all():
+            logger.info("Dropping unique index %s of a previous INVOICE_UNIQUE_KEY", stale_index)
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {stale_index}"))
+    logger.info("Schema migrations applied")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migrations())
@@ -0,0 +1,47 @@
+"""
+Full rebuild of the invoice_rollup analytics table.
+
+With ANALYTICS_ROLLUP_ENABLED every invoice insert / update applies its delta to
+invoice_rollup in the same transaction. Run this once after enabling it (and any
+time the table is suspected to have drifted):
+
+    python -m app.db.rollup
+
+The rebuild is a TRUNCATE plus one grouped INSERT in a single transaction. Writers
+that touch the rollup meanwhile wait on its lock and apply their deltas afterwards,
+so nothing is counted twice or lost.
+"""
+import asyncio
+from sqlalchemy import text
+from app.core.logger import logger
+from app.db.session import engine
+
+# Rollup rows of the invoices in `source` (a table, or a CTE with the same columns);
+# the bulk import adds the ones of each batch it merges
+ROLLUP_INSERT = """
+    INSERT INTO invoice_rollup (month, vendor_name, customer_name, invoice_count, total_amount)
+    SELECT coalesce(date_trunc('month', invoice_date_value)::date, DATE '0001-01-01'),
+           coalesce(vendor_name, ''),
+           coalesce(customer_name, ''),
+           count(*),
+           coalesce(sum(total_amount_value), 0)
+    FROM {source}
+    GROUP BY 1, 2, 3
+"""
+
+REBUILD = [
+    "TRUNCATE invoice_rollup",
+    ROLLUP_INSERT.format(source="invoices"),
+]
+
+
+async def rebuild_rollup():
+    logger.info("Rebuilding invoice_rollup")
+    async with engine.begin() as conn:
+        for statement in REBUILD:
+            result = await conn.execute(text(statement))
+    logger.info("invoice_rollup rebuilt with %s rows", result.rowcount)
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_rollup())
@@ -1,17 +1,125 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, request_queries
+from app.core.tracing import tracer
 from typing import AsyncGenerator
 
+pool_wait_seconds = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection")
+pool_events = {"connects": 0, "checkouts": 0, "invalidations": 0, "timeouts": 0}
+db_queries = Counter("db_queries_total", "SQL statements executed")
+db_query_seconds = Histogram("db_query_duration_seconds", "Time per SQL statement, as seen by the driver")
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_events["timeouts"] += 1
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - started)
+
+
+connect_args = {}
+if "asyncpg" in settings.DATABASE_URL:
+    connect_args = {
+        # SQLAlchemy's per-connection cache of prepared statements
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        # asyncpg's own statement cache; set both to 0 behind PgBouncer in transaction mode
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
 engine = create_async_engine(
     settings.DATABASE_URL, 
     echo=False, 
-    future=True
+    future=True,
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=connect_args
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_events["connects"] += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_events["checkouts"] += 1
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_events["invalidations"] += 1
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    if tracer.enabled:
+        conn.info.setdefault("query_spans", []).append(tracer.span(
+            "db.query", **{"db.system": "postgresql", "db.statement": statement[:1000], "db.executemany": executemany}
+        ))
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    if conn.info.get("query_spans"):
+        conn.info["query_spans"].pop().end()
+    db_queries.inc()
+    db_query_seconds.observe(elapsed)
+    queries = request_queries.get()
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += elapsed
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _on_query_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+    if connection is not None and connection.info.get("query_spans"):
+        span = connection.info["query_spans"].pop()
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+Gauge("db_pool_checked_out", "Connections currently checked out of the pool", function=lambda: engine.pool.checkedout())
+Gauge("db_pool_overflow", "Connections open beyond pool_size", function=lambda: engine.pool.overflow())
+
+
+def pool_stats():
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        **pool_events,
+        "wait_seconds": pool_wait_seconds.snapshot(),
+    }
+
 # Async session factory
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False, autocommit=False)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
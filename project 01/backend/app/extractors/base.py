@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+
+
+class ExtractionResult:
+    """Raw JSON produced by an extractor plus how much it trusts it (0.0 - 1.0)"""
+
+    def __init__(self, content: str, confidence: float = 1.0, backend: str = ""):
+        self.content = content
+        self.confidence = confidence
+        self.backend = backend
+
+
+class Extractor(ABC):
+    """Turns an invoice image or invoice text into the JSON shape described in
+    app/utils/openai_utils.PROMPT. Register implementations in app/extractors/registry.py.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False) -> ExtractionResult:
+        ...
+
+    @abstractmethod
+    async def extract_text(self, invoice_text: str) -> ExtractionResult:
+        ...
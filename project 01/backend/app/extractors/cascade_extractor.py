@@ -0,0 +1,40 @@
+from app.core.config import settings
+from app.core.logger import logger
+from app.extractors.base import Extractor, ExtractionResult
+
+
+class CascadeExtractor(Extractor):
+    """Try a cheap extractor first and only pay for the expensive one when the
+    cheap result's confidence is below CASCADE_MIN_CONFIDENCE (or it fails).
+    """
+
+    name = "cascade"
+
+    def __init__(self, primary: Extractor, fallback: Extractor, min_confidence: float = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.min_confidence = settings.CASCADE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    async def _run(self, primary_call, fallback_call) -> ExtractionResult:
+        try:
+            result = await primary_call()
+            if result.confidence >= self.min_confidence:
+                logger.info("Cascade: %s confidence %s, using it", self.primary.name, result.confidence)
+                return result
+            logger.info("Cascade: %s confidence %s below %s, falling back to %s", self.primary.name, result.confidence, self.min_confidence, self.fallback.name)
+        except Exception as e:
+            logger.warning("Cascade: %s failed, falling back to %s: %s", self.primary.name, self.fallback.name, e)
+        return await fallback_call()
+
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False) -> ExtractionResult:
+        # The fallback may still need the bytes, so the primary never releases them
+        return await self._run(
+            lambda: self.primary.extract_image(image_bytes, mime_type),
+            lambda: self.fallback.extract_image(image_bytes, mime_type, release_upload)
+        )
+
+    async def extract_text(self, invoice_text: str) -> ExtractionResult:
+        return await self._run(
+            lambda: self.primary.extract_text(invoice_text),
+            lambda: self.fallback.extract_text(invoice_text)
+        )
@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+import json
+import random
+from app.core.config import settings
+from app.extractors.base import Extractor, ExtractionResult
+
+VENDORS = ["Tech Solutions Inc", "Global Supply Co", "Premium Services Ltd", "Digital Innovations", "Smart Systems Corp"]
+CUSTOMERS = ["ABC Corporation", "XYZ Industries", "Metro Business Group", "City Center Mall", "Downtown Enterprises"]
+ITEMS = ["Office Supplies Bundle", "Computer Hardware", "Software License", "Printing Services", "Technical Support"]
+
+
+def fake_invoice(seed: str) -> dict:
+    """Deterministic invoice for a seed: the same input always yields the same invoice"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(rng.randint(1, 8)):
+        quantity = rng.randint(1, 20)
+        unit_price = round(rng.uniform(10, 500), 2)
+        items.append({
+            "item_description": rng.choice(ITEMS),
+            "quantity": str(quantity),
+            "unit_price": f"{unit_price:.2f}",
+            "total_amount": f"{quantity * unit_price:.2f}"
+        })
+    return {
+        "invoice_number": f"FAKE-{seed[:12].upper()}",
+        "invoice_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "customer_name": rng.choice(CUSTOMERS),
+        "vendor_name": rng.choice(VENDORS),
+        "total_amount": f"{sum(float(item['total_amount']) for item in items):.2f}",
+        "items": items
+    }
+
+
+class FakeExtractor(Extractor):
+    """No-network extractor for tests and benchmarks.
+
+    Derives the invoice from the SHA-256 of the input, so distinct files become
+    distinct invoices and re-uploads become duplicates, like with the real model.
+    """
+
+    name = "fake"
+
+    async def _extract(self, payload) -> ExtractionResult:
+        if settings.FAKE_EXTRACTOR_LATENCY_SECONDS:
+            await asyncio.sleep(settings.FAKE_EXTRACTOR_LATENCY_SECONDS)
+        seed = hashlib.sha256(payload).hexdigest()
+        return ExtractionResult(json.dumps(fake_invoice(seed)), 1.0, self.name)
+
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False) -> ExtractionResult:
+        return await self._extract(image_bytes)
+
+    async def extract_text(self, invoice_text: str) -> ExtractionResult:
+        return await self._extract(invoice_text.encode("utf-8"))
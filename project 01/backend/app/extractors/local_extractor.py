@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+import re
+from app.core.config import settings
+from app.extractors.base import Extractor, ExtractionResult
+from app.utils.image_utils import get_executor
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # Local OCR is optional
+    pytesseract = None
+
+HEADER_FIELDS = ("invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount")
+
+INVOICE_NUMBER_RE = re.compile(
+    r"(?:invoice|inv|bill)\s*(?:no\.?|number|num|#)\s*[:\-]?\s*([A-Z0-9][A-Z0-9\-/]*)", re.IGNORECASE
+)
+DATE_VALUE = r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[./-]\d{1,2}[./-]\d{2,4})"
+# Due, order and delivery dates often come first; the invoice / issue date wins over them
+INVOICE_DATE_RE = re.compile(
+    r"(?:invoice|inv\.?|bill(?:ing)?|issue|issued)\s*date\s*[:\-]?\s*" + DATE_VALUE, re.IGNORECASE
+)
+DATE_RE = re.compile(r"date\s*[:\-]?\s*" + DATE_VALUE, re.IGNORECASE)
+CUSTOMER_RE = re.compile(r"(?:bill(?:ed)?\s+to|sold\s+to|customer(?:\s+name)?)\s*[:\-]?\s*(.*)", re.IGNORECASE)
+VENDOR_RE = re.compile(r"(?:from|vendor(?:\s+name)?|seller|supplier)\s*[:\-]\s*(.*)", re.IGNORECASE)
+TOTAL_RE = re.compile(
+    r"(?:grand\s+total|total\s+amount|amount\s+due|net\s+amount|total)\s*[:\-]?\s*\D{0,5}([\d,]+\.\d{2})", re.IGNORECASE
+)
+# description, quantity, unit price, line total
+ITEM_RE = re.compile(r"^\s*(?:\d+[.)]?\s+)?(.+?)\s+(\d+(?:\.\d+)?)\s+\D{0,3}([\d,]+\.\d{2})\s+\D{0,3}([\d,]+\.\d{2})\s*$")
+SKIPPED_VENDOR_LINES = ("invoice", "tax invoice", "bill", "receipt", "original", "duplicate")
+
+
+def _amount(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+def _next_non_empty(lines, index):
+    for line in lines[index + 1:index + 3]:
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+def parse_invoice_text(text: str):
+    """Rule-based parse of OCR / PDF text into the extraction JSON shape.
+
+    Returns (invoice_dict, confidence). Confidence is the share of header fields
+    found, boosted when the line items add up to the total.
+    """
+    lines = [line.rstrip() for line in text.splitlines()]
+    invoice = {field: "" for field in HEADER_FIELDS}
+    invoice["items"] = []
+
+    match = INVOICE_NUMBER_RE.search(text)
+    if match:
+        invoice["invoice_number"] = match.group(1)
+    match = INVOICE_DATE_RE.search(text) or DATE_RE.search(text)
+    if match:
+        invoice["invoice_date"] = match.group(1)
+    totals = TOTAL_RE.findall(text)
+    if totals:
+        invoice["total_amount"] = f"{_amount(totals[-1]):.2f}"
+
+    for index, line in enumerate(lines):
+        if not invoice["customer_name"]:
+            match = CUSTOMER_RE.match(line.strip())
+            if match:
+                invoice["customer_name"] = match.group(1).strip() or _next_non_empty(lines, index)
+        if not invoice["vendor_name"]:
+            match = VENDOR_RE.match(line.strip())
+            if match:
+                invoice["vendor_name"] = match.group(1).strip() or _next_non_empty(lines, index)
+        match = ITEM_RE.match(line)
+        if match and not TOTAL_RE.search(line):
+            description, quantity, unit_price, line_total = match.groups()
+            invoice["items"].append({
+                "item_description": description.strip(),
+                "quantity": quantity,
+                "unit_price": f"{_amount(unit_price):.2f}",
+                "total_amount": f"{_amount(line_total):.2f}"
+            })
+
+    if not invoice["vendor_name"]:
+        # Invoices usually open with the issuer's name
+        for line in lines:
+            if line.strip() and line.strip().lower() not in SKIPPED_VENDOR_LINES:
+                invoice["vendor_name"] = line.strip()
+                break
+
+    confidence = 0.6 * sum(1 for field in HEADER_FIELDS if invoice[field]) / len(HEADER_FIELDS)
+    if invoice["items"]:
+        confidence += 0.1
+        if invoice["total_amount"]:
+            items_total = sum(_amount(item["total_amount"]) for item in invoice["items"])
+            if abs(items_total - _amount(invoice["total_amount"])) <= max(0.01, 0.01 * items_total):
+                confidence += 0.3
+    return invoice, round(confidence, 3)
+
+
+def _ocr_image(image_bytes, lang: str):
+    """Tesseract OCR; runs in the process pool"""
+    return pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)), lang=lang)
+
+
+class LocalOCRExtractor(Extractor):
+    """Offline extraction: Tesseract OCR plus rule-based field parsing.
+
+    Free and fast for clean, conventionally laid out invoices; the confidence
+    score tells the cascade backend when to fall back to the model.
+    """
+
+    name = "local"
+
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False) -> ExtractionResult:
+        if pytesseract is None:
+            raise ValueError("The local extractor requires pytesseract, Pillow and the tesseract binary")
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(get_executor(), _ocr_image, bytes(image_bytes), settings.TESSERACT_LANG)
+        return await self.extract_text(text)
+
+    async def extract_text(self, invoice_text: str) -> ExtractionResult:
+        invoice, confidence = parse_invoice_text(invoice_text)
+        return ExtractionResult(json.dumps(invoice), confidence, self.name)
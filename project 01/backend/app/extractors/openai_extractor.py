@@ -0,0 +1,16 @@
+from app.extractors.base import Extractor, ExtractionResult
+from app.utils.openai_utils import extract_invoice_data, extract_invoice_text
+
+
+class OpenAIExtractor(Extractor):
+    """GPT-4o vision / text extraction (the original backend)"""
+
+    name = "openai"
+
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False) -> ExtractionResult:
+        content = await extract_invoice_data(image_bytes, mime_type, release_upload)
+        return ExtractionResult(content, 1.0, self.name)
+
+    async def extract_text(self, invoice_text: str) -> ExtractionResult:
+        content = await extract_invoice_text(invoice_text)
+        return ExtractionResult(content, 1.0, self.name)
@@ -0,0 +1,30 @@
+from app.core.config import settings
+from app.extractors.base import Extractor
+from app.extractors.cascade_extractor import CascadeExtractor
+from app.extractors.fake_extractor import FakeExtractor
+from app.extractors.local_extractor import LocalOCRExtractor
+from app.extractors.openai_extractor import OpenAIExtractor
+
+EXTRACTORS = {
+    "openai": OpenAIExtractor,
+    "local": LocalOCRExtractor,
+    "fake": FakeExtractor,
+    "cascade": lambda: CascadeExtractor(LocalOCRExtractor(), OpenAIExtractor()),
+}
+
+_instances = {}
+
+
+def register_extractor(name: str, factory):
+    """Add a backend selectable through EXTRACTOR_BACKEND; `factory` returns an Extractor"""
+    EXTRACTORS[name] = factory
+    _instances.pop(name, None)
+
+
+def get_extractor(name: str = None) -> Extractor:
+    name = (name or settings.EXTRACTOR_BACKEND).lower()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor backend '{name}', expected one of {sorted(EXTRACTORS)}")
+    if name not in _instances:
+        _instances[name] = EXTRACTORS[name]()
+    return _instances[name]
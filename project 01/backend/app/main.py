@@ -1,9 +1,18 @@
 from app.core.logger import logger
+import time
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.metrics import Histogram, QueryCounter, request_queries
+from app.core.tracing import tracer
 from app.api.invoice_router import router as invoice_router
 from app.api.health_router import router as health_router
+from app.api.job_router import router as job_router
+from app.api.analytics_router import router as analytics_router
+from app.services.job_queue import job_queue
+from app.utils.image_utils import shutdown_executor
 
 app = FastAPI()
 
@@ -16,16 +25,69 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before the body is parsed"""
+    content_length = request.headers.get("content-length")
+    if request.method == "POST" and content_length and content_length.isdigit():
+        if request.url.path == "/upload-invoices/batch":
+            limit = settings.MAX_BATCH_UPLOAD_BYTES
+        elif request.url.path == "/invoices/import":
+            limit = settings.MAX_IMPORT_BYTES
+        else:
+            limit = settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        if int(content_length) > limit:
+            logger.warning("Rejecting %s request of %s bytes (limit %s)", request.url.path, content_length, limit)
+            return JSONResponse(status_code=413, content={"detail": f"Request body exceeds the limit of {limit} bytes"})
+    return await call_next(request)
+
+request_seconds = Histogram("http_request_duration_seconds", "Request latency until the response starts", labelnames=("method", "route", "status"))
+request_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements per request",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100), labelnames=("method", "route")
+)
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Latency and SQL statement count per route (the route template, so ids do not explode
+    the labels), and the root span of the request's trace"""
+    queries = QueryCounter()
+    token = request_queries.set(queries)
+    started = time.perf_counter()
+    status = 500
+    with tracer.span(f"HTTP {request.method}", **{"http.method": request.method, "http.target": request.url.path}) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            span.set_name(f"HTTP {request.method} {path}")
+            span.set_attribute("http.route", path)
+            span.set_attribute("http.status_code", status)
+            request_seconds.observe(time.perf_counter() - started, method=request.method, route=path, status=status)
+            request_db_queries.observe(queries.count, method=request.method, route=path)
+            request_queries.reset(token)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application startup")
+    await job_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown")
+    await job_queue.stop()
+    shutdown_executor()
 
 app.include_router(invoice_router)
 app.include_router(health_router)
+app.include_router(job_router)
+app.include_router(analytics_router)
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
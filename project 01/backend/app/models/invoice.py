@@ -1,23 +1,58 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Date, DateTime, Numeric, func
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 class Invoice(Base):
 	__tablename__ = 'invoices'
 	id = Column(Integer, primary_key=True, index=True)
-	invoice_number = Column(String, unique=True, index=True)
+	invoice_number = Column(String, index=True)  # Uniqueness per INVOICE_UNIQUE_KEY, see app/db/migrations.py
 	invoice_date = Column(String)
 	customer_name = Column(String)
 	vendor_name = Column(String)
 	total_amount = Column(String)
+	content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
+	# Typed copies of the raw strings above, see app/utils/parse_utils.py
+	invoice_date_value = Column(Date, index=True)
+	total_amount_value = Column(Numeric(14, 2), index=True)
+	version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every update, see InvoiceRepository.update_invoice
 	items = relationship("Item", back_populates="invoice")
 
 class Item(Base):
 	__tablename__ = 'items'
 	id = Column(Integer, primary_key=True, index=True)
-	invoice_id = Column(Integer, ForeignKey('invoices.id'))
+	invoice_id = Column(Integer, ForeignKey('invoices.id'), index=True)
 	item_description = Column(String)
 	quantity = Column(String)
 	unit_price = Column(String)
 	total_amount = Column(String)
+	quantity_value = Column(Numeric(14, 3))
+	unit_price_value = Column(Numeric(14, 2))
+	total_amount_value = Column(Numeric(14, 2))
 	invoice = relationship("Invoice", back_populates="items")
+
+class InvoiceRollup(Base):
+	"""Invoice count and spend per month / vendor / customer, kept up to date by
+	InvoiceRepository writes when ANALYTICS_ROLLUP_ENABLED (see app/db/rollup.py)"""
+	__tablename__ = 'invoice_rollup'
+	month = Column(Date, primary_key=True)  # 0001-01-01 when the invoice date did not parse
+	vendor_name = Column(String, primary_key=True)  # '' for NULL
+	customer_name = Column(String, primary_key=True)  # '' for NULL
+	invoice_count = Column(Integer, nullable=False, default=0)
+	total_amount = Column(Numeric(18, 2), nullable=False, default=0)
+
+class ImportCheckpoint(Base):
+	"""Progress of a bulk import, committed with every batch so a failed import
+	resumes after the last loaded record (see app/services/import_service.py)"""
+	__tablename__ = 'import_checkpoints'
+	import_id = Column(String, primary_key=True)
+	source = Column(String)
+	fingerprint = Column(String(64))  # SHA-256 of the input; a different file cannot resume this import
+	status = Column(String, nullable=False)  # running, failed or completed
+	records_done = Column(BigInteger, nullable=False, default=0)  # Input records consumed, valid or not
+	invoices_created = Column(BigInteger, nullable=False, default=0)
+	invoices_skipped = Column(BigInteger, nullable=False, default=0)  # Unique key already present
+	items_created = Column(BigInteger, nullable=False, default=0)
+	invalid_records = Column(BigInteger, nullable=False, default=0)
+	error = Column(String)
+	started_at = Column(DateTime(timezone=True), server_default=func.now())
+	updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,139 @@
+from app.models.invoice import Invoice, Item, InvoiceRollup
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, and_, case, cast, Date, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date
+from decimal import Decimal
+
+# Rollup key for invoices whose date did not parse
+UNKNOWN_MONTH = date(1, 1, 1)
+
+# Grouping keys are literal SQL (not bound parameters) so the SELECT and GROUP BY
+# expressions are identical; Postgres rejects them otherwise
+EMPTY = literal_column("''")
+SPEND_KEYS = {
+    "vendor": func.coalesce(Invoice.vendor_name, EMPTY),
+    "customer": func.coalesce(Invoice.customer_name, EMPTY),
+    "month": cast(func.date_trunc(literal_column("'month'"), Invoice.invoice_date_value), Date),
+}
+ROLLUP_SPEND_KEYS = {
+    "vendor": InvoiceRollup.vendor_name,
+    "customer": InvoiceRollup.customer_name,
+    "month": InvoiceRollup.month,
+}
+
+
+def rollup_entry(invoice):
+    """(rollup key, amount) of an Invoice, or anything with the same attributes"""
+    date_value = invoice.invoice_date_value
+    month = date_value.replace(day=1) if date_value else UNKNOWN_MONTH
+    key = (month, invoice.vendor_name or "", invoice.customer_name or "")
+    return key, invoice.total_amount_value or Decimal(0)
+
+
+def rollup_deltas(added=(), removed=()):
+    """Net {key: (invoice_count, total_amount)} change for rollup entries entering / leaving"""
+    deltas = {}
+    for entries, sign in ((added, 1), (removed, -1)):
+        for key, amount in entries:
+            count, total = deltas.get(key, (0, Decimal(0)))
+            deltas[key] = (count + sign, total + sign * amount)
+    return deltas
+
+
+class AnalyticsRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply_rollup_deltas(self, deltas: dict):
+        """Add deltas to invoice_rollup with one multi-row upsert.
+
+        Runs in the caller's transaction, so the rollup commits (or rolls back)
+        together with the invoices it describes. Keys are sorted so concurrent
+        writers lock rollup rows in the same order.
+        """
+        rows = [
+            {"month": month, "vendor_name": vendor, "customer_name": customer, "invoice_count": count, "total_amount": amount}
+            for (month, vendor, customer), (count, amount) in sorted(deltas.items())
+            if count or amount
+        ]
+        if not rows:
+            return
+        statement = pg_insert(InvoiceRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[InvoiceRollup.month, InvoiceRollup.vendor_name, InvoiceRollup.customer_name],
+            set_={
+                "invoice_count": InvoiceRollup.invoice_count + statement.excluded.invoice_count,
+                "total_amount": InvoiceRollup.total_amount + statement.excluded.total_amount,
+            }
+        )
+        await self.db.execute(statement)
+
+    async def spend_by(self, group_by: str, date_from: date = None, date_to: date = None, limit: int = 20, use_rollup: bool = False):
+        """Invoice count and spend per vendor, customer or month, in one grouped query.
+
+        With use_rollup the (much smaller) invoice_rollup table is read instead of
+        invoices; date bounds must then be whole months.
+        """
+        if use_rollup:
+            key = ROLLUP_SPEND_KEYS[group_by]
+            invoice_count = func.sum(InvoiceRollup.invoice_count)
+            total_amount = func.sum(InvoiceRollup.total_amount)
+            date_column = InvoiceRollup.month
+        else:
+            key = SPEND_KEYS[group_by]
+            invoice_count = func.count(Invoice.id)
+            total_amount = func.coalesce(func.sum(Invoice.total_amount_value), 0)
+            date_column = Invoice.invoice_date_value
+
+        query = select(key.label("key"), invoice_count.label("invoice_count"), total_amount.label("total_amount"))
+        if date_from:
+            query = query.where(date_column >= date_from)
+        if date_to:
+            query = query.where(date_column <= date_to)
+        if use_rollup and (date_from or date_to):
+            # Invoices without a parsed date never match a date bound (NULL comparison);
+            # their rollup month is UNKNOWN_MONTH, which <= date_to would otherwise keep
+            query = query.where(InvoiceRollup.month != UNKNOWN_MONTH)
+        query = query.group_by(key)
+        if group_by == "month":
+            query = query.order_by(key.asc())
+        else:
+            query = query.order_by(total_amount.desc(), key.asc())
+        result = await self.db.execute(query.limit(limit))
+        return result.all()
+
+    async def top_items(self, order_by: str = "spend", limit: int = 10, date_from: date = None, date_to: date = None):
+        """Line items grouped by description (case and surrounding spaces ignored)"""
+        description = func.lower(func.trim(Item.item_description))
+        measures = {
+            "spend": func.coalesce(func.sum(Item.total_amount_value), 0),
+            "quantity": func.coalesce(func.sum(Item.quantity_value), 0),
+            "count": func.count(Item.id),
+        }
+        query = select(
+            func.min(Item.item_description).label("item_description"),
+            measures["count"].label("line_count"),
+            func.count(func.distinct(Item.invoice_id)).label("invoice_count"),
+            measures["quantity"].label("quantity"),
+            measures["spend"].label("total_amount")
+        )
+        if date_from or date_to:
+            query = query.join(Invoice, Invoice.id == Item.invoice_id)
+            if date_from:
+                query = query.where(Invoice.invoice_date_value >= date_from)
+            if date_to:
+                query = query.where(Invoice.invoice_date_value <= date_to)
+        query = query.group_by(description).order_by(measures[order_by].desc()).limit(limit)
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def status_counts(self):
+        """Invoices by parse status: complete when the date and total parsed, needs_review otherwise"""
+        status = case(
+            (and_(Invoice.invoice_date_value.is_not(None), Invoice.total_amount_value.is_not(None)), literal_column("'complete'")),
+            else_=literal_column("'needs_review'")
+        )
+        result = await self.db.execute(select(status.label("status"), func.count(Invoice.id)).group_by(status))
+        return dict(result.all())
@@ -0,0 +1,173 @@
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import timed_async
+from app.db.rollup import ROLLUP_INSERT
+from app.models.invoice import ImportCheckpoint
+from app.repositories.invoice_repository import repository_seconds, unique_key_columns
+from app.utils.import_utils import STAGE_INVOICE_COLUMNS, STAGE_ITEM_COLUMNS
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Per-connection staging tables; ON COMMIT DELETE ROWS empties them with every batch
+STAGING_TABLES = [
+    """CREATE TEMP TABLE IF NOT EXISTS import_invoices_stage (
+        seq INTEGER NOT NULL,
+        invoice_number VARCHAR,
+        invoice_date VARCHAR,
+        customer_name VARCHAR,
+        vendor_name VARCHAR,
+        total_amount VARCHAR,
+        invoice_date_value DATE,
+        total_amount_value NUMERIC(14, 2)
+    ) ON COMMIT DELETE ROWS""",
+    """CREATE TEMP TABLE IF NOT EXISTS import_items_stage (
+        invoice_seq INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        item_description VARCHAR,
+        quantity VARCHAR,
+        unit_price VARCHAR,
+        total_amount VARCHAR,
+        quantity_value NUMERIC(14, 3),
+        unit_price_value NUMERIC(14, 2),
+        total_amount_value NUMERIC(14, 2)
+    ) ON COMMIT DELETE ROWS""",
+]
+
+INVOICE_INSERT_COLUMNS = ", ".join(STAGE_INVOICE_COLUMNS[1:])
+ITEM_INSERT_COLUMNS = ", ".join(STAGE_ITEM_COLUMNS[2:])
+
+
+class ImportCheckpointConflictError(ValueError):
+    """Another run of the same import moved its checkpoint, or a different file reuses its import_id"""
+
+
+def merge_statement(key_columns, rollup: bool):
+    """One statement moving the staged batch into invoices / items (and invoice_rollup).
+
+    Duplicates inside the batch keep their first record; invoices whose unique key
+    already exists are skipped via ON CONFLICT on the ux_invoices_key index (see
+    app/db/migrations.py). Items follow the invoices that were actually inserted.
+    """
+    stage_key = ", ".join(f"coalesce(s.{column}, '')" for column in key_columns)
+    conflict_target = ", ".join(f"(coalesce({column}, ''))" for column in key_columns)
+    join = " AND ".join(f"coalesce(s.{column}, '') = coalesce(i.{column}, '')" for column in key_columns)
+    rollup_cte = ""
+    if rollup:
+        rollup_cte = f""",
+        rollup AS (
+            {ROLLUP_INSERT.format(source="inserted")}
+            ORDER BY 1, 2, 3
+            ON CONFLICT (month, vendor_name, customer_name) DO UPDATE SET
+                invoice_count = invoice_rollup.invoice_count + excluded.invoice_count,
+                total_amount = invoice_rollup.total_amount + excluded.total_amount
+        )"""
+    return text(f"""
+        WITH inserted AS (
+            INSERT INTO invoices ({INVOICE_INSERT_COLUMNS})
+            SELECT DISTINCT ON ({stage_key}) {", ".join(f"s.{column}" for column in STAGE_INVOICE_COLUMNS[1:])}
+            FROM import_invoices_stage s
+            ORDER BY {stage_key}, s.seq
+            ON CONFLICT ({conflict_target}) DO NOTHING
+            RETURNING id, invoice_number, invoice_date, customer_name, vendor_name, invoice_date_value, total_amount_value
+        ),
+        created AS (
+            SELECT DISTINCT ON ({stage_key}) s.seq, i.id
+            FROM inserted i JOIN import_invoices_stage s ON {join}
+            ORDER BY {stage_key}, s.seq
+        ),
+        new_items AS (
+            INSERT INTO items (invoice_id, {ITEM_INSERT_COLUMNS})
+            SELECT c.id, {", ".join(f"it.{column}" for column in STAGE_ITEM_COLUMNS[2:])}
+            FROM created c JOIN import_items_stage it ON it.invoice_seq = c.seq
+            ORDER BY c.id, it.position
+            RETURNING 1
+        ){rollup_cte}
+        SELECT (SELECT count(*) FROM inserted) AS invoices, (SELECT count(*) FROM new_items) AS items
+    """)
+
+
+class ImportRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_checkpoint(self, import_id: str):
+        result = await self.db.execute(
+            select(ImportCheckpoint)
+            .where(ImportCheckpoint.import_id == import_id)
+            .execution_options(populate_existing=True)  # Counters are advanced with plain UPDATEs
+        )
+        return result.scalar_one_or_none()
+
+    async def start_checkpoint(self, import_id: str, source: str, fingerprint: str, restart: bool = False):
+        """Create the checkpoint, or mark an existing one running again (from zero with restart)"""
+        checkpoint = await self.get_checkpoint(import_id)
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(import_id=import_id, source=source, fingerprint=fingerprint, status="running")
+            self.db.add(checkpoint)
+        elif restart:
+            checkpoint.fingerprint = fingerprint
+            checkpoint.records_done = 0
+            checkpoint.invoices_created = 0
+            checkpoint.invoices_skipped = 0
+            checkpoint.items_created = 0
+            checkpoint.invalid_records = 0
+        checkpoint.source = source
+        checkpoint.status = "running"
+        checkpoint.error = None
+        await self.db.commit()
+        await self.db.refresh(checkpoint)
+        return checkpoint
+
+    async def finish_checkpoint(self, import_id: str, status: str, error: str = None):
+        await self.db.rollback()
+        await self.db.execute(
+            text("UPDATE import_checkpoints SET status = :status, error = :error, updated_at = now() WHERE import_id = :import_id"),
+            {"status": status, "error": error, "import_id": import_id}
+        )
+        await self.db.commit()
+
+    @timed_async(repository_seconds, method="import_batch")
+    async def import_batch(self, import_id: str, records_before: int, record_count: int, invoice_rows: list, item_rows: list, invalid: int):
+        """COPY one batch into the staging tables, merge it and advance the checkpoint,
+        all in one transaction: a failed batch leaves no rows and no progress behind.
+
+        Returns (invoices created, items created).
+        """
+        for statement in STAGING_TABLES:
+            await self.db.execute(text(statement))
+        created = items = 0
+        if invoice_rows:
+            # COPY goes straight to asyncpg, on the connection (and transaction) of this session
+            connection = await self.db.connection()
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            await driver_connection.copy_records_to_table("import_invoices_stage", records=invoice_rows, columns=STAGE_INVOICE_COLUMNS)
+            if item_rows:
+                await driver_connection.copy_records_to_table("import_items_stage", records=item_rows, columns=STAGE_ITEM_COLUMNS)
+            result = await self.db.execute(merge_statement(unique_key_columns(), settings.ANALYTICS_ROLLUP_ENABLED))
+            created, items = result.one()
+
+        # Guarded by the old position, so two runs of the same import cannot both advance it
+        result = await self.db.execute(
+            text("""
+                UPDATE import_checkpoints SET
+                    records_done = records_done + :record_count,
+                    invoices_created = invoices_created + :created,
+                    invoices_skipped = invoices_skipped + :skipped,
+                    items_created = items_created + :items,
+                    invalid_records = invalid_records + :invalid,
+                    updated_at = now()
+                WHERE import_id = :import_id AND records_done = :records_before
+            """),
+            {
+                "record_count": record_count, "created": created, "skipped": len(invoice_rows) - created,
+                "items": items, "invalid": invalid, "import_id": import_id, "records_before": records_before,
+            }
+        )
+        if result.rowcount != 1:
+            await self.db.rollback()
+            raise ImportCheckpointConflictError(f"Import {import_id} was advanced by another run; retry to resume from its checkpoint")
+        await self.db.commit()
+        logger.debug("Import %s: merged %s invoices, %s items", import_id, created, items)
+        return created, items
@@ -3,26 +3,374 @@ from app.models.invoice import Invoice, Item
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func, or_, and_
-from app.core.logger import logger
-from datetime import datetime
+from sqlalchemy import func, or_, and_, text, tuple_, union, literal_column, insert, update, delete, exists, true, false
+from sqlalchemy import values, column, cast, case, Integer, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger, payload
+from app.core.metrics import Histogram, timed_async
+from app.utils.parse_utils import ITEM_TYPED_FIELDS
+from app.repositories.analytics_repository import AnalyticsRepository, rollup_deltas, rollup_entry
+from datetime import datetime, date
+from decimal import Decimal
+import base64
+import json
+
+SORTABLE_COLUMNS = {
+    "id": Invoice.id,
+    "invoice_number": Invoice.invoice_number,
+    "invoice_date": Invoice.invoice_date_value,
+    "customer_name": Invoice.customer_name,
+    "vendor_name": Invoice.vendor_name,
+    "total_amount": Invoice.total_amount_value,
+}
+
+# Header columns matched by `search`; each has a pg_trgm GIN index (see app/db/migrations.py)
+SEARCH_COLUMNS = (Invoice.invoice_number, Invoice.vendor_name, Invoice.customer_name)
+
+# Header columns the list endpoint projects directly, without building ORM objects
+LIST_COLUMNS = {
+    "id": Invoice.id,
+    "invoice_number": Invoice.invoice_number,
+    "invoice_date": Invoice.invoice_date,
+    "customer_name": Invoice.customer_name,
+    "vendor_name": Invoice.vendor_name,
+    "total_amount": Invoice.total_amount,
+}
+
+# Everything `fields=` accepts; item_count / item_total are computed in SQL, items costs one extra query
+LIST_FIELDS = tuple(LIST_COLUMNS) + ("item_count", "item_total", "items")
+
+# Filtered totals for count_mode=estimated; a short TTL keeps them close to exact
+repository_seconds = Histogram("db_repository_duration_seconds", "Time per InvoiceRepository call", labelnames=("method",))
+count_cache = TTLCache(max_size=1000, ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS, name="count_cache")
+
+
+# Columns INVOICE_UNIQUE_KEY may combine
+UNIQUE_KEY_CHOICES = ("invoice_number", "vendor_name", "customer_name", "invoice_date")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class InvoiceVersionConflictError(ValueError):
+    pass
+
+
+# Header columns a PUT may change; id, version and content_hash are managed here
+UPDATABLE_INVOICE_COLUMNS = {
+    "invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount",
+    "invoice_date_value", "total_amount_value",
+}
+# Returned by the header UPDATE: the response fields, the new version and the rollup key
+UPDATED_INVOICE_COLUMNS = (
+    Invoice.id, Invoice.invoice_number, Invoice.invoice_date, Invoice.customer_name, Invoice.vendor_name,
+    Invoice.total_amount, Invoice.version, Invoice.invoice_date_value, Invoice.total_amount_value,
+    Invoice.content_hash,
+)
+ITEM_RAW_COLUMNS = ("item_description", "quantity", "unit_price", "total_amount")
+# Header fields of GET /invoice/{id} and of the update response
+DETAIL_COLUMNS = (*LIST_COLUMNS.values(), Invoice.version)
+# One row per invoice line item, named as in app/utils/export_utils.py EXPORT_COLUMNS
+EXPORT_SELECT = (
+    *LIST_COLUMNS.values(), Invoice.invoice_date_value, Invoice.total_amount_value,
+    Item.id.label("item_id"), Item.item_description, Item.quantity, Item.unit_price,
+    Item.total_amount.label("item_total_amount"), Item.quantity_value, Item.unit_price_value,
+    Item.total_amount_value.label("item_total_amount_value"),
+)
+
+
+NULL_SORT_SENTINELS = {
+    str: "",
+    int: 0,
+    Decimal: Decimal("-1e18"),
+    date: date(1, 1, 1),
+}
+
+# The same sentinels as SQL literals; inlined rather than bound so that the sort
+# expression matches the keyset indexes in app/db/migrations.py
+NULL_SORT_LITERALS = {
+    str: "''",
+    int: "0",
+    Decimal: "'-1e18'::numeric",
+    date: "'0001-01-01'::date",
+}
+
+
+def sort_key_expression(column):
+    """Sort expression for keyset pagination; NULLs are folded into a sentinel
+    because a row comparison against NULL matches nothing"""
+    if column is Invoice.id:
+        return column
+    return func.coalesce(column, literal_column(NULL_SORT_LITERALS[column.type.python_type]))
+
+
+def encode_cursor(invoice, sort_by: str, sort_order: str, column):
+    value = getattr(invoice, column.key)
+    if value is None:
+        value = NULL_SORT_SENTINELS[column.type.python_type]
+    payload = {"s": sort_by, "o": sort_order.lower(), "v": str(value) if not isinstance(value, int) else value, "id": invoice.id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, sort_order: str, column):
+    """Returns (sort value, id); the cursor must come from the same sort as the request"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by or payload["o"] != sort_order.lower():
+            raise InvalidCursorError("Cursor was issued for a different sort, start again from the first page")
+        python_type = column.type.python_type
+        value = payload["v"]
+        if python_type is date:
+            value = date.fromisoformat(value)
+        elif python_type is not str:
+            value = python_type(value)
+        return value, int(payload["id"])
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def keyset_seek(query, sort_key, cursor_value, cursor_id, descending: bool):
+    """Rows strictly past (cursor_value, cursor_id) when walking in the given direction,
+    ordered that way; the row comparison matches the (sort key, id) keyset indexes"""
+    key, cursor = tuple_(sort_key, Invoice.id), tuple_(cursor_value, cursor_id)
+    if descending:
+        return query.where(key < cursor).order_by(sort_key.desc(), Invoice.id.desc())
+    return query.where(key > cursor).order_by(sort_key.asc(), Invoice.id.asc())
+
+
+def cursor_page(rows, limit: int, forward: bool, encode):
+    """Page of a cursor query fetched with limit + 1 rows.
+
+    Returns (rows in display order, next_cursor, prev_cursor, has_more). Walking
+    backwards (`before`) fetched the rows in reverse, so they are flipped back.
+    Coming from a cursor means there is a page on the side we came from.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows = list(reversed(rows))
+    next_cursor = prev_cursor = None
+    if rows:
+        next_cursor = encode(rows[-1]) if (has_more or not forward) else None
+        prev_cursor = encode(rows[0]) if (has_more or forward) else None
+    return rows, next_cursor, prev_cursor, has_more
+
+
+def search_rank_expression(search: str):
+    """Relevance of a row to `search`: pg_trgm word similarity (0..1) of the best matching header field"""
+    return func.greatest(*(func.word_similarity(search, func.coalesce(column, "")) for column in SEARCH_COLUMNS))
+
+
+def unique_key_columns():
+    """Columns of INVOICE_UNIQUE_KEY, e.g. ["vendor_name", "invoice_number"]"""
+    columns = [column.strip() for column in settings.INVOICE_UNIQUE_KEY.split(",") if column.strip()]
+    if not columns or any(column not in UNIQUE_KEY_CHOICES for column in columns):
+        raise ValueError(f"INVOICE_UNIQUE_KEY must be a comma separated list of {', '.join(UNIQUE_KEY_CHOICES)}")
+    return columns
+
+
+def unique_key_expressions(key_columns):
+    """coalesce(column, '') per key column: NULLs count as equal, and the expressions
+    match the unique index from app/db/migrations.py so ON CONFLICT can infer it"""
+    return [func.coalesce(getattr(Invoice, column), literal_column("''")) for column in key_columns]
+
+
+def unique_key(data, key_columns):
+    """Python side of unique_key_expressions for a dict / row mapping"""
+    return tuple(data.get(column) or "" for column in key_columns)
+
+
+def unique_key_match(key_columns, data):
+    return and_(*(
+        expression == value for expression, value in zip(unique_key_expressions(key_columns), unique_key(data, key_columns))
+    ))
+
+
+def item_changes_statement(invoice_id: int, items):
+    """UPDATE items ... FROM (VALUES ...) applying many partial item updates at once.
+
+    A raw field left out of an item (NULL in VALUES) keeps its value; a typed column
+    follows its raw field, so an unparseable new value clears it. Every value is a
+    bound parameter cast to its column type, so columns that are NULL in every row
+    still get a type and client text never ends up in the SQL string.
+    Returns the ids that matched an item of this invoice.
+    """
+    typed_columns = [(raw, typed) for raw, (typed, _) in ITEM_TYPED_FIELDS.items()]
+    column_types = {
+        "id": Integer(),
+        **{name: String() for name in ITEM_RAW_COLUMNS},
+        **{typed: getattr(Item, typed).type for _, typed in typed_columns},
+    }
+    changes = values(
+        *(column(name, column_type) for name, column_type in column_types.items()),
+        name="changes"
+    ).data([
+        tuple(cast(item.get(name), column_type) for name, column_type in column_types.items())
+        for item in items
+    ])
+    assignments = {name: func.coalesce(changes.c[name], getattr(Item, name)) for name in ITEM_RAW_COLUMNS}
+    for raw, typed in typed_columns:
+        assignments[typed] = case((changes.c[raw].is_not(None), changes.c[typed]), else_=getattr(Item, typed))
+    return (
+        update(Item)
+        .where(Item.id == changes.c.id, Item.invoice_id == invoice_id)
+        .values(**assignments)
+        .returning(Item.id)
+    )
+
+
+def item_count_expression():
+    return (
+        select(func.count(Item.id))
+        .where(Item.invoice_id == Invoice.id)
+        .correlate(Invoice)
+        .scalar_subquery()
+        .label("item_count")
+    )
+
+
+def item_total_expression():
+    return (
+        select(func.sum(Item.total_amount_value))
+        .where(Item.invoice_id == Invoice.id)
+        .correlate(Invoice)
+        .scalar_subquery()
+        .label("item_total")
+    )
+
 
 class InvoiceRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.analytics = AnalyticsRepository(db)
 
+    async def update_rollup(self, added=(), removed=()):
+        """Apply invoice_rollup deltas for rollup entries (see rollup_entry) in the current
+        transaction, when the rollup is enabled"""
+        if settings.ANALYTICS_ROLLUP_ENABLED:
+            await self.analytics.apply_rollup_deltas(rollup_deltas(added, removed))
+
+    @timed_async(repository_seconds, method="create_invoice")
     async def create_invoice(self, invoice_data: dict):
-        items_data = invoice_data.pop("items", [])
-        invoice = Invoice(**invoice_data)
-        self.db.add(invoice)
-        await self.db.flush()  # Get invoice.id before commit
-        for item in items_data:
-            item_obj = Item(**item, invoice_id=invoice.id)
-            self.db.add(item_obj)
+        """Insert one invoice unless one with the same INVOICE_UNIQUE_KEY already exists.
+
+        New vs existing is resolved in one statement: INSERT ... ON CONFLICT DO NOTHING
+        RETURNING id in a CTE, UNION ALL the existing row's id when nothing was inserted.
+        Items of a new invoice go in with one multi-row INSERT.
+
+        Returns (invoice, created); invoice is a transient Invoice holding the id.
+        """
+        header = dict(invoice_data)
+        items_data = header.pop("items", [])
+        key_columns = unique_key_columns()
+        inserted = (
+            pg_insert(Invoice)
+            .values(**header)
+            .on_conflict_do_nothing(index_elements=unique_key_expressions(key_columns))
+            .returning(Invoice.id)
+            .cte("inserted")
+        )
+        existing = select(Invoice.id, false()).where(
+            unique_key_match(key_columns, header), ~exists(select(inserted.c.id))
+        )
+        result = await self.db.execute(select(inserted.c.id, true()).union_all(existing))
+        row = result.first()
+        if row is None:
+            # The conflicting row was committed by another request after this statement's snapshot
+            result = await self.db.execute(select(Invoice.id).where(unique_key_match(key_columns, header)))
+            row = (result.scalar_one(), False)
+        invoice_id, created = row
+
+        if not created:
+            await self.db.commit()
+            return Invoice(id=invoice_id), False
+
+        invoice = Invoice(id=invoice_id, **header)
+        if items_data:
+            await self.db.execute(insert(Item), [{**item, "invoice_id": invoice_id} for item in items_data])
+        await self.update_rollup(added=[rollup_entry(invoice)])
         await self.db.commit()
-        await self.db.refresh(invoice)
-        return invoice
+        return invoice, True
+
+    @timed_async(repository_seconds, method="create_invoices_bulk")
+    async def create_invoices_bulk(self, invoices_data: list, chunk_size: int = None):
+        """Insert many invoices with one transaction per chunk (the whole list when
+        chunk_size is None), each chunk a multi-row INSERT for headers and one for items.
+
+        Returns a list of (invoice_id, created) aligned with `invoices_data`. Invoices
+        whose INVOICE_UNIQUE_KEY already exists (in the table or earlier in the list)
+        are not inserted and report the existing id with created=False. A failing
+        chunk is rolled back and its error raised; earlier chunks stay committed.
+        """
+        results = []
+        ids_by_key = {}
+        key_columns = unique_key_columns()
+        chunk_size = chunk_size or max(len(invoices_data), 1)
+        for start in range(0, len(invoices_data), chunk_size):
+            chunk = invoices_data[start:start + chunk_size]
+            try:
+                results.extend(await self._create_invoices_chunk(chunk, ids_by_key, key_columns))
+            except Exception:
+                await self.db.rollback()
+                raise
+        return results
+
+    async def _create_invoices_chunk(self, chunk: list, ids_by_key: dict, key_columns: list):
+        pending = {}
+        for data in chunk:
+            key = unique_key(data, key_columns)
+            if key not in ids_by_key and key not in pending:
+                pending[key] = data
+
+        created_ids = {}
+        if pending:
+            headers = {key: {field: value for field, value in data.items() if field != "items"} for key, data in pending.items()}
+            # Rows that conflict with existing invoices (or concurrent inserts) are skipped, not errors
+            result = await self.db.execute(
+                pg_insert(Invoice)
+                .on_conflict_do_nothing(index_elements=unique_key_expressions(key_columns))
+                .returning(Invoice.id, *(getattr(Invoice, column) for column in key_columns)),
+                list(headers.values())
+            )
+            created_ids = {unique_key(row._mapping, key_columns): row.id for row in result}
+
+            skipped = [key for key in pending if key not in created_ids]
+            if skipped:
+                existing = await self.db.execute(
+                    select(Invoice.id, *(getattr(Invoice, column) for column in key_columns))
+                    .where(tuple_(*unique_key_expressions(key_columns)).in_(skipped))
+                )
+                ids_by_key.update({unique_key(row._mapping, key_columns): row.id for row in existing})
+
+            items = [
+                {**item, "invoice_id": created_ids[key]}
+                for key, data in pending.items() if key in created_ids
+                for item in data.get("items", [])
+            ]
+            if items:
+                await self.db.execute(insert(Item), items)
+            await self.update_rollup(added=[rollup_entry(Invoice(**headers[key])) for key in created_ids])
+            await self.db.commit()
 
+        chunk_results = []
+        for data in chunk:
+            key = unique_key(data, key_columns)
+            invoice_id = created_ids.pop(key, None)
+            if invoice_id is not None:
+                ids_by_key[key] = invoice_id
+                chunk_results.append((invoice_id, True))
+            else:
+                chunk_results.append((ids_by_key.get(key), False))
+        logger.info("Bulk insert chunk: %s invoices, %s created", len(chunk), sum(1 for _, created in chunk_results if created))
+        return chunk_results
+
+    @timed_async(repository_seconds, method="get_invoice_by_id")
     async def get_invoice_by_id(self, invoice_id: int):
         result = await self.db.execute(
             select(Invoice).options(selectinload(Invoice.items)).where(Invoice.id == invoice_id)
@@ -35,125 +383,299 @@ class InvoiceRepository:
         )
         return result.scalar_one_or_none()
 
-    async def update_invoice(self, invoice_id: int, update_data: dict):
-        # Get existing invoice
-        invoice = await self.get_invoice_by_id(invoice_id)
-        if not invoice:
+    @timed_async(repository_seconds, method="get_invoice_by_content_hash")
+    async def get_invoice_by_content_hash(self, content_hash: str):
+        result = await self.db.execute(
+            select(Invoice).options(selectinload(Invoice.items)).where(Invoice.content_hash == content_hash).limit(1)
+        )
+        return result.scalars().first()
+
+    @timed_async(repository_seconds, method="update_invoice")
+    async def update_invoice(self, invoice_id: int, update_data: dict, expected_version: int = None, deleted_item_ids: list = None):
+        """Partial update of an invoice and its items with a handful of set-based statements.
+
+        Concurrent edits are detected with the version column instead of row locks: the
+        header UPDATE only matches the version read at the start (or `expected_version`,
+        the version the client edited) and bumps it, otherwise InvoiceVersionConflictError.
+        Items with an id are changed with one UPDATE ... FROM (VALUES ...), items without
+        one are added with one multi-row INSERT, and `deleted_item_ids` are removed with
+        one DELETE.
+
+        Returns the updated invoice as a dict with its items (plus the content_hash of
+        the upload it came from, for cache eviction), or None when it does not exist.
+        """
+        result = await self.db.execute(
+            select(
+                Invoice.id, Invoice.version, Invoice.invoice_date_value,
+                Invoice.vendor_name, Invoice.customer_name, Invoice.total_amount_value
+            ).where(Invoice.id == invoice_id)
+        )
+        current = result.first()
+        if current is None:
             return None
-        
-        # Update invoice fields (excluding items)
-        items_data = update_data.pop("items", None)
-        for field, value in update_data.items():
-            if hasattr(invoice, field) and value is not None:
-                setattr(invoice, field, value)
-        
-        # Update items if provided
-        if items_data is not None:
-            # Update existing items or add new ones, preserve all others
-            logger.info(f"Updating items for invoice {invoice_id}: {items_data}")
-            for item_data in items_data:
-                item_copy = item_data.copy()
-                item_id = item_copy.pop('id', None)
-                if item_id:
-                    # Update existing item
-                    existing_item = next((itm for itm in invoice.items if itm.id == item_id), None)
-                    if existing_item:
-                        for field, value in item_copy.items():
-                            if hasattr(existing_item, field) and value is not None:
-                                setattr(existing_item, field, value)
-                        logger.info(f"Updated item with ID {item_id}")
-                    else:
-                        # Item ID provided but not found, skip
-                        logger.warning(f"Item with ID {item_id} not found, skipping update")
-                else:
-                    # No ID provided, create new item
-                    new_item = Item(**item_copy, invoice_id=invoice.id)
-                    self.db.add(new_item)
-        
+        if expected_version is not None and expected_version != current.version:
+            raise InvoiceVersionConflictError(
+                f"Invoice {invoice_id} was changed by someone else (version {current.version}, you edited {expected_version})"
+            )
+
+        items_data = update_data.pop("items", None) or []
+        header_values = {field: value for field, value in update_data.items() if field in UPDATABLE_INVOICE_COLUMNS}
+        result = await self.db.execute(
+            update(Invoice)
+            .where(Invoice.id == invoice_id, Invoice.version == current.version)
+            .values(**header_values, version=Invoice.version + 1)
+            .returning(*UPDATED_INVOICE_COLUMNS)
+        )
+        updated = result.first()
+        if updated is None:
+            await self.db.rollback()
+            raise InvoiceVersionConflictError(f"Invoice {invoice_id} was changed by someone else, reload and try again")
+
+        logger.debug("Updating items for invoice %s: %s", invoice_id, payload(items_data))
+        changed_items = {item["id"]: item for item in items_data if item.get("id")}
+        new_items = [item for item in items_data if not item.get("id")]
+        if changed_items:
+            result = await self.db.execute(item_changes_statement(invoice_id, changed_items.values()))
+            missing = set(changed_items) - set(result.scalars().all())
+            if missing:
+                logger.warning("Items %s not found on invoice %s, skipping update", sorted(missing), invoice_id)
+        if new_items:
+            await self.db.execute(insert(Item), [{**item, "invoice_id": invoice_id} for item in new_items])
+        if deleted_item_ids:
+            await self.db.execute(
+                delete(Item).where(Item.invoice_id == invoice_id, Item.id.in_(deleted_item_ids))
+            )
+
+        await self.update_rollup(added=[rollup_entry(updated)], removed=[rollup_entry(current)])
+        items_by_invoice = await self.get_items_by_invoice([invoice_id])
         await self.db.commit()
-        await self.db.refresh(invoice)
+        invoice = {column.key: getattr(updated, column.key) for column in DETAIL_COLUMNS}
+        invoice["items"] = items_by_invoice[invoice_id]
+        invoice["content_hash"] = updated.content_hash
         return invoice
 
-    async def get_all_invoices(self):
-        logger.info("Fetching all invoices from database")
+    @timed_async(repository_seconds, method="get_invoice_detail")
+    async def get_invoice_detail(self, invoice_id: int):
+        """One invoice as a response dict with its items, read with column SELECTs (no ORM objects)"""
+        result = await self.db.execute(select(*DETAIL_COLUMNS).where(Invoice.id == invoice_id))
+        row = result.mappings().first()
+        if row is None:
+            return None
+        items_by_invoice = await self.get_items_by_invoice([invoice_id])
+        return {**row, "items": items_by_invoice[invoice_id]}
+
+    @timed_async(repository_seconds, method="get_items_by_invoice")
+    async def get_items_by_invoice(self, invoice_ids: list):
+        """Line items for a set of invoices in one query, as plain dicts keyed by invoice id"""
+        items_by_invoice = {invoice_id: [] for invoice_id in invoice_ids}
+        if not invoice_ids:
+            return items_by_invoice
         result = await self.db.execute(
-            select(Invoice).options(selectinload(Invoice.items)).order_by(Invoice.id.desc())
+            select(Item.invoice_id, Item.id, Item.item_description, Item.quantity, Item.unit_price, Item.total_amount)
+            .where(Item.invoice_id.in_(invoice_ids))
+            .order_by(Item.invoice_id, Item.id)
         )
-        invoices = result.scalars().all()
-        logger.info(f"Found {len(invoices)} invoices in database")
+        for row in result.mappings():
+            item = dict(row)
+            items_by_invoice[item.pop("invoice_id")].append(item)
+        return items_by_invoice
+
+    async def project_invoices(self, rows, fields):
+        """Turn header rows into response dicts holding `fields` (id is always included)"""
+        output_fields = [field for field in LIST_FIELDS if field == "id" or (field in fields and field != "items")]
+        if rows and "relevance" in rows[0]._fields:
+            output_fields.append("relevance")
+        invoices = [{field: getattr(row, field) for field in output_fields} for row in rows]
+        if "items" in fields:
+            items_by_invoice = await self.get_items_by_invoice([invoice["id"] for invoice in invoices])
+            for invoice in invoices:
+                invoice["items"] = items_by_invoice[invoice["id"]]
         return invoices
 
-    async def get_all_invoices_paginated(self, page: int = 1, limit: int = 10, sort_by: str = "id", sort_order: str = "desc", search: str = None, date_from: str = None, date_to: str = None):
-        logger.info(f"Fetching paginated invoices: page={page}, limit={limit}")
-        
-        # Build base query
-        query = select(Invoice).options(selectinload(Invoice.items))
-        
-        # Apply filters
+    def list_query(self, fields, sort_column=None):
+        """Header-only SELECT for the requested fields, plus the sort column for cursors"""
+        columns = [column for name, column in LIST_COLUMNS.items() if name in fields or name == "id"]
+        if sort_column is not None and not any(column is sort_column for column in columns):
+            columns.append(sort_column)
+        if "item_count" in fields:
+            columns.append(item_count_expression())
+        if "item_total" in fields:
+            columns.append(item_total_expression())
+        return select(*columns)
+
+    @timed_async(repository_seconds, method="get_all_invoices")
+    async def get_all_invoices(self, fields=LIST_FIELDS):
+        logger.info("Fetching all invoices from database")
+        result = await self.db.execute(self.list_query(fields).order_by(Invoice.id.desc()))
+        invoices = await self.project_invoices(result.all(), fields)
+        logger.info("Found %s invoices in database", len(invoices))
+        return invoices
+
+    async def stream_export_rows(self, filters: list, chunk_size: int = 1000):
+        """Matching invoices joined to their items (EXPORT_SELECT), ordered by invoice id.
+
+        Read through a server-side cursor and yielded as lists of up to chunk_size row
+        mappings, so memory stays flat however many invoices match.
+        """
+        query = (
+            select(*EXPORT_SELECT)
+            .select_from(Invoice)
+            .outerjoin(Item, Item.invoice_id == Invoice.id)
+            .where(*filters)
+            .order_by(Invoice.id, Item.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(query)
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    def build_filters(self, search: str = None, date_from: str = None, date_to: str = None, search_items: bool = False):
+        """WHERE conditions shared by the list endpoint and anything that reuses its filters"""
         filters = []
         
-        # Search filter (searches in invoice_number, vendor_name, customer_name)
+        # Search filter (searches in invoice_number, vendor_name, customer_name and optionally
+        # item descriptions); the trigram indexes serve ILIKE '%term%' for terms of 3+ characters
         if search:
             search_term = f"%{search}%"
-            filters.append(
-                or_(
-                    Invoice.invoice_number.ilike(search_term),
-                    Invoice.vendor_name.ilike(search_term),
-                    Invoice.customer_name.ilike(search_term)
+            header_match = or_(*(column.ilike(search_term) for column in SEARCH_COLUMNS))
+            if search_items:
+                # A UNION of two index scans; OR-ing in a subquery on items would scan every invoice
+                matching_ids = union(
+                    select(Invoice.id).where(header_match),
+                    select(Item.invoice_id).where(Item.item_description.ilike(search_term))
                 )
-            )
+                filters.append(Invoice.id.in_(matching_ids))
+            else:
+                filters.append(header_match)
         
-        # Date range filter - since invoice_date is stored as string in YYYY-MM-DD format
+        # Date range filter on the typed column (indexed, see app/db/migrations.py)
         if date_from:
             try:
                 # Validate the date format
                 datetime.strptime(date_from, "%Y-%m-%d")
-                # Use string comparison since dates are stored as strings in YYYY-MM-DD format
-                filters.append(Invoice.invoice_date >= date_from)
-                logger.info(f"Applied date_from filter: {date_from}")
+                filters.append(Invoice.invoice_date_value >= date.fromisoformat(date_from))
+                logger.info("Applied date_from filter: %s", date_from)
             except ValueError:
-                logger.warning(f"Invalid date_from format: {date_from}")
+                logger.warning("Invalid date_from format: %s", date_from)
         
         if date_to:
             try:
                 # Validate the date format
                 datetime.strptime(date_to, "%Y-%m-%d")
-                # Use string comparison since dates are stored as strings in YYYY-MM-DD format
-                filters.append(Invoice.invoice_date <= date_to)
-                logger.info(f"Applied date_to filter: {date_to}")
+                filters.append(Invoice.invoice_date_value <= date.fromisoformat(date_to))
+                logger.info("Applied date_to filter: %s", date_to)
             except ValueError:
-                logger.warning(f"Invalid date_to format: {date_to}")
+                logger.warning("Invalid date_to format: %s", date_to)
+
+        return filters
+
+    @timed_async(repository_seconds, method="count_invoices")
+    async def count_invoices(self, filters: list, count_mode: str = "exact"):
+        """Total for the list endpoint.
+
+        exact: COUNT(*) over the filtered set. estimated: planner statistics when
+        unfiltered, otherwise an exact count cached for COUNT_CACHE_TTL_SECONDS.
+        none: skip counting.
+        """
+        if count_mode == "none":
+            return None
+
+        count_query = select(func.count(Invoice.id))
+        if filters:
+            count_query = count_query.where(and_(*filters))
+
+        if count_mode == "estimated":
+            if not filters:
+                result = await self.db.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'invoices'::regclass")
+                )
+                estimate = result.scalar()
+                # reltuples is -1 (or 0) until the table has been vacuumed/analyzed
+                if estimate and estimate > 0:
+                    return estimate
+            cache_key = str(count_query.compile(compile_kwargs={"literal_binds": True}))
+            cached = count_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            total = (await self.db.execute(count_query)).scalar()
+            count_cache.set(cache_key, total)
+            return total
+
+        total_result = await self.db.execute(count_query)
+        return total_result.scalar()
+
+    @timed_async(repository_seconds, method="get_all_invoices_paginated")
+    async def get_all_invoices_paginated(self, page: int = 1, limit: int = 10, sort_by: str = "id", sort_order: str = "desc", search: str = None, date_from: str = None, date_to: str = None, after: str = None, before: str = None, count_mode: str = "exact", fields=LIST_FIELDS, search_items: bool = False):
+        """List invoices by page number or, when `after` / `before` is given, by cursor.
+
+        Cursor (keyset) mode seeks straight to the row after/before the cursor using
+        the sort key plus id, so deep pages cost the same as the first one. Only the
+        header columns in `fields` are selected; line items are loaded with a single
+        extra query when "items" is requested. sort_by="relevance" ranks search
+        results by trigram similarity (page mode only).
+        """
+        cursor_mode = bool(after or before)
+        logger.info("Fetching paginated invoices: page=%s, limit=%s, cursor_mode=%s", page, limit, cursor_mode)
+        
+        # Build base query
+        sort_column = SORTABLE_COLUMNS.get(sort_by, Invoice.id)
+        query = self.list_query(fields, sort_column)
+        
+        # Apply filters
+        filters = self.build_filters(search, date_from, date_to, search_items)
         
         # Apply all filters
         if filters:
             query = query.where(and_(*filters))
         
-        # Apply sorting
-        sort_column = getattr(Invoice, sort_by, Invoice.id)
-        if sort_order.lower() == "asc":
-            query = query.order_by(sort_column.asc())
+        # Apply sorting; id breaks ties so pages and cursors are stable
+        ranked = sort_by == "relevance" and bool(search)
+        if ranked:
+            if cursor_mode:
+                raise InvalidCursorError("Cursors are not available when sorting by relevance, use page numbers")
+            sort_key = search_rank_expression(search)
+            query = query.add_columns(sort_key.label("relevance"))
+        else:
+            sort_key = sort_key_expression(sort_column)
+        descending = sort_order.lower() != "asc"
+
+        if cursor_mode:
+            cursor_value, cursor_id = decode_cursor(after or before, sort_by, sort_order, sort_column)
+            # Walking backwards flips both the comparison and the order, then the page is reversed
+            query = keyset_seek(query, sort_key, cursor_value, cursor_id, descending if after else not descending)
+            query = query.limit(limit + 1)
         else:
-            query = query.order_by(sort_column.desc())
+            if descending:
+                query = query.order_by(sort_key.desc(), Invoice.id.desc())
+            else:
+                query = query.order_by(sort_key.asc(), Invoice.id.asc())
+            # Apply pagination
+            offset = (page - 1) * limit
+            query = query.offset(offset).limit(limit)
         
         # Get total count for pagination
-        count_query = select(func.count(Invoice.id))
-        if filters:
-            count_query = count_query.where(and_(*filters))
-        
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
+        total = await self.count_invoices(filters, count_mode)
         
         # Execute query
         result = await self.db.execute(query)
-        invoices = result.scalars().all()
+        invoices = result.all()
+
+        next_cursor = prev_cursor = None
+        has_more = False
+        if cursor_mode:
+            invoices, next_cursor, prev_cursor, has_more = cursor_page(
+                invoices, limit, bool(after), lambda row: encode_cursor(row, sort_by, sort_order, sort_column)
+            )
+        elif len(invoices) == limit and not ranked:
+            # Lets clients switch from page numbers to cursors for the following pages
+            next_cursor = encode_cursor(invoices[-1], sort_by, sort_order, sort_column)
         
-        logger.info(f"Found {len(invoices)} invoices on page {page}, total: {total}")
+        logger.info("Found %s invoices on page %s, total: %s", len(invoices), page, total)
         
         return {
-            'invoices': invoices,
-            'total': total
+            'invoices': await self.project_invoices(invoices, fields),
+            'total': total,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'has_more': has_more
         }
@@ -37,3 +37,5 @@ class InvoiceUpdate(BaseModel):
     vendor_name: Optional[str] = None
     total_amount: Optional[str] = None
     items: Optional[List[ItemUpdate]] = None
+    version: Optional[int] = None  # Version the client edited; a newer one in the database is a conflict
+    deleted_item_ids: Optional[List[int]] = None
@@ -0,0 +1,64 @@
+from app.core.logger import logger
+from datetime import date, timedelta
+from app.core.config import settings
+from app.repositories.analytics_repository import AnalyticsRepository, UNKNOWN_MONTH
+from app.services.job_queue import job_queue
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def is_whole_months(date_from: date = None, date_to: date = None):
+    """True when the range starts on the 1st and ends on the last day of a month (open ends count)"""
+    starts_on_month = date_from is None or date_from.day == 1
+    ends_on_month = date_to is None or (date_to + timedelta(days=1)).day == 1
+    return starts_on_month and ends_on_month
+
+
+def format_spend_key(group_by: str, key):
+    if group_by == "month":
+        return key.strftime("%Y-%m") if key and key != UNKNOWN_MONTH else None
+    return key or None
+
+
+class AnalyticsService:
+    def __init__(self, db: AsyncSession):
+        self.repo = AnalyticsRepository(db)
+
+    async def spend(self, group_by: str, date_from: date = None, date_to: date = None, limit: int = 20):
+        use_rollup = settings.ANALYTICS_ROLLUP_ENABLED and is_whole_months(date_from, date_to)
+        logger.info("Computing spend by %s from %s", group_by, 'rollup' if use_rollup else 'invoices')
+        try:
+            rows = await self.repo.spend_by(group_by, date_from, date_to, limit, use_rollup)
+            return {
+                "source": "rollup" if use_rollup else "invoices",
+                "data": [
+                    {
+                        "key": format_spend_key(group_by, row.key),
+                        "invoice_count": row.invoice_count,
+                        "total_amount": row.total_amount
+                    }
+                    for row in rows
+                ]
+            }
+        except Exception as e:
+            logger.error("Error computing spend by %s: %s", group_by, e)
+            raise ValueError(f"Error computing spend: {str(e)}")
+
+    async def top_items(self, order_by: str = "spend", limit: int = 10, date_from: date = None, date_to: date = None):
+        logger.info("Computing top %s items by %s", limit, order_by)
+        try:
+            rows = await self.repo.top_items(order_by, limit, date_from, date_to)
+            return [dict(row._mapping) for row in rows]
+        except Exception as e:
+            logger.error("Error computing top items: %s", e)
+            raise ValueError(f"Error computing top items: {str(e)}")
+
+    async def status_counts(self):
+        try:
+            invoice_counts = await self.repo.status_counts()
+            return {
+                "invoices": {status: invoice_counts.get(status, 0) for status in ("complete", "needs_review")},
+                "jobs": job_queue.counts()
+            }
+        except Exception as e:
+            logger.error("Error computing status counts: %s", e)
+            raise ValueError(f"Error computing status counts: {str(e)}")
@@ -0,0 +1,73 @@
+import hashlib
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+
+
+def hash_content(file_bytes) -> str:
+    """SHA-256 hex digest of the uploaded file, used as the cache key"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class ExtractionCache:
+    """Maps upload content hash -> (invoice id, extracted invoice data).
+
+    The in-process store answers repeat uploads without touching the model or the
+    database; the `invoices.content_hash` column is the persistent fallback that
+    survives restarts and is shared between workers.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or TTLCache(
+            max_size=settings.EXTRACTION_CACHE_MAX_SIZE,
+            ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+            name="extraction_cache"
+        )
+        self.db_hits = 0
+
+    async def lookup(self, repo, content_hash: str):
+        cached = self.store.get(content_hash)
+        if cached is not None:
+            return cached
+
+        invoice = await repo.get_invoice_by_content_hash(content_hash)
+        if invoice is None:
+            return None
+
+        self.db_hits += 1
+        logger.info("Extraction cache DB hit for invoice %s", invoice.id)
+        cached = {
+            "id": invoice.id,
+            "invoice_number": invoice.invoice_number,
+            "invoice_date": invoice.invoice_date,
+            "customer_name": invoice.customer_name,
+            "vendor_name": invoice.vendor_name,
+            "total_amount": invoice.total_amount,
+            "items": [
+                {
+                    "description": item.item_description,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "amount": item.total_amount
+                }
+                for item in invoice.items
+            ]
+        }
+        self.store.set(content_hash, cached)
+        return cached
+
+    def store_result(self, content_hash: str, invoice_id: int, invoice_data: dict):
+        cached = dict(invoice_data)
+        cached["id"] = invoice_id
+        self.store.set(content_hash, cached)
+
+    def invalidate(self, content_hash: str):
+        """Forget an upload whose invoice was edited; the next re-upload reads it from the database"""
+        if content_hash:
+            self.store.delete(content_hash)
+
+    def stats(self):
+        return {**self.store.stats(), "db_hits": self.db_hits}
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,134 @@
+"""
+Bulk import of previously extracted invoices (JSON, NDJSON or CSV dumps).
+
+The input is streamed in batches of IMPORT_BATCH_SIZE records. Each batch is
+validated with InvoiceCreate, COPYed into temporary staging tables and merged
+into invoices / items with one INSERT ... ON CONFLICT DO NOTHING on the
+INVOICE_UNIQUE_KEY index, so invoices that already exist are skipped, not
+duplicated. The merge and the import's checkpoint row commit together: after a
+failure, running the same import_id over the same file (checked by SHA-256)
+resumes after the last committed batch. Parsing the next batch overlaps with loading the current one.
+"""
+import asyncio
+import time
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import Counter
+from app.core.tracing import traced
+from app.repositories.import_repository import ImportRepository, ImportCheckpointConflictError
+from app.services.response_cache import response_cache
+from app.utils.import_utils import ImportBatches, detect_format, file_fingerprint
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Invalid records reported back in full; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+import_records = Counter("invoice_import_records_total", "Bulk import input records by outcome", labelnames=("outcome",))
+
+
+def checkpoint_summary(checkpoint):
+    return {
+        "import_id": checkpoint.import_id,
+        "source": checkpoint.source,
+        "fingerprint": checkpoint.fingerprint,
+        "status": checkpoint.status,
+        "records_done": checkpoint.records_done,
+        "invoices_created": checkpoint.invoices_created,
+        "invoices_skipped": checkpoint.invoices_skipped,
+        "items_created": checkpoint.items_created,
+        "invalid_records": checkpoint.invalid_records,
+        "error": checkpoint.error,
+    }
+
+
+class ImportService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repo = ImportRepository(db)
+
+    async def get_import(self, import_id: str):
+        checkpoint = await self.repo.get_checkpoint(import_id)
+        if checkpoint is None:
+            raise ValueError(f"Import {import_id} not found")
+        return checkpoint_summary(checkpoint)
+
+    @traced()
+    async def import_file(self, file, filename: str, import_id: str = None, import_format: str = None, batch_size: int = None, restart: bool = False):
+        """Import a binary file object; returns the import's summary.
+
+        An import_id (the file name by default) that already completed is not run
+        again unless restart is set; one that failed resumes where it stopped. Both
+        only for the same file contents: a different file under an existing
+        import_id is refused (restart starts it over).
+        """
+        import_format = detect_format(filename, import_format)
+        import_id = import_id or filename
+        batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        fingerprint = await run_in_threadpool(file_fingerprint, file)
+
+        existing = await self.repo.get_checkpoint(import_id)
+        if existing is not None and not restart:
+            if existing.fingerprint != fingerprint:
+                raise ImportCheckpointConflictError(
+                    f"Import {import_id} was started with a different file; use another import_id, or restart to replace it"
+                )
+            if existing.status == "completed":
+                logger.info("Import %s already completed, not running it again", import_id)
+                return {**checkpoint_summary(existing), "status": "already_completed"}
+
+        checkpoint = await self.repo.start_checkpoint(import_id, filename, fingerprint, restart)
+        records_done = checkpoint.records_done
+        if records_done:
+            logger.info("Resuming import %s after record %s", import_id, records_done)
+        batches = ImportBatches(file, import_format, batch_size, skip=records_done)
+
+        started = time.perf_counter()
+        processed = created_total = 0
+        errors = []
+        pending = asyncio.ensure_future(run_in_threadpool(batches.next))
+        try:
+            while True:
+                batch = await pending
+                if batch is None:
+                    break
+                # Parse the next batch while this one is loaded
+                pending = asyncio.ensure_future(run_in_threadpool(batches.next))
+                first, record_count, invoice_rows, item_rows, batch_errors = batch
+                created, items = await self.repo.import_batch(
+                    import_id, records_done, record_count, invoice_rows, item_rows, len(batch_errors)
+                )
+                records_done += record_count
+                processed += record_count
+                created_total += created
+                errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+                import_records.inc(created, outcome="created")
+                import_records.inc(len(invoice_rows) - created, outcome="skipped")
+                import_records.inc(len(batch_errors), outcome="invalid")
+                if created:
+                    response_cache.invalidate_lists()
+                logger.info(
+                    "Import %s: %s records done, %s created in this batch, %.0f records/s",
+                    import_id, records_done, created, processed / (time.perf_counter() - started)
+                )
+        except ImportCheckpointConflictError:
+            raise
+        except Exception as e:
+            logger.error("Import %s failed after record %s: %s", import_id, records_done, e)
+            await self.repo.finish_checkpoint(import_id, "failed", str(e))
+            raise ValueError(f"Error importing invoices (resume with import_id {import_id}): {e}")
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+        await self.repo.finish_checkpoint(import_id, "completed")
+        elapsed = time.perf_counter() - started
+        summary = {
+            **checkpoint_summary(await self.repo.get_checkpoint(import_id)),
+            "records_this_run": processed,
+            "seconds": round(elapsed, 2),
+            "records_per_sec": round(processed / elapsed, 1) if elapsed else None,
+            "errors": [{"record": number, "error": error} for number, error in errors],
+        }
+        logger.info("Import %s completed: %s records, %s invoices created in %.1fs", import_id, processed, created_total, elapsed)
+        return summary
@@ -1,11 +1,93 @@
-from app.core.logger import logger
+from app.core.logger import logger, payload, SAMPLED
+import asyncio
 import json
 import re
+import time
 from datetime import datetime
-from app.repositories.invoice_repository import InvoiceRepository
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.tracing import traced
+from app.db.session import AsyncSessionLocal
+from app.repositories.invoice_repository import InvoiceRepository, InvalidCursorError, InvoiceVersionConflictError, LIST_COLUMNS, LIST_FIELDS
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate
-from app.utils.openai_utils import extract_invoice_data
+from app.extractors.registry import get_extractor
+from app.services.extraction_cache import extraction_cache, hash_content
+from app.services.response_cache import response_cache
+from app.utils.upload_utils import read_upload
+from app.utils.image_utils import detect_mime_type, preprocess_image, UnsupportedImageError
+from app.utils.pdf_utils import has_text_layer, read_pdf_text, render_pdf_pages
+from app.utils.parse_utils import with_typed_values, INVOICE_TYPED_FIELDS, ITEM_TYPED_FIELDS
+from app.utils import export_utils
 from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+
+# Where an upload's time goes: read_upload, cache_lookup, preprocess, render_pdf, model, parse_json, normalize, db_insert
+stage_seconds = Histogram("invoice_stage_duration_seconds", "Time per invoice processing stage", labelnames=("stage",))
+
+def resolve_list_fields(fields: str = None, include_items: bool = True):
+    """Fields returned by GET /invoices. An explicit comma separated `fields` wins;
+    otherwise every header column plus either the items or just their count."""
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(LIST_FIELDS)}")
+        return requested
+    return list(LIST_COLUMNS) + (["items"] if include_items else ["item_count", "item_total"])
+
+# Normalize keys for main invoice fields
+def normalize_invoice_keys(data):
+    key_map = {
+        "Invoice Number": "invoice_number",
+        "Invoice Date": "invoice_date",
+        "Customer Name": "customer_name",
+        "Vendor Name": "vendor_name",
+        "Total Amount": "total_amount",
+        "Items": "items"
+    }
+    return {key_map.get(k, k): v for k, v in data.items()}
+
+def normalize_item_keys(item):
+    item_key_map = {
+        "Item Description": "item_description",
+        "Quantity": "quantity",
+        "Unit Price": "unit_price",
+        "Total Amount": "total_amount"
+    }
+    return {item_key_map.get(k, k): v for k, v in item.items()}
+
+def merge_page_extractions(pages):
+    """Merge per-page extractions of one invoice.
+
+    Header fields come from the first page that has them, the total from the last
+    page that has one (totals are printed at the end), and line items from every
+    page in page order.
+    """
+    merged = {"items": []}
+    for page in pages:
+        page = normalize_invoice_keys(page)
+        for field in ("invoice_number", "invoice_date", "customer_name", "vendor_name"):
+            if not merged.get(field) and page.get(field):
+                merged[field] = page[field]
+        if page.get("total_amount"):
+            merged["total_amount"] = page["total_amount"]
+        merged["items"].extend(page.get("items") or [])
+    for field in ("invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount"):
+        merged.setdefault(field, "")
+    return merged
+
+def build_upload_response(invoice_obj, extracted_json: dict, status: str):
+    """Response body for an upload, shared by /upload-invoice and the job queue"""
+    return {
+        "status": status,
+        "id": invoice_obj.id if invoice_obj else extracted_json.get("id"),  # Use invoice object ID if available
+        "invoice_number": extracted_json.get("invoice_number"),
+        "date": extracted_json.get("invoice_date"),
+        "vendor_name": extracted_json.get("vendor_name"),
+        "customer_name": extracted_json.get("customer_name"),
+        "total": extracted_json.get("total_amount"),
+        "items": extracted_json.get("items", [])
+    }
 
 class InvoiceService:
     def __init__(self, db: AsyncSession):
@@ -73,171 +155,277 @@ class InvoiceService:
                 except (ValueError, IndexError):
                     continue
         
-        logger.warning(f"Could not parse date: {date_str}")
+        logger.warning("Could not parse date: %s", date_str)
         return date_str  # Return original if can't parse
 
     async def process_and_store_invoice(self, file):
-        logger.info(f"Extracting invoice data using OpenAI for file: {file.filename}")
-        extracted_json_str = extract_invoice_data(file)
-        logger.info(f"Raw OpenAI response: {extracted_json_str}")
+        with stage_seconds.time(stage="read_upload"):
+            file_bytes, content_hash = await read_upload(file)
+        return await self.process_and_store_bytes(file_bytes, file.filename, content_hash, release_upload=True)
+
+    @traced()
+    async def process_and_store_bytes(self, file_bytes: bytes, filename: str, content_hash: str = None, release_upload: bool = False):
+        content_hash = content_hash or hash_content(file_bytes)
+
+        # Re-uploads of the same file are answered from the cache without calling the model
+        with stage_seconds.time(stage="cache_lookup"):
+            cached = await extraction_cache.lookup(self.repo, content_hash)
+        if cached is not None:
+            logger.info("File %s already parsed as invoice %s, skipping extraction", filename, cached.get('id'))
+            return None, dict(cached), "already_parsed"
+
         try:
-            extracted_json = json.loads(extracted_json_str)
-
-            # Normalize keys for main invoice fields
-            def normalize_invoice_keys(data):
-                key_map = {
-                    "Invoice Number": "invoice_number",
-                    "Invoice Date": "invoice_date",
-                    "Customer Name": "customer_name",
-                    "Vendor Name": "vendor_name",
-                    "Total Amount": "total_amount",
-                    "Items": "items"
-                }
-                return {key_map.get(k, k): v for k, v in data.items()}
-
-            def normalize_item_keys(item):
-                item_key_map = {
-                    "Item Description": "item_description",
-                    "Quantity": "quantity",
-                    "Unit Price": "unit_price",
-                    "Total Amount": "total_amount"
-                }
-                return {item_key_map.get(k, k): v for k, v in item.items()}
-
-            normalized = normalize_invoice_keys(extracted_json)
-            
-            # Normalize the date format
-            if "invoice_date" in normalized:
-                normalized["invoice_date"] = self.normalize_date(normalized["invoice_date"])
-            
-            items = normalized.get("items", [])
-            normalized_items = [normalize_item_keys(item) for item in items]
-            normalized["items"] = normalized_items
-
-            # Create InvoiceCreate object with items included
-            invoice_create = InvoiceCreate(**normalized)
-            invoice_data = invoice_create.dict()
-            logger.info(f"Invoice data for response: {invoice_data}")
-            logger.info(f"Saving invoice to DB: {invoice_data.get('invoice_number')}")
-            
-            # Format items data with proper fields for the frontend
-            frontend_formatted_items = []
-            for item in normalized_items:
-                frontend_formatted_items.append({
-                    "description": item.get("item_description", ""),
-                    "quantity": item.get("quantity", ""),
-                    "unit_price": item.get("unit_price", ""),
-                    "amount": item.get("total_amount", "")
-                })
-            
-            # Update the invoice_data with properly formatted items
-            invoice_data["items"] = frontend_formatted_items
+            invoice_data, db_invoice_data = await self.extract_invoice(file_bytes, filename, release_upload)
+            logger.info("Saving invoice to DB: %s", invoice_data.get('invoice_number'))
             
+            db_invoice_data["content_hash"] = content_hash
+            # Duplicates (same INVOICE_UNIQUE_KEY) are resolved by the insert itself
+            with stage_seconds.time(stage="db_insert"):
+                invoice_obj, created = await self.repo.create_invoice(db_invoice_data)
+            if created:
+                logger.info("Invoice saved with ID: %s", invoice_obj.id)
+                response_cache.invalidate_lists()
+                status = "success"
+            else:
+                logger.info("Invoice %s already exists with ID: %s", invoice_data.get('invoice_number'), invoice_obj.id)
+                # Include the ID in the invoice_data
+                invoice_data["id"] = invoice_obj.id
+                status = "already_parsed"
+            extraction_cache.store_result(content_hash, invoice_obj.id, invoice_data)
+            # Return full invoice data including properly formatted items
+            return invoice_obj, invoice_data, status
+        except (HTTPException, UnsupportedImageError):
+            # Already carry their status (503 when no extraction slot frees up in time, 415)
+            raise
+        except Exception as e:
+            logger.error("Error processing invoice: %s", e)
+            raise ValueError(f"Error processing invoice: {str(e)}") from e
+
+    @traced()
+    async def process_batch(self, entries):
+        """Extract many files concurrently and store them with a few bulk commits.
+
+        `entries` is an async iterator of (filename, file_bytes); the next entry is only
+        read once an extraction slot is free, so a large ZIP is never fully in memory.
+        Returns (results, entries_error): one result per file with status success /
+        already_parsed / error, and the error that stopped reading `entries` (None if
+        all were read). Files extracted before that error are still stored. If it
+        stopped the batch before any file was read, the error is raised instead.
+        """
+        slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+        async def extract_one(filename, file_bytes):
             try:
-                # Make a copy to avoid mutation by repository
-                db_invoice_data = invoice_data.copy()
-                # Need to restore original items format for database
-                db_invoice_data["items"] = normalized_items
-                invoice_obj = await self.repo.create_invoice(db_invoice_data)
-                logger.info(f"Invoice saved with ID: {getattr(invoice_obj, 'id', None)}")
-                # Return full invoice data including properly formatted items
-                return invoice_obj, invoice_data, "success"
-            except Exception as db_error:
-                if "duplicate key value violates unique constraint" in str(db_error):
-                    logger.info(f"Invoice {invoice_data.get('invoice_number')} already exists, fetching existing invoice")
-                    # Rollback the transaction first to clean up the session
-                    await self.repo.db.rollback()
-                    # Fetch the existing invoice to get its ID and data
-                    existing_invoice = await self.repo.get_invoice_by_number(invoice_data.get('invoice_number'))
-                    if existing_invoice:
-                        # Include the ID in the invoice_data
-                        invoice_data["id"] = existing_invoice.id
-                        logger.info(f"Found existing invoice with ID: {existing_invoice.id}")
-                    # Return the invoice data with already_parsed status
-                    return existing_invoice, invoice_data, "already_parsed"
-                else:
-                    # Re-raise other database errors
-                    raise db_error
+                content_hash = hash_content(file_bytes)
+                # Each task gets its own session; an AsyncSession must not be shared between tasks
+                async with AsyncSessionLocal() as db:
+                    cached = await extraction_cache.lookup(InvoiceRepository(db), content_hash)
+                if cached is not None:
+                    return {"filename": filename, **build_upload_response(None, cached, "already_parsed")}
+                invoice_data, db_invoice_data = await self.extract_invoice(file_bytes, filename, release_upload=True)
+                db_invoice_data["content_hash"] = content_hash
+                return {"filename": filename, "pending": (invoice_data, db_invoice_data)}
+            except Exception as e:
+                error = str(getattr(e, "detail", None) or e)
+                logger.error("Error extracting %s in batch: %s", filename, error)
+                return {"filename": filename, "status": "error", "error": error}
+            finally:
+                slots.release()
+
+        tasks = []
+        entries_error = None
+        try:
+            async for filename, file_bytes in entries:
+                await slots.acquire()
+                tasks.append(asyncio.create_task(extract_one(filename, file_bytes)))
         except Exception as e:
-            logger.error(f"Error processing invoice: {str(e)}")
-            raise ValueError(f"Error processing invoice: {str(e)}")
+            # Keep what was already extracted; the caller reports the error next to it
+            logger.error("Batch input stopped after %s files: %s", len(tasks), e)
+            entries_error = e
+        finally:
+            results = list(await asyncio.gather(*tasks))
+        if entries_error is not None and not results:
+            raise entries_error
+
+        pending = [result for result in results if "pending" in result]
+        # One create_invoices_bulk call per commit, so a failing chunk only fails its own files
+        for start in range(0, len(pending), settings.BATCH_COMMIT_SIZE):
+            chunk = pending[start:start + settings.BATCH_COMMIT_SIZE]
+            try:
+                stored = await self.repo.create_invoices_bulk([result["pending"][1] for result in chunk])
+            except Exception as e:
+                logger.error("Error storing %s batch invoices: %s", len(chunk), e)
+                for result in chunk:
+                    del result["pending"]
+                    result.update({"status": "error", "error": f"Error storing invoice: {e}"})
+                continue
+            if any(created for _, created in stored):
+                response_cache.invalidate_lists()
+            for result, (invoice_id, created) in zip(chunk, stored):
+                invoice_data, db_invoice_data = result.pop("pending")
+                invoice_data["id"] = invoice_id
+                status = "success" if created else "already_parsed"
+                extraction_cache.store_result(db_invoice_data["content_hash"], invoice_id, invoice_data)
+                result.update(build_upload_response(None, invoice_data, status))
+
+        logger.info("Batch processed: %s files", len(results))
+        return results, entries_error
+
+    @traced()
+    async def extract_invoice(self, file_bytes: bytes, filename: str, release_upload: bool = False):
+        """Run the model on one file and normalize its output.
+
+        Returns (invoice_data, db_invoice_data): the response shape with frontend
+        formatted items, and the shape InvoiceRepository.create_invoice expects.
+        With release_upload=True the upload buffer is freed once it is encoded;
+        the job queue keeps it for retries and leaves this off.
+        """
+        if detect_mime_type(file_bytes) == "application/pdf":
+            extracted_json = await self.extract_pdf(file_bytes, filename)
+        else:
+            with stage_seconds.time(stage="preprocess"):
+                image_bytes, mime_type = await preprocess_image(file_bytes, filename)
+            # A preprocessed copy is ours to free once encoded, whatever the caller needs
+            release_image = release_upload or image_bytes is not file_bytes
+            extractor = get_extractor()
+            logger.info("Extracting invoice data using %s for file: %s", extractor.name, filename)
+            with stage_seconds.time(stage="model"):
+                result = await extractor.extract_image(image_bytes, mime_type, release_image)
+            logger.debug("Raw %s response (confidence %s): %s", result.backend, result.confidence, payload(result.content))
+            with stage_seconds.time(stage="parse_json"):
+                extracted_json = json.loads(result.content)
+
+        normalize_started = time.perf_counter()
+        normalized = normalize_invoice_keys(extracted_json)
+        
+        # Normalize the date format
+        if "invoice_date" in normalized:
+            normalized["invoice_date"] = self.normalize_date(normalized["invoice_date"])
+        
+        items = normalized.get("items", [])
+        normalized_items = [normalize_item_keys(item) for item in items]
+        normalized["items"] = normalized_items
+
+        # Create InvoiceCreate object with items included
+        invoice_create = InvoiceCreate(**normalized)
+        invoice_data = invoice_create.dict()
+        logger.debug("Invoice data for response: %s", payload(invoice_data))
+        
+        # Format items data with proper fields for the frontend
+        frontend_formatted_items = []
+        for item in normalized_items:
+            frontend_formatted_items.append({
+                "description": item.get("item_description", ""),
+                "quantity": item.get("quantity", ""),
+                "unit_price": item.get("unit_price", ""),
+                "amount": item.get("total_amount", "")
+            })
+        
+        # Update the invoice_data with properly formatted items
+        invoice_data["items"] = frontend_formatted_items
+
+        # Make a copy to avoid mutation by repository, with the typed date / amount columns
+        db_invoice_data = with_typed_values(invoice_data, INVOICE_TYPED_FIELDS)
+        # Need to restore original items format for database
+        db_invoice_data["items"] = [with_typed_values(item, ITEM_TYPED_FIELDS) for item in normalized_items]
+        stage_seconds.observe(time.perf_counter() - normalize_started, stage="normalize")
+        return invoice_data, db_invoice_data
+
+    @traced()
+    async def extract_pdf(self, pdf_bytes: bytes, filename: str):
+        """Extract a (multi-page) PDF into one invoice dict.
+
+        PDFs with a text layer are sent to the model as text only. Scanned PDFs are
+        rasterized in the process pool PDF_PAGE_CONCURRENCY pages per call; the pages
+        of one range are extracted concurrently while the next range is rendered, and
+        the per-page results are merged.
+        """
+        page_count, page_texts = await read_pdf_text(pdf_bytes)
+        if has_text_layer(page_texts):
+            logger.info("PDF %s has a text layer (%s pages), extracting from text", filename, page_count)
+            invoice_text = "\n\n".join(
+                f"--- Page {page_number + 1} ---\n{text.strip()}" for page_number, text in enumerate(page_texts)
+            )
+            with stage_seconds.time(stage="model"):
+                result = await get_extractor().extract_text(invoice_text)
+            logger.debug("Raw %s response (confidence %s): %s", result.backend, result.confidence, payload(result.content))
+            with stage_seconds.time(stage="parse_json"):
+                return json.loads(result.content)
+
+        if not page_count:
+            raise ValueError(f"PDF {filename} has no pages")
+        logger.info("PDF %s has no text layer, extracting %s pages as images", filename, page_count)
 
+        async def extract_page(page_number, page_image):
+            page_name = f"{filename} page {page_number + 1}"
+            with stage_seconds.time(stage="preprocess"):
+                image_bytes, mime_type = await preprocess_image(page_image, page_name)
+            with stage_seconds.time(stage="model"):
+                result = await get_extractor().extract_image(image_bytes, mime_type)
+            logger.debug("Raw %s response for %s (confidence %s): %s", result.backend, page_name, result.confidence, payload(result.content))
+            with stage_seconds.time(stage="parse_json"):
+                return json.loads(result.content)
+
+        step = settings.PDF_PAGE_CONCURRENCY
+        ranges = [(first, min(first + step, page_count)) for first in range(0, page_count, step)]
+        pages = []
+        rendering = asyncio.ensure_future(render_pdf_pages(pdf_bytes, *ranges[0]))
+        try:
+            for index, (first, _) in enumerate(ranges):
+                with stage_seconds.time(stage="render_pdf"):
+                    page_images = await rendering
+                # Render the next range while this one is with the model
+                rendering = asyncio.ensure_future(render_pdf_pages(pdf_bytes, *ranges[index + 1])) if index + 1 < len(ranges) else None
+                pages.extend(await asyncio.gather(*(
+                    extract_page(first + offset, page_image) for offset, page_image in enumerate(page_images)
+                )))
+        finally:
+            if rendering is not None and not rendering.done():
+                rendering.cancel()
+        return merge_page_extractions(pages)
+
+    @traced()
     async def update_invoice(self, invoice_id: int, update_data: InvoiceUpdate):
-        logger.info(f"Updating invoice with ID: {invoice_id}")
+        logger.info("Updating invoice with ID: %s", invoice_id)
         try:
             # Convert Pydantic model to dict, excluding None values
-            update_dict = update_data.dict(exclude_none=True)
+            update_dict = with_typed_values(update_data.dict(exclude_none=True), INVOICE_TYPED_FIELDS)
+            expected_version = update_dict.pop("version", None)
+            deleted_item_ids = update_dict.pop("deleted_item_ids", None)
+            if "items" in update_dict:
+                update_dict["items"] = [with_typed_values(item, ITEM_TYPED_FIELDS) for item in update_dict["items"]]
             
-            # Update invoice in database
-            updated_invoice = await self.repo.update_invoice(invoice_id, update_dict.copy())
+            # Update invoice in database; the repository returns it in response format
+            updated_invoice = await self.repo.update_invoice(invoice_id, update_dict, expected_version, deleted_item_ids)
             
             if not updated_invoice:
-                logger.error(f"Invoice with ID {invoice_id} not found")
+                logger.error("Invoice with ID %s not found", invoice_id)
                 raise ValueError(f"Invoice with ID {invoice_id} not found")
             
-            logger.info(f"Invoice {invoice_id} updated successfully")
-            
-            # Convert to response format
-            response_data = {
-                "id": updated_invoice.id,
-                "invoice_number": updated_invoice.invoice_number,
-                "invoice_date": updated_invoice.invoice_date,
-                "customer_name": updated_invoice.customer_name,
-                "vendor_name": updated_invoice.vendor_name,
-                "total_amount": updated_invoice.total_amount,
-                "items": [
-                    {
-                        "id": item.id,
-                        "item_description": item.item_description,
-                        "quantity": item.quantity,
-                        "unit_price": item.unit_price,
-                        "total_amount": item.total_amount
-                    }
-                    for item in updated_invoice.items
-                ]
-            }
-            
-            return updated_invoice, response_data
+            response_cache.invalidate_invoice(invoice_id)
+            # Re-uploads of the original file must answer with the edited invoice
+            extraction_cache.invalidate(updated_invoice.pop("content_hash", None))
+            logger.info("Invoice %s updated successfully (version %s)", invoice_id, updated_invoice['version'])
+            return updated_invoice
+        except InvoiceVersionConflictError:
+            raise
         except Exception as e:
-            logger.error(f"Error updating invoice: {str(e)}")
+            logger.error("Error updating invoice: %s", e)
             raise ValueError(f"Error updating invoice: {str(e)}")
 
-    async def get_all_invoices(self):
+    async def get_all_invoices(self, include_items: bool = True):
         logger.info("Fetching all invoices from database")
         try:
-            invoices = await self.repo.get_all_invoices()
-            
-            # Convert to response format
-            response_data = []
-            for invoice in invoices:
-                invoice_data = {
-                    "id": invoice.id,
-                    "invoice_number": invoice.invoice_number,
-                    "invoice_date": invoice.invoice_date,
-                    "customer_name": invoice.customer_name,
-                    "vendor_name": invoice.vendor_name,
-                    "total_amount": invoice.total_amount,
-                    "items": [
-                        {
-                            "id": item.id,
-                            "item_description": item.item_description,
-                            "quantity": item.quantity,
-                            "unit_price": item.unit_price,
-                            "total_amount": item.total_amount
-                        }
-                        for item in invoice.items
-                    ]
-                }
-                response_data.append(invoice_data)
-            
-            logger.info(f"Successfully fetched {len(response_data)} invoices")
-            return response_data
+            invoices = await self.repo.get_all_invoices(fields=resolve_list_fields(include_items=include_items))
+            logger.info("Successfully fetched %s invoices", len(invoices))
+            return invoices
         except Exception as e:
-            logger.error(f"Error fetching all invoices: {str(e)}")
+            logger.error("Error fetching all invoices: %s", e)
             raise ValueError(f"Error fetching invoices: {str(e)}")
 
-    async def get_all_invoices_paginated(self, page: int = 1, limit: int = 10, sort_by: str = "id", sort_order: str = "desc", search: str = None, date_from: str = None, date_to: str = None):
-        logger.info(f"Fetching invoices with pagination: page={page}, limit={limit}, sort_by={sort_by}")
+    @traced()
+    async def get_all_invoices_paginated(self, page: int = 1, limit: int = 10, sort_by: str = "id", sort_order: str = "desc", search: str = None, date_from: str = None, date_to: str = None, after: str = None, before: str = None, count_mode: str = "exact", fields=LIST_FIELDS, search_items: bool = False):
+        logger.info("Fetching invoices with pagination: page=%s, limit=%s, sort_by=%s", page, limit, sort_by, extra=SAMPLED)
         try:
             result = await self.repo.get_all_invoices_paginated(
                 page=page,
@@ -246,72 +434,80 @@ class InvoiceService:
                 sort_order=sort_order,
                 search=search,
                 date_from=date_from,
-                date_to=date_to
+                date_to=date_to,
+                after=after,
+                before=before,
+                count_mode=count_mode,
+                fields=fields,
+                search_items=search_items
             )
             
-            # Convert to response format
-            response_data = []
-            for invoice in result['invoices']:
-                invoice_data = {
-                    "id": invoice.id,
-                    "invoice_number": invoice.invoice_number,
-                    "invoice_date": invoice.invoice_date,
-                    "customer_name": invoice.customer_name,
-                    "vendor_name": invoice.vendor_name,
-                    "total_amount": invoice.total_amount,
-                    "items": [
-                        {
-                            "id": item.id,
-                            "item_description": item.item_description,
-                            "quantity": item.quantity,
-                            "unit_price": item.unit_price,
-                            "total_amount": item.total_amount
-                        }
-                        for item in invoice.items
-                    ]
-                }
-                response_data.append(invoice_data)
+            response_data = result['invoices']
             
-            logger.info(f"Successfully fetched {len(response_data)} invoices")
+            logger.info("Successfully fetched %s invoices", len(response_data), extra=SAMPLED)
             return {
                 'data': response_data,
-                'total': result['total']
+                'total': result['total'],
+                'next_cursor': result['next_cursor'],
+                'prev_cursor': result['prev_cursor'],
+                'has_more': result['has_more']
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
-            logger.error(f"Error fetching paginated invoices: {str(e)}")
+            logger.error("Error fetching paginated invoices: %s", e)
             raise ValueError(f"Error fetching invoices: {str(e)}")
 
+    def export_invoices(self, export_format: str = "ndjson", search: str = None, date_from: str = None, date_to: str = None, search_items: bool = False, compress: bool = False):
+        """Async iterator over the bytes of an export of every invoice matching the list filters.
+
+        Rows are read in a session of its own: the response is streamed after the
+        request's session has been closed. `compress` gzips NDJSON / CSV and switches
+        Parquet's column compression to gzip (the file stays readable as Parquet).
+        """
+        if export_format == "parquet" and export_utils.pa is None:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+        filters = self.repo.build_filters(search, date_from, date_to, search_items)
+        logger.info("Exporting invoices as %s (search=%s, date_from=%s, date_to=%s)", export_format, search, date_from, date_to)
+
+        async def row_chunks():
+            exported = 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    async for rows in InvoiceRepository(db).stream_export_rows(filters, settings.EXPORT_CHUNK_SIZE):
+                        exported += len(rows)
+                        yield rows
+            except Exception as e:
+                logger.error("Invoice export failed after %s rows: %s", exported, e)
+                raise
+            logger.info("Invoice export finished: %s rows", exported)
+
+        if export_format == "parquet":
+            return export_utils.parquet_chunks(row_chunks(), compression="gzip" if compress else "snappy")
+        writer = export_utils.ndjson_chunks if export_format == "ndjson" else export_utils.csv_chunks
+        chunks = writer(row_chunks())
+        return export_utils.gzip_chunks(chunks) if compress else chunks
+
+    async def get_invoices_page_response(self, **params):
+        """(etag, get_all_invoices_paginated result), read through response_cache"""
+        return await response_cache.invoice_list(params, lambda: self.get_all_invoices_paginated(**params))
+
+    async def get_invoice_response(self, invoice_id: int):
+        """(etag, get_invoice_by_id data), read through response_cache"""
+        return await response_cache.invoice(invoice_id, lambda: self.get_invoice_by_id(invoice_id))
+
+    @traced()
     async def get_invoice_by_id(self, invoice_id: int):
-        logger.info(f"Fetching invoice with ID: {invoice_id}")
+        logger.info("Fetching invoice with ID: %s", invoice_id, extra=SAMPLED)
         try:
-            invoice = await self.repo.get_invoice_by_id(invoice_id)
+            response_data = await self.repo.get_invoice_detail(invoice_id)
             
-            if not invoice:
-                logger.error(f"Invoice with ID {invoice_id} not found")
+            if not response_data:
+                logger.error("Invoice with ID %s not found", invoice_id)
                 raise ValueError(f"Invoice with ID {invoice_id} not found")
             
-            # Convert to response format
-            response_data = {
-                "id": invoice.id,
-                "invoice_number": invoice.invoice_number,
-                "invoice_date": invoice.invoice_date,
-                "customer_name": invoice.customer_name,
-                "vendor_name": invoice.vendor_name,
-                "total_amount": invoice.total_amount,
-                "items": [
-                    {
-                        "id": item.id,
-                        "item_description": item.item_description,
-                        "quantity": item.quantity,
-                        "unit_price": item.unit_price,
-                        "total_amount": item.total_amount
-                    }
-                    for item in invoice.items
-                ]
-            }
-            
-            logger.info(f"Successfully fetched invoice {invoice_id}")
+            logger.info("Successfully fetched invoice %s", invoice_id, extra=SAMPLED)
             return response_data
         except Exception as e:
-            logger.error(f"Error fetching invoice by ID: {str(e)}")
+            logger.error("Error fetching invoice by ID: %s", e)
             raise ValueError(f"Error fetching invoice: {str(e)}")
@@ -0,0 +1,235 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+import openai
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError, OperationalError
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.session import AsyncSessionLocal
+from app.services.extraction_cache import hash_content
+from app.services.invoice_service import InvoiceService, build_upload_response
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_RETRYING = "retrying"
+JOB_SUCCEEDED = "succeeded"
+JOB_DEAD_LETTER = "dead_letter"
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING, JOB_RETRYING)
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobQueueNotStartedError(Exception):
+    pass
+
+
+def is_transient(error: BaseException):
+    """Whether a failed attempt may succeed when retried: model rate limits, 5xx and
+    connection errors, no free extraction slot (503), lost database connections.
+
+    The service wraps errors, so the whole __cause__ / __context__ chain is checked.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+            return True
+        if isinstance(error, openai.APIStatusError) and (error.status_code == 429 or error.status_code >= 500):
+            return True
+        if isinstance(error, HTTPException) and error.status_code == 503:
+            return True
+        if isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_delay(attempts: int):
+    """Exponential backoff before the next attempt, capped, plus up to 50% jitter"""
+    delay = min(
+        settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1)),
+        settings.JOB_RETRY_BACKOFF_MAX_SECONDS
+    )
+    return delay + random.uniform(0, delay / 2)
+
+
+async def process_upload(file_bytes: bytes, filename: str, content_hash: str):
+    """Default job step: extract and store the upload in its own session"""
+    async with AsyncSessionLocal() as db:
+        service = InvoiceService(db)
+        return await service.process_and_store_bytes(file_bytes, filename, content_hash)
+
+
+class InvoiceJob:
+    def __init__(self, filename: str, file_bytes: bytes, content_hash: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.file_bytes = file_bytes
+        self.content_hash = content_hash
+        self.status = JOB_QUEUED
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.next_attempt_at = None
+
+    def set_status(self, status: str):
+        self.status = status
+        self.updated_at = time.time()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": settings.JOB_MAX_ATTEMPTS,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "next_attempt_at": self.next_attempt_at
+        }
+
+
+class InvoiceJobQueue:
+    """In-process queue that runs invoice extraction on a pool of asyncio workers.
+
+    Transient failures (see is_transient) are retried with exponential backoff;
+    after JOB_MAX_ATTEMPTS, or at once for any other error (a file the model cannot
+    read will not read better on the next try), jobs move to the dead_letter state
+    and keep their last error for inspection.
+
+    `process` runs one attempt and returns (invoice_obj, extracted_json, status),
+    like InvoiceService.process_and_store_bytes.
+    """
+
+    def __init__(self, process=process_upload):
+        self.process = process
+        self.jobs = OrderedDict()
+        # content_hash -> job while that job is queued, running or retrying
+        self.active = {}
+        self.queue = None
+        self.workers = []
+        self.retry_timers = set()
+
+    async def start(self):
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=settings.JOB_QUEUE_MAX_SIZE)
+        self.workers = [
+            asyncio.create_task(self._worker(n), name=f"invoice-job-worker-{n}")
+            for n in range(settings.JOB_WORKERS)
+        ]
+        logger.info("Started %s invoice job workers", len(self.workers))
+
+    async def stop(self):
+        tasks = [*self.workers, *self.retry_timers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        logger.info("Stopped invoice job workers")
+
+    def submit(self, file_bytes: bytes, filename: str, content_hash: str = None):
+        if self.queue is None:
+            raise JobQueueNotStartedError("Invoice job queue is not running; start() it before submitting jobs")
+        content_hash = content_hash or hash_content(file_bytes)
+
+        # A client retrying the same upload gets the job that is already running
+        job = self.active.get(content_hash)
+        if job is not None:
+            logger.info("Upload %s matches active job %s, not enqueuing again", filename, job.id)
+            return job
+
+        self._prune()
+        job = InvoiceJob(filename, file_bytes, content_hash)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("Invoice job queue is full, please retry later")
+        self.jobs[job.id] = job
+        self.active[content_hash] = job
+        logger.info("Enqueued invoice job %s for file %s", job.id, filename)
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def get_many(self, job_ids):
+        return [self.jobs[job_id] for job_id in job_ids if job_id in self.jobs]
+
+    def counts(self):
+        counts = {status: 0 for status in (*ACTIVE_STATUSES, JOB_SUCCEEDED, JOB_DEAD_LETTER)}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def _prune(self):
+        """Forget finished jobs older than JOB_RETENTION_SECONDS"""
+        cutoff = time.time() - settings.JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status not in ACTIVE_STATUSES and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _worker(self, number: int):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error("Invoice job worker %s crashed on job %s: %s", number, job.id, e)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: InvoiceJob):
+        job.attempts += 1
+        job.next_attempt_at = None
+        job.set_status(JOB_RUNNING)
+        logger.info("Running invoice job %s (attempt %s)", job.id, job.attempts)
+        try:
+            invoice_obj, extracted_json, status = await self.process(job.file_bytes, job.filename, job.content_hash)
+            job.result = build_upload_response(invoice_obj, extracted_json, status)
+            job.error = None
+            self._finish(job, JOB_SUCCEEDED)
+            logger.info("Invoice job %s finished with status %s", job.id, status)
+        except Exception as e:
+            job.error = str(getattr(e, "detail", None) or e)
+            if not is_transient(e):
+                self._finish(job, JOB_DEAD_LETTER)
+                logger.error("Invoice job %s moved to dead letter, error is not retryable: %s", job.id, job.error)
+                return
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                self._finish(job, JOB_DEAD_LETTER)
+                logger.error("Invoice job %s moved to dead letter after %s attempts: %s", job.id, job.attempts, job.error)
+                return
+            delay = retry_delay(job.attempts)
+            job.next_attempt_at = time.time() + delay
+            job.set_status(JOB_RETRYING)
+            logger.warning("Invoice job %s failed, retrying in %.1fs: %s", job.id, delay, job.error)
+            timer = asyncio.create_task(self._requeue(job, delay))
+            self.retry_timers.add(timer)
+            timer.add_done_callback(self.retry_timers.discard)
+
+    def _finish(self, job: InvoiceJob, status: str):
+        job.file_bytes = None
+        job.set_status(status)
+        if self.active.get(job.content_hash) is job:
+            del self.active[job.content_hash]
+
+    async def _requeue(self, job: InvoiceJob, delay: float):
+        await asyncio.sleep(delay)
+        await self.queue.put(job)
+
+
+job_queue = InvoiceJobQueue()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.utils.serialization import dumps
+
+
+def compute_etag(data) -> str:
+    """Strong ETag of a response body: a hash of its canonical JSON"""
+    return '"' + hashlib.sha256(dumps(data, sort_keys=True)).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, so W/ tags and * match too)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def list_cache_key(params: dict) -> str:
+    """Normalized GET /invoices parameters, so equivalent queries share an entry"""
+    normalized = dict(params)
+    search = (normalized.get("search") or "").strip().lower()
+    normalized["search"] = search or None
+    if not search:
+        normalized["search_items"] = False
+    if normalized.get("after") or normalized.get("before"):
+        normalized["page"] = None  # Cursor mode ignores page
+    normalized["fields"] = list(normalized.get("fields") or ())
+    return "list:" + json.dumps(normalized, sort_keys=True, default=str)
+
+
+class ResponseCache:
+    """Read-through cache of invoice detail and list responses, as (etag, data).
+
+    Invoices rarely change after extraction, so GET /invoice/{id} and repeated list
+    queries are answered without touching Postgres. Entries are dropped when
+    InvoiceService creates or updates an invoice: the invoice's own detail entry
+    and every list (any list may contain it). A read that raced with such a write
+    is not stored, see `generation`.
+
+    The default stores are per process; with several workers a write only clears
+    the cache of the worker that made it and the others serve stale data for at
+    most the TTL. Pass shared stores (same CacheStore interface) to avoid that.
+    """
+
+    def __init__(self, invoice_store=None, list_store=None):
+        enabled = settings.RESPONSE_CACHE_ENABLED
+        self.invoices = invoice_store or TTLCache(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE if enabled else 0,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            name="invoice_response_cache"
+        )
+        self.lists = list_store or TTLCache(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE if enabled else 0,
+            ttl_seconds=settings.RESPONSE_CACHE_LIST_TTL_SECONDS,
+            name="invoice_list_response_cache"
+        )
+        # Bumped by every invalidation; a load that started before one is not cached
+        self.generation = 0
+        self.invalidations = 0
+
+    async def read_through(self, store, key: str, loader):
+        cached = store.get(key)
+        if cached is not None:
+            return cached
+        generation = self.generation
+        data = await loader()
+        entry = (compute_etag(data), data)
+        if generation == self.generation:
+            store.set(key, entry)
+        return entry
+
+    async def invoice(self, invoice_id: int, loader):
+        return await self.read_through(self.invoices, f"invoice:{invoice_id}", loader)
+
+    async def invoice_list(self, params: dict, loader):
+        return await self.read_through(self.lists, list_cache_key(params), loader)
+
+    def invalidate_invoice(self, invoice_id: int):
+        self.generation += 1
+        self.invalidations += 1
+        self.invoices.delete(f"invoice:{invoice_id}")
+        self.lists.clear()
+
+    def invalidate_lists(self):
+        self.generation += 1
+        self.invalidations += 1
+        self.lists.clear()
+
+    def stats(self):
+        return {
+            "invoices": self.invoices.stats(),
+            "lists": self.lists.stats(),
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,125 @@
+import csv
+import io
+import zlib
+from app.utils.serialization import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# One exported row per line item (an invoice without items still gets one row);
+# NDJSON nests the ITEM_EXPORT_COLUMNS of each row under "items" instead
+INVOICE_EXPORT_COLUMNS = (
+    "id", "invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount",
+    "invoice_date_value", "total_amount_value",
+)
+ITEM_EXPORT_COLUMNS = (
+    "item_id", "item_description", "quantity", "unit_price", "item_total_amount",
+    "quantity_value", "unit_price_value", "item_total_amount_value",
+)
+EXPORT_COLUMNS = INVOICE_EXPORT_COLUMNS + ITEM_EXPORT_COLUMNS
+# Nested NDJSON items use the API's item field names
+ITEM_JSON_KEYS = {"item_id": "id", "item_total_amount": "total_amount", "item_total_amount_value": "total_amount_value"}
+
+
+def parquet_schema():
+    string = pa.string()
+    types = {
+        "id": pa.int64(), "item_id": pa.int64(),
+        "invoice_date_value": pa.date32(),
+        "total_amount_value": pa.decimal128(14, 2),
+        "quantity_value": pa.decimal128(14, 3),
+        "unit_price_value": pa.decimal128(14, 2),
+        "item_total_amount_value": pa.decimal128(14, 2),
+    }
+    return pa.schema([(name, types.get(name, string)) for name in EXPORT_COLUMNS])
+
+
+async def ndjson_chunks(row_chunks):
+    """One JSON object per invoice with its items nested; rows arrive ordered by invoice id"""
+    current = None
+    async for rows in row_chunks:
+        lines = []
+        for row in rows:
+            if current is None or current["id"] != row["id"]:
+                if current is not None:
+                    lines.append(dumps(current))
+                current = {name: row[name] for name in INVOICE_EXPORT_COLUMNS}
+                current["items"] = []
+            if row["item_id"] is not None:
+                current["items"].append({ITEM_JSON_KEYS.get(name, name): row[name] for name in ITEM_EXPORT_COLUMNS})
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    if current is not None:
+        yield dumps(current) + b"\n"
+
+
+async def csv_chunks(row_chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in row_chunks:
+        writer.writerows([row[name] for name in EXPORT_COLUMNS] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+async def parquet_chunks(row_chunks, compression: str = "snappy"):
+    """A Parquet file written one row group per chunk, each flushed as soon as it is written"""
+    if pa is None:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        async for rows in row_chunks:
+            columns = {name: [row[name] for row in rows] for name in EXPORT_COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
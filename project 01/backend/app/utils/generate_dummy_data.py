@@ -115,14 +115,14 @@ async def create_dummy_invoices():
             invoices_created += 1
             
             if invoices_created % 10 == 0:
-                logger.info(f"Created {invoices_created} invoices...")
+                logger.info("Created %s invoices...", invoices_created)
         
         # Commit all changes
         await db_session.commit()
-        logger.info(f"Successfully created {invoices_created} dummy invoices!")
+        logger.info("Successfully created %s dummy invoices!", invoices_created)
         
     except Exception as e:
-        logger.error(f"Error creating dummy invoices: {str(e)}")
+        logger.error("Error creating dummy invoices: %s", e)
         if db_session:
             await db_session.rollback()
         raise
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+from app.core.logger import logger
+
+try:
+    from PIL import Image, ImageChops, ImageOps
+except ImportError:  # Pillow is optional; without it images are sent as uploaded (TIFF / BMP are rejected)
+    Image = None
+
+# Magic bytes -> MIME type for the formats the model accepts (plus PDF, handled separately)
+SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+]
+
+OUTPUT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+# What the model takes as is; other images (TIFF, BMP) are always converted to JPEG
+MODEL_MIME_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+
+_executor = None
+
+
+class UnsupportedImageError(Exception):
+    pass
+
+
+def detect_mime_type(file_bytes) -> str:
+    """Detect the real file type from its first bytes instead of trusting the filename"""
+    header = bytes(file_bytes[:16])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    return "application/octet-stream"
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PREPROCESS_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _autocrop(image):
+    """Crop the uniform border around the document (scanner beds, desk background)"""
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background)
+    if diff.mode != "L":
+        diff = diff.convert("L")
+    bbox = diff.point(lambda value: 255 if value > 30 else 0).getbbox()
+    return image.crop(bbox) if bbox else image
+
+
+def _deskew(image):
+    """Rotate by the angle whose horizontal projection has the sharpest text lines"""
+    probe = ImageOps.invert(image.convert("L"))
+    probe.thumbnail((800, 800))
+    best_angle, best_score = 0.0, None
+    angle = -DESKEW_MAX_ANGLE
+    while angle <= DESKEW_MAX_ANGLE:
+        rotated = probe.rotate(angle, expand=False)
+        width = rotated.size[0]
+        data = rotated.tobytes()
+        rows = [sum(data[row * width:(row + 1) * width]) for row in range(rotated.size[1])]
+        score = sum((rows[i + 1] - rows[i]) ** 2 for i in range(len(rows) - 1))
+        if best_score is None or score > best_score:
+            best_angle, best_score = angle, score
+        angle += DESKEW_STEP
+    if best_angle == 0.0:
+        return image
+    return image.rotate(best_angle, expand=True, fillcolor="white" if image.mode == "RGB" else 255)
+
+
+def _preprocess_sync(file_bytes, options: dict):
+    """CPU-bound part of preprocessing; runs in the process pool.
+
+    Returns (image_bytes, mime_type, stats) where stats has per-stage timings.
+    """
+    timings = {}
+
+    def stage(name, started):
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    max_dimension = options["max_dimension"]
+    image = Image.open(io.BytesIO(file_bytes))
+    original_size = image.size
+    if max_dimension:
+        # JPEG can decode straight at a reduced scale (at least max_dimension)
+        image.draft(image.mode, (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    started = stage("decode", started)
+
+    # Downscale first: grayscale, autocrop and deskew then work on a fraction of the pixels
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        started = stage("resize", started)
+
+    if options["grayscale"] and image.mode != "L":
+        image = image.convert("L")
+        started = stage("grayscale", started)
+
+    if options["autocrop"]:
+        image = _autocrop(image)
+        started = stage("autocrop", started)
+
+    if options["deskew"]:
+        image = _deskew(image)
+        started = stage("deskew", started)
+
+    output = io.BytesIO()
+    output_format = options["output_format"]
+    image.save(output, format=output_format, quality=options["quality"], optimize=True)
+    stage("encode", started)
+
+    stats = {
+        "original_size": original_size,
+        "output_size": image.size,
+        "stages_ms": timings,
+    }
+    return output.getvalue(), OUTPUT_MIME_TYPES[output_format], stats
+
+
+def preprocess_options():
+    if not settings.IMAGE_PREPROCESS_ENABLED:
+        # Only a format conversion: same pixels, re-encoded as JPEG
+        return {
+            "max_dimension": None, "grayscale": False, "autocrop": False, "deskew": False,
+            "output_format": "JPEG", "quality": settings.IMAGE_OUTPUT_QUALITY,
+        }
+    return {
+        "max_dimension": settings.IMAGE_MAX_DIMENSION,
+        "grayscale": settings.IMAGE_GRAYSCALE,
+        "autocrop": settings.IMAGE_AUTOCROP,
+        "deskew": settings.IMAGE_DESKEW,
+        "output_format": settings.IMAGE_OUTPUT_FORMAT.upper(),
+        "quality": settings.IMAGE_OUTPUT_QUALITY,
+    }
+
+
+async def preprocess_image(file_bytes, filename: str = None):
+    """Shrink an image before it is sent to the model.
+
+    Returns (image_bytes, mime_type). Images the model accepts are returned unchanged
+    when preprocessing is disabled, Pillow is missing, preprocessing fails or the
+    processed version would not be smaller. Other images (TIFF, BMP) are always
+    converted; UnsupportedImageError when that is not possible or the file is not
+    an image at all.
+    """
+    mime_type = detect_mime_type(file_bytes)
+    if not mime_type.startswith("image/"):
+        raise UnsupportedImageError(f"{filename} is not a supported image ({mime_type}); upload JPEG, PNG, GIF, WEBP, TIFF, BMP or PDF")
+    must_convert = mime_type not in MODEL_MIME_TYPES
+    if not settings.IMAGE_PREPROCESS_ENABLED and not must_convert:
+        return file_bytes, mime_type
+    if Image is None:
+        if must_convert:
+            raise UnsupportedImageError(f"{filename} is {mime_type}, which needs Pillow to be converted for the model")
+        logger.warning("Pillow is not installed, skipping image preprocessing")
+        return file_bytes, mime_type
+
+    options = preprocess_options()
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        image_bytes, output_mime_type, stats = await loop.run_in_executor(
+            get_executor(), _preprocess_sync, file_bytes, options
+        )
+    except Exception as e:
+        if must_convert:
+            raise UnsupportedImageError(f"{filename} ({mime_type}) could not be converted for the model: {e}")
+        logger.warning("Image preprocessing failed for %s, sending original: %s", filename, e)
+        return file_bytes, mime_type
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    if len(image_bytes) >= len(file_bytes) and not must_convert:
+        logger.info("Preprocessing did not shrink %s (%s bytes), sending original", filename, len(file_bytes))
+        return file_bytes, mime_type
+
+    logger.info(
+        "Preprocessed %s: %s -> %s bytes (%s saved), %s -> %s, stages_ms=%s, total_ms=%s",
+        filename, len(file_bytes), len(image_bytes), len(file_bytes) - len(image_bytes),
+        stats["original_size"], stats["output_size"], stats["stages_ms"], total_ms
+    )
+    return image_bytes, output_mime_type
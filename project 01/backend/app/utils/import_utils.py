@@ -0,0 +1,197 @@
+import csv
+import hashlib
+import io
+from itertools import islice
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from typing import List
+from app.schemas.invoice import InvoiceCreate
+from app.utils.export_utils import EXPORT_COLUMNS
+from app.utils.parse_utils import parse_date, parse_money, parse_quantity
+
+try:
+    import ijson
+except ImportError:  # Without ijson JSON arrays are read whole; NDJSON and CSV always stream
+    ijson = None
+
+IMPORT_FORMATS = ("ndjson", "json", "csv")
+
+# Column order of the staging tables the bulk import COPYs into
+STAGE_INVOICE_COLUMNS = (
+    "seq", "invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount",
+    "invoice_date_value", "total_amount_value",
+)
+STAGE_ITEM_COLUMNS = (
+    "invoice_seq", "position", "item_description", "quantity", "unit_price", "total_amount",
+    "quantity_value", "unit_price_value", "total_amount_value",
+)
+
+# CSV columns are the ones /invoices/export writes: one row per item, header repeated
+CSV_INVOICE_FIELDS = ("invoice_number", "invoice_date", "customer_name", "vendor_name", "total_amount")
+CSV_ITEM_FIELDS = {"item_description": "item_description", "quantity": "quantity", "unit_price": "unit_price", "item_total_amount": "total_amount"}
+
+_invoice_list = TypeAdapter(List[InvoiceCreate])
+
+
+class UnreadableRecord:
+    """Stands in for an input record that could not be parsed, so it is reported
+    as invalid (and counted for resuming) instead of aborting the import"""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def file_fingerprint(file, chunk_size: int = 1024 * 1024):
+    """SHA-256 of a seekable binary file, which is left at its start"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def detect_format(filename: str, import_format: str = None):
+    if import_format:
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format {import_format}; use one of {', '.join(IMPORT_FORMATS)}")
+        return import_format
+    extension = (filename or "").lower().rsplit(".", 1)[-1]
+    if extension in ("ndjson", "jsonl"):
+        return "ndjson"
+    if extension in IMPORT_FORMATS:
+        return extension
+    raise ValueError(f"Cannot tell the format of {filename}; pass one of {', '.join(IMPORT_FORMATS)}")
+
+
+def read_ndjson(file):
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield UnreadableRecord(f"Invalid JSON: {e}")
+
+
+def read_json(file):
+    """Invoices of a JSON array, or of the "data" array of an API response"""
+    if ijson is None:
+        document = orjson.loads(file.read())
+        yield from document.get("data", []) if isinstance(document, dict) else document
+        return
+    first = file.read(1)
+    while first.isspace():
+        first = file.read(1)
+    # ijson wants the whole stream; put the peeked byte back in front
+    stream = io.BufferedReader(_Prepended(first, file))
+    yield from ijson.items(stream, "data.item" if first == b"{" else "item")
+
+
+class _Prepended(io.RawIOBase):
+    def __init__(self, head: bytes, file):
+        self.head = head
+        self.file = file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.head or self.file.read(len(buffer))
+        self.head = b""
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def read_csv(file):
+    """Invoices of an /invoices/export CSV: consecutive rows of the same invoice become its items"""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    missing = [name for name in CSV_INVOICE_FIELDS if name not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV import needs the columns {', '.join(CSV_INVOICE_FIELDS)} (see {', '.join(EXPORT_COLUMNS)}); missing {', '.join(missing)}")
+    key_fields = ("id",) if "id" in reader.fieldnames else CSV_INVOICE_FIELDS
+    current, current_key = None, None
+    for row in reader:
+        key = tuple(row[name] for name in key_fields)
+        if key != current_key:
+            if current is not None:
+                yield current
+            current = {name: row[name] for name in CSV_INVOICE_FIELDS}
+            current["items"] = []
+            current_key = key
+        if any(row.get(column) for column in CSV_ITEM_FIELDS):
+            current["items"].append({field: row.get(column) or "" for column, field in CSV_ITEM_FIELDS.items()})
+    if current is not None:
+        yield current
+
+
+READERS = {"ndjson": read_ndjson, "json": read_json, "csv": read_csv}
+
+
+def error_text(error: ValidationError):
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc']) or 'record'}: {err['msg']}" for err in error.errors())
+
+
+def validate_batch(records: list):
+    """(valid InvoiceCreate list, [(index in records, error)]) of a batch.
+
+    The whole batch is validated in one call; only a batch with errors is
+    validated again record by record to tell the good ones from the bad.
+    """
+    if not any(isinstance(record, UnreadableRecord) for record in records):
+        try:
+            return _invoice_list.validate_python(records), []
+        except ValidationError:
+            pass
+    valid, errors = [], []
+    for index, record in enumerate(records):
+        if isinstance(record, UnreadableRecord):
+            errors.append((index, record.error))
+            continue
+        try:
+            valid.append(InvoiceCreate.model_validate(record))
+        except ValidationError as e:
+            errors.append((index, error_text(e)))
+    return valid, errors
+
+
+def staging_rows(invoices: list):
+    """COPY records for the staging tables, with the typed values parsed like the app does"""
+    invoice_rows, item_rows = [], []
+    for seq, invoice in enumerate(invoices):
+        invoice_rows.append((
+            seq, invoice.invoice_number, invoice.invoice_date, invoice.customer_name, invoice.vendor_name,
+            invoice.total_amount, parse_date(invoice.invoice_date), parse_money(invoice.total_amount),
+        ))
+        for position, item in enumerate(invoice.items):
+            item_rows.append((
+                seq, position, item.item_description, item.quantity, item.unit_price, item.total_amount,
+                parse_quantity(item.quantity), parse_money(item.unit_price), parse_money(item.total_amount),
+            ))
+    return invoice_rows, item_rows
+
+
+class ImportBatches:
+    """Reads, validates and stages an input file `batch_size` records at a time.
+
+    next() is blocking (parsing and validation are CPU work); the import service
+    runs it in a thread while the previous batch is being loaded.
+    """
+
+    def __init__(self, file, import_format: str, batch_size: int, skip: int = 0):
+        self.records = islice(READERS[import_format](file), skip, None)
+        self.batch_size = batch_size
+        self.position = skip  # Records consumed so far, including skipped ones
+
+    def next(self):
+        """(first record number, record count, invoice rows, item rows, errors) or None at the end"""
+        records = list(islice(self.records, self.batch_size))
+        if not records:
+            return None
+        first = self.position
+        self.position += len(records)
+        valid, errors = validate_batch(records)
+        invoice_rows, item_rows = staging_rows(valid)
+        return first, len(records), invoice_rows, item_rows, [(first + index + 1, error) for index, error in errors]
@@ -1,7 +1,12 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from fastapi import HTTPException
 from app.core.config import settings
-import base64
+from app.core.metrics import Counter, Histogram
+from app.core.tracing import tracer, traced
+from app.utils.upload_utils import encode_data_url
+from contextlib import asynccontextmanager
+import asyncio
+import time
 
 OPENAI_API_KEY = settings.OPENAI_API_KEY
 PROMPT = """
@@ -33,29 +38,98 @@ IMPORTANT FORMATTING RULES:
 Do not include any markdown, code blocks, explanations, or additional keys. Return only the JSON object.
 """
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+model_requests = Counter("model_requests_total", "Model API calls", labelnames=("model", "outcome"))
+model_seconds = Histogram("model_request_duration_seconds", "Model API call latency", labelnames=("model",))
+model_tokens = Counter("model_tokens_total", "Tokens used by model calls", labelnames=("model", "kind"))
+model_cost = Counter("model_cost_usd_total", "Estimated model spend from token usage and OPENAI_*_COST_PER_1M_TOKENS", labelnames=("model",))
+slot_wait_seconds = Histogram("extraction_slot_wait_seconds", "Time spent waiting for a free extraction slot")
 
-def extract_invoice_data(file):
-    file_bytes = file.file.read()
-    base64_image = base64.b64encode(file_bytes).decode("utf-8")
-    image_data_url = f"data:image/jpeg;base64,{base64_image}"
+_client = None
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": PROMPT},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Extract invoice data as JSON."},
-                        {"type": "image_url", "image_url": {"url": image_data_url}}
-                    ]
-                }
-            ],
-            max_tokens=1000
+def get_client():
+    """Created on first use so the local and fake extractors run without an API key"""
+    global _client
+    if _client is None:
+        if not OPENAI_API_KEY:
+            raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured")
+        _client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            max_retries=settings.OPENAI_MAX_RETRIES
         )
-        extracted_json = response.choices[0].message.content
-        return extracted_json
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
+    return _client
+
+# Caps the number of model calls in flight so a burst of uploads cannot
+# exhaust sockets or the OpenAI rate limit; everything else keeps running.
+_extraction_slots = asyncio.Semaphore(settings.EXTRACTION_MAX_CONCURRENCY)
+
+def record_usage(model: str, usage, span):
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    model_tokens.inc(prompt_tokens, model=model, kind="prompt")
+    model_tokens.inc(completion_tokens, model=model, kind="completion")
+    span.set_attribute("llm.prompt_tokens", prompt_tokens)
+    span.set_attribute("llm.completion_tokens", completion_tokens)
+    model_cost.inc(
+        (prompt_tokens * settings.OPENAI_INPUT_COST_PER_1M_TOKENS + completion_tokens * settings.OPENAI_OUTPUT_COST_PER_1M_TOKENS) / 1_000_000,
+        model=model
+    )
+
+@asynccontextmanager
+async def extraction_slot():
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_extraction_slots.acquire(), timeout=settings.EXTRACTION_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many invoices are being extracted, please retry shortly")
+    finally:
+        slot_wait_seconds.observe(time.perf_counter() - started)
+    try:
+        yield
+    finally:
+        _extraction_slots.release()
+
+async def _complete(user_content, max_tokens: int = 1000):
+    model = settings.OPENAI_MODEL
+    # Outside the try below: a missing API key is a configuration error, not a model error
+    client = get_client()
+    async with extraction_slot():
+        started = time.perf_counter()
+        with tracer.span("openai.chat.completions", **{"llm.model": model, "llm.max_tokens": max_tokens}) as span:
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": PROMPT},
+                        {"role": "user", "content": user_content}
+                    ],
+                    max_tokens=max_tokens
+                )
+                model_requests.inc(model=model, outcome="ok")
+                record_usage(model, response.usage, span)
+                extracted_json = response.choices[0].message.content
+                return extracted_json
+            except Exception as e:
+                model_requests.inc(model=model, outcome="error")
+                raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}") from e
+            finally:
+                model_seconds.observe(time.perf_counter() - started, model=model)
+
+@traced()
+async def extract_invoice_data(file_bytes: bytes, mime_type: str = "image/jpeg", release_upload: bool = False):
+    image_data_url = encode_data_url(file_bytes, mime_type, release_source=release_upload)
+    return await _complete([
+        {"type": "text", "text": "Extract invoice data as JSON."},
+        {"type": "image_url", "image_url": {"url": image_data_url}}
+    ])
+
+@traced()
+async def extract_invoice_text(invoice_text: str):
+    """Text-only extraction for documents with a text layer; no vision tokens needed"""
+    return await _complete(
+        f"Extract invoice data as JSON from this invoice text:\n\n{invoice_text}",
+        max_tokens=4000
+    )
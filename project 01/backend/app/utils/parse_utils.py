@@ -0,0 +1,125 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import partial
+from app.models.invoice import Invoice, Item
+
+ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+NUMERIC_DATE_RE = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b")
+TEXT_DATE_FORMATS = ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%b %d %Y", "%B %d %Y", "%d-%b-%Y", "%d-%b-%y")
+# Digits with thousands / decimal separators, optionally in scientific notation ("1e5")
+NUMBER_RE = re.compile(r"(-?\d[\d.,]*)([eE][-+]?\d+)?")
+
+
+def parse_date(value):
+    """Date of an invoice date string, or None.
+
+    Numeric dates follow InvoiceService.normalize_date: month first unless the first
+    part is greater than 12, two digit years below 50 are 20xx.
+    """
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    try:
+        match = ISO_DATE_RE.search(text)
+        if match:
+            year, month, day = (int(part) for part in match.groups())
+            return date(year, month, day)
+        match = NUMERIC_DATE_RE.search(text)
+        if match:
+            first, second, year = (int(part) for part in match.groups())
+            if len(match.group(3)) == 2:
+                year += 2000 if year < 50 else 1900
+            month, day = (second, first) if first > 12 else (first, second)
+            return date(year, month, day)
+    except ValueError:
+        return None
+    for date_format in TEXT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize_separators(number: str) -> str:
+    """Plain decimal string of digits written with thousands / decimal separators"""
+    if "," in number and "." in number:
+        # Whichever comes last is the decimal separator: 1.234.567,50 / 1,234,567.50
+        thousands, decimal = (".", ",") if number.rfind(",") > number.rfind(".") else (",", ".")
+        return number.replace(thousands, "").replace(decimal, ".")
+    for separator in (",", "."):
+        if number.count(separator) > 1:
+            # Repeated, so it separates thousands: 1.234.567 / 1,234,567
+            return number.replace(separator, "")
+    if number.count(",") == 1 and len(number.split(",")[1]) <= 2:
+        # 99,50
+        return number.replace(",", ".")
+    return number.replace(",", "")
+
+
+def fits_numeric(amount: Decimal, precision: int, scale: int) -> bool:
+    """Whether NUMERIC(precision, scale) can store `amount` once Postgres has rounded it"""
+    try:
+        rounded = amount.quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP)
+    except InvalidOperation:  # More digits than the decimal context holds
+        return False
+    return abs(rounded) < Decimal(10) ** (precision - scale)
+
+
+def parse_amount(value, precision: int = 14, scale: int = 2):
+    """Decimal of an amount or quantity string ("1,234.50", "Rs. 99", "1.234,50", "1.234.567", "(12.00)", "1e5"), or None.
+
+    Values NUMERIC(precision, scale) cannot hold are OCR misreads and also give None,
+    rather than failing the whole insert with a numeric overflow.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        amount = Decimal(str(value))
+        return amount if fits_numeric(amount, precision, scale) else None
+    text = str(value).strip().replace(" ", "")
+    match = NUMBER_RE.search(text)
+    if not match:
+        return None
+    digits, exponent = match.groups()
+    number = _normalize_separators(digits.rstrip(".,")) + (exponent or "")
+    try:
+        amount = Decimal(number)
+    except InvalidOperation:
+        return None
+    if text.startswith("(") and text.endswith(")"):
+        amount = -amount
+    return amount if fits_numeric(amount, precision, scale) else None
+
+
+def numeric_parser(column):
+    """parse_amount bounded by the precision and scale of a Numeric column"""
+    return partial(parse_amount, precision=column.type.precision, scale=column.type.scale)
+
+
+parse_money = numeric_parser(Invoice.total_amount_value)
+parse_quantity = numeric_parser(Item.quantity_value)
+
+# raw string field -> (typed column, parser); the raw strings are kept as extracted
+INVOICE_TYPED_FIELDS = {
+    "invoice_date": ("invoice_date_value", parse_date),
+    "total_amount": ("total_amount_value", numeric_parser(Invoice.total_amount_value)),
+}
+ITEM_TYPED_FIELDS = {
+    "quantity": ("quantity_value", numeric_parser(Item.quantity_value)),
+    "unit_price": ("unit_price_value", numeric_parser(Item.unit_price_value)),
+    "total_amount": ("total_amount_value", numeric_parser(Item.total_amount_value)),
+}
+TYPED_COLUMNS = {typed for typed, _ in INVOICE_TYPED_FIELDS.values()} | {typed for typed, _ in ITEM_TYPED_FIELDS.values()}
+
+
+def with_typed_values(data: dict, typed_fields: dict) -> dict:
+    """Copy of `data` with the typed value of every raw field it contains"""
+    typed = dict(data)
+    for field, (typed_field, parser) in typed_fields.items():
+        if field in data:
+            typed[typed_field] = parser(data[field])
+    return typed
@@ -0,0 +1,63 @@
+import asyncio
+from app.core.config import settings
+from app.utils.image_utils import get_executor
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # PDF support is optional
+    fitz = None
+
+
+def _read_pdf_text(pdf_bytes, max_pages: int):
+    """Return (page_count, [text of each page]); runs in the process pool.
+
+    The text is not read (None) when the PDF has more than max_pages pages.
+    """
+    with fitz.open(stream=bytes(pdf_bytes), filetype="pdf") as document:
+        if document.page_count > max_pages:
+            return document.page_count, None
+        return document.page_count, [page.get_text("text") for page in document]
+
+
+def _render_pdf_pages(pdf_bytes, first: int, last: int, dpi: int):
+    """Rasterize pages first..last-1 to PNG; runs in the process pool.
+
+    One call per range, so the PDF is sent to the worker and opened once per range
+    instead of once per page.
+    """
+    with fitz.open(stream=bytes(pdf_bytes), filetype="pdf") as document:
+        return [
+            document[page_number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+            for page_number in range(first, last)
+        ]
+
+
+def _require_pymupdf():
+    if fitz is None:
+        raise ValueError("PDF invoices require PyMuPDF (pip install pymupdf)")
+
+
+async def read_pdf_text(pdf_bytes):
+    """Page count and per-page text layer of a PDF"""
+    _require_pymupdf()
+    loop = asyncio.get_running_loop()
+    page_count, page_texts = await loop.run_in_executor(get_executor(), _read_pdf_text, pdf_bytes, settings.PDF_MAX_PAGES)
+    if page_texts is None:
+        raise ValueError(f"PDF has {page_count} pages, the limit is {settings.PDF_MAX_PAGES}")
+    return page_count, page_texts
+
+
+def has_text_layer(page_texts) -> bool:
+    """True when every page carries real text, so the model can skip vision entirely"""
+    return bool(page_texts) and all(
+        len(text.strip()) >= settings.PDF_MIN_TEXT_CHARS for text in page_texts
+    )
+
+
+async def render_pdf_pages(pdf_bytes, first: int, last: int):
+    """PNG bytes of pages first..last-1, rendered in the process pool only when they are needed"""
+    _require_pymupdf()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), _render_pdf_pages, pdf_bytes, first, last, settings.PDF_RENDER_DPI
+    )
@@ -102,7 +102,7 @@ def generate_invoice_items():
 
 async def create_dummy_invoices(db: AsyncSession, count: int = 30):
     """Create dummy invoices in the database"""
-    logger.info(f"Creating {count} dummy invoices...")
+    logger.info("Creating %s dummy invoices...", count)
     
     created_count = 0
     
@@ -143,14 +143,14 @@ async def create_dummy_invoices(db: AsyncSession, count: int = 30):
             
             await db.commit()
             created_count += 1
-            logger.info(f"Created invoice {created_count}/{count}: {invoice_number}")
+            logger.info("Created invoice %s/%s: %s", created_count, count, invoice_number)
             
         except Exception as e:
             await db.rollback()
-            logger.error(f"Error creating invoice {i+1}: {str(e)}")
+            logger.error("Error creating invoice %s: %s", i + 1, e)
             continue
     
-    logger.info(f"Successfully created {created_count} dummy invoices!")
+    logger.info("Successfully created %s dummy invoices!", created_count)
     return created_count
 
 async def main():
@@ -164,7 +164,7 @@ async def main():
             print("🔄 Refresh your frontend to see the new data with pagination!")
             
     except Exception as e:
-        logger.error(f"Error in main: {str(e)}")
+        logger.error("Error in main: %s", e)
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
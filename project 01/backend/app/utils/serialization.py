@@ -0,0 +1,30 @@
+"""
+Response serialization for the invoice read/update endpoints.
+
+Endpoints that return a plain dict go through FastAPI's generic jsonable_encoder
+(a recursive walk of every value) and then json.dumps. The invoice endpoints
+instead return JSONBytesResponse, which hands the repository's dicts straight to
+orjson, so a page of invoices with items becomes bytes in one compiled pass.
+"""
+from decimal import Decimal
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    # Same numbers jsonable_encoder produces for NUMERIC columns
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data, sort_keys: bool = False) -> bytes:
+    """JSON bytes of response data (dicts, lists, str, numbers, Decimal, date/datetime)"""
+    return orjson.dumps(data, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+
+class JSONBytesResponse(JSONResponse):
+    """JSONResponse rendered with orjson. Return it from an endpoint to skip jsonable_encoder."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,122 @@
+import binascii
+import hashlib
+import os
+import zipfile
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+UPLOAD_CHUNK_SIZE = 256 * 1024
+BASE64_CHUNK_SIZE = 3 * 64 * 1024  # Multiple of 3 so chunks encode without padding
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+async def read_upload(file, max_bytes: int = None):
+    """Read an UploadFile in chunks, hashing as it goes.
+
+    Returns (file_bytes, sha256 hex digest). Raises UploadTooLargeError as soon as
+    the upload passes `max_bytes`, without reading the rest of it. The bytes are a
+    bytearray preallocated from the declared size, so chunks are copied exactly once.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise UploadTooLargeError(f"{file.filename} is {size} bytes, the limit is {max_bytes} bytes")
+
+    digest = hashlib.sha256()
+    buffer = bytearray(size or 0)
+    position = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        end = position + len(chunk)
+        if end > max_bytes:
+            raise UploadTooLargeError(f"{file.filename} exceeds the upload limit of {max_bytes} bytes")
+        digest.update(chunk)
+        buffer[position:end] = chunk  # Grows the buffer if the declared size was wrong
+        position = end
+    del buffer[position:]
+    return buffer, digest.hexdigest()
+
+
+def encode_data_url(file_bytes, mime_type: str = "image/jpeg", release_source: bool = False) -> str:
+    """Build a base64 data URL with a single full-size intermediate buffer.
+
+    Encodes chunk by chunk straight into a preallocated buffer behind the prefix,
+    instead of b64encode -> decode -> f-string. With release_source=True a bytearray
+    source is cleared once encoded, so the raw bytes are gone before the final str
+    is built; only pass it when nothing needs the bytes afterwards.
+    """
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    out = bytearray(len(prefix) + 4 * ((len(file_bytes) + 2) // 3))
+    out[:len(prefix)] = prefix
+    position = len(prefix)
+    with memoryview(file_bytes) as view:
+        for start in range(0, len(view), BASE64_CHUNK_SIZE):
+            encoded = binascii.b2a_base64(view[start:start + BASE64_CHUNK_SIZE], newline=False)
+            out[position:position + len(encoded)] = encoded
+            position += len(encoded)
+    if release_source and isinstance(file_bytes, bytearray):
+        file_bytes.clear()
+    return out.decode("ascii")
+
+
+def is_zip_upload(file) -> bool:
+    filename = (file.filename or "").lower()
+    return filename.endswith(".zip") or (file.content_type or "").lower() in ZIP_CONTENT_TYPES
+
+
+def _is_skipped_zip_entry(info: zipfile.ZipInfo) -> bool:
+    """Directories and OS metadata (__MACOSX/, .DS_Store, ._foo) are not invoices"""
+    name = info.filename
+    basename = os.path.basename(name)
+    return info.is_dir() or name.startswith("__MACOSX/") or not basename or basename.startswith(".")
+
+
+async def iter_upload_entries(files):
+    """Yield (filename, file_bytes) for every invoice in a multi-file upload.
+
+    ZIP archives are read entry by entry from the spooled upload, so only the
+    entries currently being processed are held in memory.
+    """
+    count = 0
+    for file in files:
+        if is_zip_upload(file):
+            archive = zipfile.ZipFile(file.file)
+            try:
+                for info in archive.infolist():
+                    if _is_skipped_zip_entry(info):
+                        continue
+                    count += 1
+                    if count > settings.BATCH_MAX_FILES:
+                        raise ValueError(f"Batch exceeds the limit of {settings.BATCH_MAX_FILES} files")
+                    # Trust the header only as an early reject; zip bombs can lie about it
+                    if info.file_size > settings.MAX_UPLOAD_BYTES:
+                        raise UploadTooLargeError(f"{info.filename} is {info.file_size} bytes, the limit is {settings.MAX_UPLOAD_BYTES} bytes")
+                    file_bytes = await run_in_threadpool(_read_zip_entry, archive, info)
+                    yield info.filename, file_bytes
+            finally:
+                archive.close()
+        else:
+            count += 1
+            if count > settings.BATCH_MAX_FILES:
+                raise ValueError(f"Batch exceeds the limit of {settings.BATCH_MAX_FILES} files")
+            file_bytes, _ = await read_upload(file)
+            yield file.filename, file_bytes
+
+
+def _read_zip_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+    buffer = bytearray()
+    with archive.open(info) as entry:
+        while True:
+            chunk = entry.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(buffer) + len(chunk) > settings.MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError(f"{info.filename} exceeds the upload limit of {settings.MAX_UPLOAD_BYTES} bytes")
+            buffer += chunk
+    return buffer
@@ -0,0 +1,4 @@
+import os
+
+# Settings needs a database URL to load; these tests never connect to it
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/invoice_tests")
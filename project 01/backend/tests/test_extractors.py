@@ -0,0 +1,119 @@
+import asyncio
+import json
+import pytest
+from app.extractors import registry
+from app.extractors.base import Extractor, ExtractionResult
+from app.extractors.cascade_extractor import CascadeExtractor
+from app.extractors.fake_extractor import FakeExtractor
+from app.extractors.local_extractor import parse_invoice_text
+
+
+class FixedExtractor(Extractor):
+    """Returns a fixed confidence (or raises) and records how often it was called"""
+
+    def __init__(self, name: str, confidence: float = 1.0, error: Exception = None):
+        self.name = name
+        self.confidence = confidence
+        self.error = error
+        self.calls = 0
+
+    async def _result(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return ExtractionResult(json.dumps({"backend": self.name}), self.confidence, self.name)
+
+    async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False):
+        return await self._result()
+
+    async def extract_text(self, invoice_text: str):
+        return await self._result()
+
+
+def test_fake_extractor_is_deterministic_per_input():
+    extractor = FakeExtractor()
+    first = asyncio.run(extractor.extract_image(b"invoice-1", "image/jpeg"))
+    again = asyncio.run(extractor.extract_image(b"invoice-1", "image/jpeg"))
+    other = asyncio.run(extractor.extract_image(b"invoice-2", "image/jpeg"))
+
+    assert first.content == again.content
+    assert first.content != other.content
+    assert first.backend == "fake"
+    assert first.confidence == 1.0
+
+
+def test_fake_extractor_totals_add_up():
+    result = asyncio.run(FakeExtractor().extract_text("some invoice text"))
+    invoice = json.loads(result.content)
+
+    items_total = sum(float(item["total_amount"]) for item in invoice["items"])
+    assert invoice["invoice_number"].startswith("FAKE-")
+    assert float(invoice["total_amount"]) == pytest.approx(items_total, abs=0.01)
+
+
+def test_extractor_requires_both_methods():
+    class ImageOnly(Extractor):
+        async def extract_image(self, image_bytes, mime_type: str, release_upload: bool = False):
+            return ExtractionResult("{}")
+
+    with pytest.raises(TypeError):
+        ImageOnly()
+
+
+def test_registry_returns_one_instance_per_backend():
+    extractor = registry.get_extractor("FAKE")
+
+    assert isinstance(extractor, FakeExtractor)
+    assert registry.get_extractor("fake") is extractor
+
+
+def test_registry_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown extractor backend"):
+        registry.get_extractor("nope")
+
+
+def test_register_extractor_replaces_cached_instance():
+    registry.register_extractor("fixed", lambda: FixedExtractor("first"))
+    try:
+        assert registry.get_extractor("fixed").name == "first"
+        registry.register_extractor("fixed", lambda: FixedExtractor("second"))
+        assert registry.get_extractor("fixed").name == "second"
+    finally:
+        registry.EXTRACTORS.pop("fixed", None)
+        registry._instances.pop("fixed", None)
+
+
+@pytest.mark.parametrize("confidence, expected", [(0.8, "primary"), (0.95, "primary"), (0.79, "fallback")])
+def test_cascade_falls_back_below_threshold(confidence, expected):
+    primary = FixedExtractor("primary", confidence)
+    fallback = FixedExtractor("fallback")
+    cascade = CascadeExtractor(primary, fallback, min_confidence=0.8)
+
+    result = asyncio.run(cascade.extract_image(b"image", "image/jpeg"))
+
+    assert result.backend == expected
+    assert primary.calls == 1
+    assert fallback.calls == (1 if expected == "fallback" else 0)
+
+
+def test_cascade_falls_back_when_primary_fails():
+    cascade = CascadeExtractor(FixedExtractor("primary", error=ValueError("OCR failed")), FixedExtractor("fallback"))
+
+    result = asyncio.run(cascade.extract_text("invoice text"))
+
+    assert result.backend == "fallback"
+
+
+def test_local_parser_prefers_invoice_date_label():
+    text = "ACME Ltd\nDue Date: 2025-02-15\nInvoice Date: 2025-01-15\nInvoice No: A-1\n"
+
+    invoice, _ = parse_invoice_text(text)
+
+    assert invoice["invoice_date"] == "2025-01-15"
+    assert invoice["invoice_number"] == "A-1"
+
+
+def test_local_parser_falls_back_to_any_date_label():
+    invoice, _ = parse_invoice_text("ACME Ltd\nDate: 15/01/2025\n")
+
+    assert invoice["invoice_date"] == "15/01/2025"
@@ -0,0 +1,137 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from app.models.invoice import Invoice
+from app.repositories.invoice_repository import (
+    SORTABLE_COLUMNS, InvalidCursorError, cursor_page, decode_cursor, encode_cursor, item_changes_statement,
+    keyset_seek, sort_key_expression,
+)
+
+HOSTILE = "x'); DROP TABLE items; --"
+
+
+def compile_postgres(statement):
+    return statement.compile(dialect=postgresql.asyncpg.dialect())
+
+
+def test_item_changes_bind_client_values():
+    compiled = compile_postgres(item_changes_statement(5, [
+        {"id": 1, "item_description": HOSTILE, "quantity": "2", "quantity_value": Decimal("2")},
+        {"id": 2, "unit_price": "3.00", "unit_price_value": Decimal("3.00")},
+    ]))
+    sql = str(compiled)
+
+    assert HOSTILE not in sql
+    assert "DROP TABLE" not in sql
+    assert HOSTILE in compiled.params.values()
+    assert Decimal("3.00") in compiled.params.values()
+
+
+def test_item_changes_type_every_values_column():
+    sql = str(compile_postgres(item_changes_statement(5, [{"id": 1, "quantity": "2"}])))
+
+    # Columns missing from every row are typed NULLs, not untyped ones
+    assert "CAST(NULL AS VARCHAR)" in sql
+    assert "CAST(NULL AS NUMERIC(14, 2))" in sql
+    assert "items.invoice_id = " in sql
+
+
+def row(id, **values):
+    return SimpleNamespace(id=id, **values)
+
+
+@pytest.mark.parametrize("sort_by, attribute, value", [
+    ("id", "id", 42),
+    ("invoice_number", "invoice_number", "INV-7"),
+    ("invoice_date", "invoice_date_value", date(2025, 1, 15)),
+    ("total_amount", "total_amount_value", Decimal("1234.50")),
+])
+def test_cursor_round_trips_its_sort_value(sort_by, attribute, value):
+    column = SORTABLE_COLUMNS[sort_by]
+    invoice = row(42) if attribute == "id" else row(42, **{attribute: value})
+    token = encode_cursor(invoice, sort_by, "desc", column)
+
+    assert "=" not in token
+    assert decode_cursor(token, sort_by, "DESC", column) == (value, 42)
+
+
+@pytest.mark.parametrize("sort_by, sentinel", [
+    ("invoice_number", ""),
+    ("invoice_date", date(1, 1, 1)),
+    ("total_amount", Decimal("-1e18")),
+])
+def test_cursor_on_a_null_sort_value_carries_the_sentinel(sort_by, sentinel):
+    column = SORTABLE_COLUMNS[sort_by]
+    token = encode_cursor(row(3, **{column.key: None}), sort_by, "asc", column)
+
+    assert decode_cursor(token, sort_by, "asc", column) == (sentinel, 3)
+
+
+@pytest.mark.parametrize("sort_by, sort_order", [("vendor_name", "desc"), ("invoice_number", "asc")])
+def test_cursor_from_a_different_sort_is_rejected(sort_by, sort_order):
+    token = encode_cursor(row(1, invoice_number="A"), "invoice_number", "desc", Invoice.invoice_number)
+
+    with pytest.raises(InvalidCursorError, match="different sort"):
+        decode_cursor(token, sort_by, sort_order, SORTABLE_COLUMNS[sort_by])
+
+
+def tampered_cursor():
+    payload = {"s": "total_amount", "o": "desc", "v": "not a number", "id": 1}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("token", ["garbage!", "", base64.urlsafe_b64encode(b"[1, 2]").decode(), tampered_cursor()])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursorError, match="Invalid pagination cursor"):
+        decode_cursor(token, "total_amount", "desc", Invoice.total_amount_value)
+
+
+@pytest.mark.parametrize("column, literal", [
+    (Invoice.invoice_number, "coalesce(invoices.invoice_number, '')"),
+    (Invoice.invoice_date_value, "coalesce(invoices.invoice_date_value, '0001-01-01'::date)"),
+    (Invoice.total_amount_value, "coalesce(invoices.total_amount_value, '-1e18'::numeric)"),
+])
+def test_sort_key_folds_nulls_into_the_sentinel(column, literal):
+    assert str(compile_postgres(sort_key_expression(column))) == literal
+
+
+def test_id_sort_key_is_the_bare_column():
+    assert sort_key_expression(Invoice.id) is Invoice.id
+
+
+@pytest.mark.parametrize("descending, comparison, order", [
+    (True, "<", "DESC"),
+    (False, ">", "ASC"),
+])
+def test_keyset_seek_compares_and_orders_in_the_walk_direction(descending, comparison, order):
+    sort_key = sort_key_expression(Invoice.invoice_number)
+    sql = str(compile_postgres(keyset_seek(select(Invoice.id), sort_key, "INV-7", 42, descending)))
+
+    key = "coalesce(invoices.invoice_number, '')"
+    assert f"WHERE ({key}, invoices.id) {comparison} ($1::VARCHAR, $2::INTEGER)" in sql
+    assert f"ORDER BY {key} {order}, invoices.id {order}" in sql
+
+
+def encode_id(invoice):
+    return f"cursor-{invoice.id}"
+
+
+@pytest.mark.parametrize("fetched, forward, ids, next_cursor, prev_cursor, has_more", [
+    # after: a full page plus one means more ahead; there is always a page behind
+    ([1, 2, 3, 4], True, [1, 2, 3], "cursor-3", "cursor-1", True),
+    ([1, 2], True, [1, 2], None, "cursor-1", False),
+    # before: rows arrive in reverse and there is always a page ahead
+    ([6, 5, 4, 3], False, [4, 5, 6], "cursor-6", "cursor-4", True),
+    ([6, 5], False, [5, 6], "cursor-6", None, False),
+    ([], True, [], None, None, False),
+])
+def test_cursor_page_emits_cursors_for_the_sides_that_have_rows(fetched, forward, ids, next_cursor, prev_cursor, has_more):
+    rows, next_token, prev_token, more = cursor_page([row(id) for id in fetched], 3, forward, encode_id)
+
+    assert [invoice.id for invoice in rows] == ids
+    assert (next_token, prev_token, more) == (next_cursor, prev_cursor, has_more)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import httpx
+import openai
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from app.core.config import settings
+from app.extractors.fake_extractor import FakeExtractor
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import (
+    ACTIVE_STATUSES, JOB_DEAD_LETTER, JOB_SUCCEEDED, InvoiceJobQueue, JobQueueNotStartedError, is_transient, retry_delay,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(error_class, status_code: int):
+    return error_class("model error", response=httpx.Response(status_code, request=REQUEST), body=None)
+
+
+def wrapped(error):
+    """The service's ValueError("Error ...") from <cause> wrapping"""
+    try:
+        raise ValueError("Error processing invoice") from error
+    except ValueError as e:
+        return e
+
+
+class FakeUploadProcessor:
+    """In-memory stand-in for extract + store: raises the queued errors first, then
+    extracts with FakeExtractor; `release` holds every attempt until it is set"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, file_bytes: bytes, filename: str, content_hash: str):
+        self.calls += 1
+        await self.release.wait()
+        if self.errors:
+            raise self.errors.pop(0)
+        result = await FakeExtractor().extract_image(file_bytes, "image/jpeg")
+        return None, json.loads(result.content), "created"
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Attempt numbers the queue asked a backoff for; the backoff itself is ~0"""
+    delays = []
+    monkeypatch.setattr(settings, "JOB_WORKERS", 2)
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(job_queue_module, "retry_delay", lambda attempts: delays.append(attempts) or 0.001)
+    return delays
+
+
+async def wait_finished(job, timeout: float = 2.0):
+    async def finished():
+        while job.status in ACTIVE_STATUSES:
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(finished(), timeout)
+
+
+def run_job(processor, file_bytes: bytes = b"invoice"):
+    async def run():
+        queue = InvoiceJobQueue(process=processor)
+        await queue.start()
+        try:
+            job = queue.submit(file_bytes, "invoice.jpg")
+            await wait_finished(job)
+            return queue, job
+        finally:
+            await queue.stop()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.RateLimitError, 429),
+    status_error(openai.InternalServerError, 500),
+    status_error(openai.APIStatusError, 502),
+    openai.APIConnectionError(request=REQUEST),
+    HTTPException(status_code=503, detail="No free extraction slot"),
+    OperationalError("SELECT 1", {}, ConnectionError("server closed the connection")),
+    wrapped(HTTPException(status_code=503, detail="No free extraction slot")),
+])
+def test_transient_errors_are_retryable(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("Could not parse the model response"),
+    status_error(openai.APIStatusError, 400),
+    HTTPException(status_code=415, detail="Unsupported image"),
+    wrapped(KeyError("invoice_number")),
+])
+def test_other_errors_are_not_retryable(error):
+    assert not is_transient(error)
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 2.0)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_MAX_SECONDS", 60.0)
+    monkeypatch.setattr(job_queue_module.random, "uniform", lambda low, high: 0)
+
+    assert [retry_delay(attempts) for attempts in (1, 2, 3, 6, 10)] == [2.0, 4.0, 8.0, 60.0, 60.0]
+
+
+def test_retry_delay_adds_up_to_half_again_as_jitter(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 2.0)
+    monkeypatch.setattr(job_queue_module.random, "uniform", lambda low, high: high)
+
+    assert retry_delay(2) == 6.0
+
+
+def test_submit_before_start_is_rejected():
+    with pytest.raises(JobQueueNotStartedError):
+        InvoiceJobQueue().submit(b"invoice", "invoice.jpg")
+
+
+def test_job_succeeds_with_the_upload_response(delays):
+    processor = FakeUploadProcessor()
+    queue, job = run_job(processor)
+
+    assert job.status == JOB_SUCCEEDED
+    assert job.attempts == 1
+    assert job.result["status"] == "created"
+    assert job.result["invoice_number"].startswith("FAKE-")
+    assert job.file_bytes is None
+    assert delays == []
+    assert queue.active == {}
+
+
+def test_transient_failures_are_retried_with_backoff(delays):
+    processor = FakeUploadProcessor(status_error(openai.RateLimitError, 429), wrapped(HTTPException(status_code=503)))
+    _, job = run_job(processor)
+
+    assert job.status == JOB_SUCCEEDED
+    assert job.attempts == processor.calls == 3
+    assert delays == [1, 2]
+    assert job.error is None
+
+
+def test_job_moves_to_dead_letter_after_max_attempts(delays):
+    processor = FakeUploadProcessor(*(status_error(openai.RateLimitError, 429) for _ in range(3)))
+    queue, job = run_job(processor)
+
+    assert job.status == JOB_DEAD_LETTER
+    assert job.attempts == 3
+    assert delays == [1, 2]
+    assert job.error == "model error"
+    assert job.file_bytes is None
+    assert queue.active == {}
+
+
+def test_non_transient_failure_moves_to_dead_letter_at_once(delays):
+    processor = FakeUploadProcessor(HTTPException(status_code=415, detail="Unsupported image"))
+    _, job = run_job(processor)
+
+    assert job.status == JOB_DEAD_LETTER
+    assert job.attempts == 1
+    assert delays == []
+    assert job.error == "Unsupported image"
+
+
+def test_resubmitting_an_active_upload_returns_its_job(delays):
+    async def run():
+        processor = FakeUploadProcessor()
+        processor.release.clear()
+        queue = InvoiceJobQueue(process=processor)
+        await queue.start()
+        try:
+            first = queue.submit(b"invoice", "invoice.jpg")
+            duplicate = queue.submit(b"invoice", "invoice (1).jpg")
+            other = queue.submit(b"other invoice", "other.jpg")
+            processor.release.set()
+            await wait_finished(first)
+            await wait_finished(other)
+            # Finished jobs no longer absorb new uploads of the same file
+            again = queue.submit(b"invoice", "invoice.jpg")
+            await wait_finished(again)
+            return first, duplicate, other, again
+        finally:
+            await queue.stop()
+
+    first, duplicate, other, again = asyncio.run(run())
+
+    assert duplicate is first
+    assert other is not first
+    assert again is not first
+    assert again.status == JOB_SUCCEEDED
@@ -0,0 +1,51 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from app.db.migrations import (
+    LEGACY_UNIQUE_INDEX, MIGRATIONS, concurrent_index, legacy_unique_index_migrations, unique_key_migrations,
+)
+from app.models.invoice import Invoice
+
+
+def test_unique_key_index_covers_every_key_column():
+    index_name, statements = unique_key_migrations(["vendor_name", "invoice_number"])
+
+    assert index_name == "ux_invoices_key_vendor_name_invoice_number"
+    assert statements[0] == (
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_invoices_key_vendor_name_invoice_number "
+        "ON invoices (coalesce(vendor_name, ''), coalesce(invoice_number, ''))"
+    )
+
+
+def test_legacy_unique_index_is_replaced_by_a_plain_one():
+    drop, create = legacy_unique_index_migrations()
+
+    assert drop == f"DROP INDEX CONCURRENTLY IF EXISTS {LEGACY_UNIQUE_INDEX}"
+    name, concurrent_create = concurrent_index(create)
+    assert name == LEGACY_UNIQUE_INDEX
+    assert concurrent_create == f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_UNIQUE_INDEX} ON invoices (invoice_number)"
+
+
+def test_model_no_longer_declares_invoice_number_unique():
+    [index] = [index for index in Invoice.__table__.indexes if index.name == LEGACY_UNIQUE_INDEX]
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+    assert not index.unique
+    assert ddl.startswith(f"CREATE INDEX {LEGACY_UNIQUE_INDEX}")
+
+
+def test_index_statements_are_built_concurrently():
+    for statement in MIGRATIONS:
+        index = concurrent_index(statement)
+        if statement.lstrip().startswith("CREATE INDEX"):
+            name, concurrent_statement = index
+            assert concurrent_statement.startswith(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ")
+        else:
+            assert index is None
+
+
+def test_unique_key_index_is_built_concurrently():
+    index_name, statements = unique_key_migrations(["invoice_number"])
+
+    name, concurrent_statement = concurrent_index(statements[0])
+    assert name == index_name
+    assert concurrent_statement.startswith(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ")
@@ -0,0 +1,70 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from app.utils.parse_utils import INVOICE_TYPED_FIELDS, ITEM_TYPED_FIELDS, parse_amount, parse_date, parse_money, parse_quantity, with_typed_values
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.50", Decimal("1234.50")),
+    ("1.234,50", Decimal("1234.50")),
+    ("99,50", Decimal("99.50")),
+    ("1,234", Decimal("1234")),
+    ("Rs. 99", Decimal("99")),
+    ("(12.00)", Decimal("-12.00")),
+    ("1.234.567", Decimal("1234567")),
+    ("1,234,567", Decimal("1234567")),
+    ("1.234.567,89", Decimal("1234567.89")),
+    ("1,234,567.89", Decimal("1234567.89")),
+    ("1e5", Decimal("100000")),
+    ("2.5E-1", Decimal("0.25")),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "n/a", "1e20", "9,999,999,999,999"])
+def test_parse_amount_rejects_missing_and_oversized_values(text):
+    assert parse_amount(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("99999999999.999", Decimal("99999999999.999")),
+    ("100000000000", None),  # 1e11: over NUMERIC(14, 3)
+    ("1e11", None),
+    ("99999999999.9996", None),  # Rounds up to 1e11 in the column
+])
+def test_parse_quantity_is_bounded_by_its_column(text, expected):
+    assert parse_quantity(text) == expected
+
+
+def test_money_columns_keep_their_own_bound():
+    assert parse_money("100000000000") == Decimal("100000000000")
+    assert parse_money("999999999999.99") == Decimal("999999999999.99")
+    assert parse_money("1e12") is None
+
+
+def test_item_typed_fields_store_null_for_an_oversized_quantity():
+    values = with_typed_values({"quantity": "1e11", "unit_price": "1e11"}, ITEM_TYPED_FIELDS)
+
+    assert values["quantity_value"] is None
+    assert values["unit_price_value"] == Decimal("1e11")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2025-01-15", date(2025, 1, 15)),
+    ("01/15/2025", date(2025, 1, 15)),
+    ("15/01/2025", date(2025, 1, 15)),
+    ("15 Jan 2025", date(2025, 1, 15)),
+    ("2025-02-30", None),
+    ("soon", None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+
+def test_with_typed_values_keeps_the_raw_strings():
+    values = with_typed_values({"invoice_date": "2025-01-15", "total_amount": "1.234.567"}, INVOICE_TYPED_FIELDS)
+
+    assert values["total_amount"] == "1.234.567"
+    assert values["total_amount_value"] == Decimal("1234567")
+    assert values["invoice_date_value"] == date(2025, 1, 15)
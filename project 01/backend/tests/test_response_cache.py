@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import invoice_router
+from app.db.session import get_db
+from app.services.invoice_service import InvoiceService
+from app.services.response_cache import ResponseCache, compute_etag, etag_matches, list_cache_key
+
+
+class CountingLoader:
+    """Loader that returns `data` and records how often the cache had to call it"""
+
+    def __init__(self, data, during_load=None):
+        self.data = data
+        self.during_load = during_load
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.during_load is not None:
+            self.during_load()
+        return self.data
+
+
+def list_params(**overrides):
+    params = {"page": 1, "limit": 10, "sort_by": "id", "sort_order": "desc", "search": None, "after": None, "before": None, "fields": ("id",), "search_items": False}
+    params.update(overrides)
+    return params
+
+
+def test_etag_is_a_quoted_hash_of_the_canonical_body():
+    etag = compute_etag({"id": 1, "vendor_name": "ACME"})
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == compute_etag({"vendor_name": "ACME", "id": 1})
+    assert etag != compute_etag({"id": 1, "vendor_name": "ACME Ltd"})
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ("*", True),
+    ('"other"', False),
+    (None, False),
+    ("", False),
+])
+def test_etag_matches_if_none_match(if_none_match, expected):
+    assert etag_matches(if_none_match, '"abc"') is expected
+
+
+def test_equivalent_list_queries_share_a_key():
+    assert list_cache_key(list_params(search="  ACME ")) == list_cache_key(list_params(search="acme"))
+    assert list_cache_key(list_params(search=" ", search_items=True)) == list_cache_key(list_params())
+    assert list_cache_key(list_params(fields=["id"])) == list_cache_key(list_params())
+    assert list_cache_key(list_params(page=3, after="cursor")) == list_cache_key(list_params(page=1, after="cursor"))
+
+
+def test_different_list_queries_get_different_keys():
+    assert list_cache_key(list_params(page=2)) != list_cache_key(list_params())
+    assert list_cache_key(list_params(search="acme", search_items=True)) != list_cache_key(list_params(search="acme"))
+
+
+def test_reads_are_served_from_the_cache():
+    cache = ResponseCache()
+    loader = CountingLoader({"id": 1})
+
+    first = asyncio.run(cache.invoice(1, loader))
+    again = asyncio.run(cache.invoice(1, loader))
+
+    assert first == again == (compute_etag({"id": 1}), {"id": 1})
+    assert loader.calls == 1
+
+
+def test_invalidating_an_invoice_drops_its_detail_and_every_list():
+    cache = ResponseCache()
+    detail, other, listing = CountingLoader({"id": 1}), CountingLoader({"id": 2}), CountingLoader({"data": []})
+    for _ in range(2):
+        asyncio.run(cache.invoice(1, detail))
+        asyncio.run(cache.invoice(2, other))
+        asyncio.run(cache.invoice_list(list_params(), listing))
+        cache.invalidate_invoice(1)
+
+    assert (detail.calls, other.calls, listing.calls) == (2, 1, 2)
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_invalidating_lists_keeps_invoice_details():
+    cache = ResponseCache()
+    detail, listing = CountingLoader({"id": 1}), CountingLoader({"data": []})
+    for _ in range(2):
+        asyncio.run(cache.invoice(1, detail))
+        asyncio.run(cache.invoice_list(list_params(), listing))
+        cache.invalidate_lists()
+
+    assert (detail.calls, listing.calls) == (1, 2)
+
+
+def test_a_read_that_raced_a_write_is_not_cached():
+    cache = ResponseCache()
+    # The write lands while the stale row is being loaded
+    stale = CountingLoader({"id": 1, "version": 1}, during_load=lambda: cache.invalidate_invoice(1))
+    fresh = CountingLoader({"id": 1, "version": 2})
+
+    assert asyncio.run(cache.invoice(1, stale))[1] == {"id": 1, "version": 1}
+    assert asyncio.run(cache.invoice(1, fresh))[1] == {"id": 1, "version": 2}
+    assert fresh.calls == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    invoice = {"id": 1, "vendor_name": "ACME"}
+
+    async def get_invoice_response(self, invoice_id):
+        return compute_etag(invoice), invoice
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(InvoiceService, "get_invoice_response", get_invoice_response)
+    app = FastAPI()
+    app.include_router(invoice_router.router)
+    app.dependency_overrides[get_db] = no_db
+    return TestClient(app)
+
+
+def test_invoice_response_carries_its_etag(client):
+    response = client.get("/invoice/1")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == compute_etag({"id": 1, "vendor_name": "ACME"})
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_matching_if_none_match_gets_304_without_a_body(client):
+    etag = client.get("/invoice/1").headers["etag"]
+
+    response = client.get("/invoice/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_stale_if_none_match_gets_the_body(client):
+    response = client.get("/invoice/1", headers={"If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["data"] == {"id": 1, "vendor_name": "ACME"}
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+import pytest
+from app.core.tracing import FileExporter, InMemoryExporter, NOOP_SPAN, TraceContextFilter, traced, tracer
+from app.db import session
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    tracer.configure(exporter=exporter)
+    yield exporter
+    tracer.configure()
+
+
+def log_record():
+    return logging.LogRecord("test", logging.INFO, __file__, 1, "message", (), None)
+
+
+def test_child_spans_share_the_trace_and_point_at_their_parent(exporter):
+    with tracer.span("parent") as parent:
+        with tracer.span("child", key="value"):
+            pass
+
+    child, finished_parent = exporter.spans
+    assert child["name"] == "child"
+    assert child["attributes"] == {"key": "value"}
+    assert child["trace_id"] == parent.trace_id == finished_parent["trace_id"]
+    assert child["parent_id"] == finished_parent["span_id"]
+    assert finished_parent["parent_id"] is None
+
+
+def test_separate_root_spans_get_separate_traces(exporter):
+    with tracer.span("first"):
+        pass
+    with tracer.span("second"):
+        pass
+
+    first, second = exporter.spans
+    assert first["trace_id"] != second["trace_id"]
+
+
+def test_traced_wraps_coroutines_and_records_errors(exporter):
+    @traced("service.fail")
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+
+    [span] = exporter.spans
+    assert span["name"] == "service.fail"
+    assert span["status"] == "error"
+    assert span["error"] == "ValueError: boom"
+
+
+def test_log_records_carry_the_active_trace_id(exporter):
+    record = log_record()
+    with tracer.span("request") as span:
+        TraceContextFilter().filter(record)
+
+    assert (record.trace_id, record.span_id) == (span.trace_id, span.span_id)
+
+
+def test_log_records_outside_a_span_get_placeholders(exporter):
+    record = log_record()
+    TraceContextFilter().filter(record)
+
+    assert (record.trace_id, record.span_id) == ("-", "-")
+
+
+def test_sql_statements_become_child_spans(exporter):
+    connection = SimpleNamespace(info={})
+    with tracer.span("request") as request_span:
+        session._before_cursor_execute(connection, None, "SELECT 1", {}, None, False)
+        session._after_cursor_execute(connection, None, "SELECT 1", {}, None, False)
+
+    query, _ = exporter.spans
+    assert query["name"] == "db.query"
+    assert query["attributes"]["db.statement"] == "SELECT 1"
+    assert query["parent_id"] == request_span.span_id
+    assert query["status"] == "ok"
+
+
+def test_failed_sql_statements_end_their_span_with_the_error(exporter):
+    connection = SimpleNamespace(info={})
+    session._before_cursor_execute(connection, None, "SELECT broken", {}, None, False)
+    session._on_query_error(SimpleNamespace(connection=connection, original_exception=RuntimeError("syntax error")))
+
+    [query] = exporter.spans
+    assert query["status"] == "error"
+    assert query["error"] == "RuntimeError: syntax error"
+    assert connection.info["query_spans"] == []
+
+
+def test_disabled_tracer_is_a_no_op():
+    tracer.configure()
+    record = log_record()
+
+    @traced()
+    async def work():
+        return 42
+
+    assert tracer.span("anything") is NOOP_SPAN
+    assert asyncio.run(work()) == 42
+    TraceContextFilter().filter(record)
+    assert (record.trace_id, record.span_id) == ("-", "-")
+
+
+def test_disabled_tracer_records_no_sql_spans():
+    tracer.configure()
+    connection = SimpleNamespace(info={})
+    session._before_cursor_execute(connection, None, "SELECT 1", {}, None, False)
+    session._after_cursor_execute(connection, None, "SELECT 1", {}, None, False)
+
+    assert "query_spans" not in connection.info
+
+
+def test_file_exporter_writes_spans_on_its_thread(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    file_exporter = FileExporter(str(path))
+    file_exporter.export({"name": "one", "span_id": "a"})
+    file_exporter.export({"name": "two", "span_id": "b"})
+    file_exporter.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["one", "two"]